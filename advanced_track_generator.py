@@ -1,13 +1,36 @@
 import pygame
 import random
 import math
-from config import GameConfig
+from config import GameConfig, ObstacleConfig
+
+_solid_mask = None  # 木・岩1つ分の円のマスク（全チャンクで共有）
+_span_masks = {}  # タイル数 → トラック上の1行分（横に並んだタイル）のマスク
+
+
+def _get_solid_mask():
+    """木・岩の当たり判定の円のマスク"""
+    global _solid_mask
+    if _solid_mask is None:
+        radius = ObstacleConfig.SOLID_RADIUS
+        surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+        pygame.draw.circle(surface, (255, 255, 255), (radius, radius), radius)
+        _solid_mask = pygame.mask.from_surface(surface)
+    return _solid_mask
+
+
+def _get_span_mask(tiles):
+    """横に tiles 枚並んだタイル1行分のマスク"""
+    mask = _span_masks.get(tiles)
+    if mask is None:
+        mask = _span_masks[tiles] = pygame.mask.Mask((tiles * 16, 16), fill=True)
+    return mask
 
 class AdvancedTrackChunk:
     """高度なトラックチャンク"""
     
-    def __init__(self, y_offset, difficulty=1.0, prev_center=None):
+    def __init__(self, y_offset, difficulty=1.0, prev_center=None, grow_upward=False, rng=random, rows=None):
         self.y_offset = y_offset
+        self.rng = rng  # ステージ専用の乱数（ネットワーク対戦で全員が同じトラックを生成する）
         self.height = 20  # チャンクの高さ
         self.width = GameConfig.SCREEN_WIDTH
         self.difficulty = difficulty
@@ -17,6 +40,25 @@ class AdvancedTrackChunk:
         self.track_width = []
         self.surface_types = []  # 路面タイプを追加
         
+        # 描画済みサーフェス（トラック側で初回描画時に作成、チャンク削除と共に解放）
+        self.surface = None
+        # CPU対戦相手用のレーシングライン（ai_driver で初回使用時に作成）
+        self.racing_line = None
+        # 障害物・泥の空間ハッシュ {(タイルX, タイルY): タイルタイプ}（place_obstacles で配置）
+        self.obstacles = {}
+        # 障害物の乱数のシード（トラック側で設定し、ensure_obstacles で初めて使うときに配置する）
+        self.obstacle_seed = None
+        # 車体の当たり判定用マスク（build_collision_masks で作成、チャンク左上が原点のピクセル単位）
+        self.off_track_mask = None
+        self.solid_mask = None
+        self.has_solids = False  # 木・岩が1つでもあるか（無ければ solid_mask を調べない）
+        
+        # 保存済みのステージ（トラックパック）から読み込んだ行 (中心, 幅, 路面) があれば生成しない
+        if rows is not None:
+            self.track_center_line, self.track_width, self.surface_types = (list(column) for column in rows)
+            self.height = len(self.track_center_line)
+            return
+        
         # 前のチャンクの中心から開始
         if prev_center is None:
             start_center = self.width // 2
@@ -25,6 +67,13 @@ class AdvancedTrackChunk:
         
         # ラリーらしいトラック生成
         self._generate_rally_track(start_center)
+        
+        # 上方向に伸ばす場合は下端の行から生成を始めたことにする
+        # （前のチャンクの上端と、このチャンクの下端が連続する）
+        if grow_upward:
+            self.track_center_line.reverse()
+            self.track_width.reverse()
+            self.surface_types.reverse()
     
     def _generate_rally_track(self, start_center):
         """ラリーらしいトラックを生成"""
@@ -32,29 +81,29 @@ class AdvancedTrackChunk:
         
         # セクションタイプを決定（ストレート、カーブ、ヘアピン）
         section_types = ['straight', 'curve', 'hairpin', 'chicane', 'elevation']
-        section_type = random.choice(section_types)
+        section_type = self.rng.choice(section_types)
         
         # セクション固有のパラメータ
-        curve_direction = 1 if random.random() > 0.5 else -1
-        elevation_phase = random.uniform(0, math.pi * 2)
+        curve_direction = 1 if self.rng.random() > 0.5 else -1
+        elevation_phase = self.rng.uniform(0, math.pi * 2)
         
         for i in range(self.height):
             # セクションに応じたカーブ生成
             if section_type == 'straight':
-                curve_amount = random.uniform(-0.8, 0.8)  # 緩やかな直線
+                curve_amount = self.rng.uniform(-0.8, 0.8)  # 緩やかな直線
             elif section_type == 'curve':
                 # 一方向への連続カーブ
                 curve_intensity = 1 + self.difficulty
-                curve_amount = curve_direction * random.uniform(1, 2 * curve_intensity)
+                curve_amount = curve_direction * self.rng.uniform(1, 2 * curve_intensity)
             elif section_type == 'hairpin':
                 # 急カーブ（ヘアピン）
-                curve_amount = random.uniform(-5, 5) * (1 + self.difficulty)
+                curve_amount = self.rng.uniform(-5, 5) * (1 + self.difficulty)
             elif section_type == 'chicane':
                 # S字カーブ
-                curve_amount = math.sin(i * 0.8) * 3 + random.uniform(-1, 1)
+                curve_amount = math.sin(i * 0.8) * 3 + self.rng.uniform(-1, 1)
             elif section_type == 'elevation':
                 # 高低差を模した蛇行
-                curve_amount = math.sin(i * 0.3 + elevation_phase) * 2 + random.uniform(-1, 1)
+                curve_amount = math.sin(i * 0.3 + elevation_phase) * 2 + self.rng.uniform(-1, 1)
             
             current_center += curve_amount
             
@@ -67,13 +116,13 @@ class AdvancedTrackChunk:
             
             # ラリーらしいトラック幅（セクションに応じて変化）
             if section_type == 'hairpin':
-                base_width = random.uniform(70, 90)  # ヘアピンは狭い
+                base_width = self.rng.uniform(70, 90)  # ヘアピンは狭い
             elif section_type == 'straight':
-                base_width = random.uniform(100, 130)  # ストレートは広め
+                base_width = self.rng.uniform(100, 130)  # ストレートは広め
             else:
-                base_width = random.uniform(80, 110)  # 通常
+                base_width = self.rng.uniform(80, 110)  # 通常
             
-            width_variation = random.uniform(-15, 15)
+            width_variation = self.rng.uniform(-15, 15)
             track_width = max(50, base_width + width_variation)
             self.track_width.append(track_width)
             
@@ -83,7 +132,7 @@ class AdvancedTrackChunk:
     
     def _determine_surface_type_by_section(self, section_type, position):
         """セクションタイプに応じて路面タイプを決定"""
-        rand = random.random()
+        rand = self.rng.random()
         
         if section_type == 'straight':
             # ストレートはアスファルトが多い
@@ -118,6 +167,97 @@ class AdvancedTrackChunk:
             else:
                 return 2  # DIRT
     
+    def place_obstacles(self, rng):
+        """トラック脇の木・岩・水たまりとトラック上の泥を配置し、タイル座標をキーに登録
+        
+        rng はこのチャンク専用の乱数（トラックの形を作る乱数とは別にして、
+        保存済みのステージから読み込んだチャンクにも同じ配置ができるようにする）。
+        """
+        obstacles = {}
+        tile = 16  # TILE_SIZE
+        rows = len(self.track_center_line)
+        lefts = [center - width / 2 for center, width in zip(self.track_center_line, self.track_width)]
+        rights = [center + width / 2 for center, width in zip(self.track_center_line, self.track_width)]
+        border_density = ObstacleConfig.BORDER_DENSITY + ObstacleConfig.BORDER_DENSITY_PER_DIFFICULTY * self.difficulty
+        water_share = ObstacleConfig.WATER_SHARE
+        rock_share = water_share + ObstacleConfig.ROCK_SHARE
+        
+        for row in range(rows):
+            # カーブで端が横に動くので、上下の行も含めたトラックの端から離す
+            neighbours = range(max(0, row - 1), min(rows, row + 2))
+            left = min(lefts[i] for i in neighbours)
+            right = max(rights[i] for i in neighbours)
+            tile_y = self.y_offset + row
+            for tile_x in range(self.width // tile):
+                x = tile_x * tile + tile / 2
+                distance = max(left - x, x - right)
+                if distance < ObstacleConfig.EDGE_CLEARANCE:
+                    continue
+                roll = rng.random()
+                if distance < ObstacleConfig.EDGE_CLEARANCE + ObstacleConfig.BORDER_DEPTH:
+                    if roll < border_density:
+                        kind = rng.random()
+                        obstacles[(tile_x, tile_y)] = 6 if kind < water_share else 5 if kind < rock_share else 4
+                elif roll < ObstacleConfig.SCENERY_DENSITY:
+                    obstacles[(tile_x, tile_y)] = 4  # TREE
+        
+        # トラック上の泥（トラック上のタイルだけを円形に塗る）
+        mud_chance = ObstacleConfig.MUD_PATCH_CHANCE + ObstacleConfig.MUD_PATCH_CHANCE_PER_DIFFICULTY * self.difficulty
+        if rows and rng.random() < mud_chance:
+            patch_row = rng.randrange(rows)
+            radius = rng.randint(*ObstacleConfig.MUD_PATCH_RADIUS)
+            patch_x = int((self.track_center_line[patch_row] +
+                           rng.uniform(-0.3, 0.3) * self.track_width[patch_row]) // tile)
+            for row in range(max(0, patch_row - radius), min(rows, patch_row + radius + 1)):
+                for tile_x in range(patch_x - radius, patch_x + radius + 1):
+                    if (tile_x - patch_x) ** 2 + (row - patch_row) ** 2 > radius * radius:
+                        continue
+                    if abs(tile_x * tile - self.track_center_line[row]) <= self.track_width[row] / 2:
+                        obstacles[(tile_x, self.y_offset + row)] = 7  # MUD
+        
+        self.obstacles = obstacles
+    
+    def build_collision_masks(self):
+        """トラック外のタイルと木・岩の円のマスクを作成（障害物の配置後に呼ぶ）"""
+        tile = 16  # TILE_SIZE
+        tiles_per_row = self.width // tile
+        rows = len(self.track_center_line)
+        
+        # 全面を埋めてから、各行のトラック上のタイル（get_tile_at と同じ判定）を抜く
+        off_track = pygame.mask.Mask((tiles_per_row * tile, rows * tile), fill=True)
+        for row, (center, width) in enumerate(zip(self.track_center_line, self.track_width)):
+            first = max(0, math.ceil((center - width / 2) / tile))
+            last = min(tiles_per_row - 1, math.floor((center + width / 2) / tile))
+            if last >= first:
+                off_track.erase(_get_span_mask(last - first + 1), (first * tile, row * tile))
+        self.off_track_mask = off_track
+        
+        # 木・岩はトラック端から EDGE_CLEARANCE 以上離れたトラック外のタイルにだけ置くので、off_track に含まれる
+        solid = pygame.mask.Mask((tiles_per_row * tile, rows * tile))
+        circle = _get_solid_mask()
+        corner = tile // 2 - ObstacleConfig.SOLID_RADIUS  # タイル左上から円の左上まで
+        has_solids = False
+        for (tile_x, tile_y), kind in self.obstacles.items():
+            if kind == 4 or kind == 5:  # TREE, ROCK
+                solid.draw(circle, (tile_x * tile + corner, (tile_y - self.y_offset) * tile + corner))
+                has_solids = True
+        self.solid_mask = solid
+        self.has_solids = has_solids
+    
+    def ensure_obstacles(self):
+        """障害物とマスクが未作成なら obstacle_seed から作成（描画・当たり判定の前に呼ぶ）"""
+        if self.solid_mask is None and self.obstacle_seed is not None:
+            self.place_obstacles(random.Random(self.obstacle_seed))
+            self.build_collision_masks()
+    
+    def rebase(self, shift_tiles):
+        """チャンクを shift_tiles タイル下に移す（トラックの原点の移動用、マスクはチャンク内の座標なのでそのまま）"""
+        self.y_offset += shift_tiles
+        self.obstacles = {(tile_x, tile_y + shift_tiles): kind for (tile_x, tile_y), kind in self.obstacles.items()}
+        if self.racing_line is not None:
+            ys, xs, speeds = self.racing_line
+            self.racing_line = (ys + shift_tiles * 16, xs, speeds)  # TILE_SIZE
+
     def get_last_center(self):
         """最後の中心位置を取得"""
         return self.track_center_line[-1] if self.track_center_line else self.width // 2
@@ -165,6 +305,11 @@ class AdvancedTrackChunk:
         if tile_y < self.y_offset or tile_y >= self.y_offset + self.height:
             return 0  # GRASS
         
+        # 障害物・泥
+        obstacle = self.obstacles.get((tile_x, tile_y))
+        if obstacle is not None:
+            return obstacle
+        
         # チャンク内の相対位置
         local_y = int(tile_y - self.y_offset)
         if local_y < 0 or local_y >= len(self.track_center_line):
@@ -184,7 +329,7 @@ class AdvancedTrackChunk:
             else:
                 return 3  # TARMAC（デフォルト）
         else:
-            # トラック外は全て草にする（木や岩を削除）
+            # トラック外の障害物以外は草
             return 0  # GRASS
     
     def draw(self, screen, camera_y):
@@ -0,0 +1,254 @@
+from config import GameConfig, CarConfig, AIConfig
+from endless_track_advanced import EndlessTrackConfig
+from input_sources import DriverInput
+from realistic_rally_car import RealisticRallyCar
+
+np = None  # NumPyは対戦相手を作る時点で読み込む（Web版の起動を速くするため）
+
+
+def _load_numpy():
+    """NumPyを読み込む（使えなければNone）"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+def compute_racing_line(chunk):
+    """チャンクのレーシングライン (ワールドY, 目標X, 目標速度) を作成
+
+    中心線を平滑化してコーナーの内側を通るようにし、コース幅からはみ出さないよう
+    制限する。目標速度はその線の曲率から求める。
+    """
+    tile = EndlessTrackConfig.TILE_SIZE
+    rows = len(chunk.track_center_line)
+    ys = (chunk.y_offset + np.arange(rows, dtype=np.float64)) * tile + tile / 2
+    centers = np.asarray(chunk.track_center_line, dtype=np.float64)
+    half_widths = np.asarray(chunk.track_width, dtype=np.float64) / 2
+
+    # 移動平均（端は端の値で延長して、隣のチャンクとの境目で中心線に戻す）
+    radius = AIConfig.LINE_SMOOTHING // 2
+    padded = np.concatenate((np.full(radius, centers[0]), centers, np.full(radius, centers[-1])))
+    kernel = np.full(2 * radius + 1, 1.0 / (2 * radius + 1))
+    line = np.convolve(padded, kernel, mode="valid")
+    # タイル単位の当たり判定に合わせて、タイル1枚分内側に収める
+    limit = np.maximum(0.0, half_widths - AIConfig.EDGE_MARGIN)
+    line = np.clip(line, centers - limit, centers + limit)
+
+    # 曲率 κ = |x''| / (1 + x'^2)^1.5 から v = sqrt(a / κ)
+    slope = np.gradient(line, tile)
+    curvature = np.abs(np.gradient(slope, tile)) / (1 + slope * slope) ** 1.5
+    speeds = np.sqrt(AIConfig.LATERAL_ACCEL / np.maximum(curvature, 1e-6))
+    speeds = np.clip(speeds, AIConfig.MIN_TARGET_SPEED, AIConfig.MAX_TARGET_SPEED)
+    return ys, line, speeds
+
+
+class RacingLine:
+    """トラック全体のレーシングライン（チャンクごとの計算結果をY座標の昇順に連結）"""
+
+    def __init__(self):
+        self.key = None
+        self.ys = None
+        self.xs = None
+        self.speeds = None
+
+    def update(self, chunks):
+        """チャンク構成が変わったとき（原点の移動を含む）だけ連結し直す"""
+        key = (id(chunks[0]), id(chunks[-1]), len(chunks), chunks[-1].y_offset) if chunks else None
+        if key == self.key:
+            return
+        self.key = key
+        parts = []
+        # チャンクのリストは下から上の順なので、逆順にするとYの昇順になる
+        for chunk in reversed(chunks):
+            if chunk.racing_line is None:
+                chunk.racing_line = compute_racing_line(chunk)
+            parts.append(chunk.racing_line)
+        self.ys = np.concatenate([part[0] for part in parts])
+        self.xs = np.concatenate([part[1] for part in parts])
+        self.speeds = np.concatenate([part[2] for part in parts])
+
+    def get_x(self, ys):
+        """指定Y座標でのレーシングラインのX座標"""
+        return np.interp(ys, self.ys, self.xs)
+
+    def get_speed(self, ys):
+        """指定Y座標での目標速度"""
+        return np.interp(ys, self.ys, self.speeds)
+
+
+class AIInput:
+    """CPUの車の入力ソース（操作は OpponentField がまとめて決める）"""
+
+    def __init__(self):
+        self.controls = DriverInput()
+
+    def set_controls(self, throttle, steer, shift):
+        """次の判断までの操作を設定（steer・shift は -1/0/1）"""
+        self.controls = DriverInput(throttle=throttle, steer_left=steer > 0, steer_right=steer < 0,
+                                    shift_up=shift > 0, shift_down=shift < 0)
+
+    def read(self):
+        """次のフレームの操作を取得（シフトは押した1フレームだけ）"""
+        controls = self.controls
+        if controls.shift_up or controls.shift_down:
+            self.controls = DriverInput(throttle=controls.throttle, steer_left=controls.steer_left,
+                                        steer_right=controls.steer_right)
+        return controls
+
+
+class RacingLineInput(AIInput):
+    """1台の車を対戦相手と同じレーシングラインと判断で走らせる入力ソース（ソークテストなどの自動運転用）"""
+
+    def __init__(self, car, skill=1.0):
+        super().__init__()
+        self.car = car
+        self.field = OpponentField(car.track, 0)  # レーシングラインと判断だけを使う
+        self.skill = np.array([skill]) if np is not None else None
+        self.frame = 0
+
+    def read(self):
+        """DECISION_INTERVAL フレームごとに操作を決め直してから取得"""
+        if self.skill is not None and self.frame % AIConfig.DECISION_INTERVAL == 0:
+            self.field.decide([self.car], [self], self.skill)
+        self.frame += 1
+        return super().read()
+
+
+class OpponentField:
+    """CPUの対戦相手（全台の判断をNumPyでまとめて行い、車の物理はプレイヤーと同じものを使う）"""
+
+    def __init__(self, track, count):
+        if _load_numpy() is None:
+            print("Warning: NumPy is not available, AI opponents are disabled")
+            count = 0
+        self.track = track
+        self.racing_line = RacingLine()
+        self.inputs = [AIInput() for _ in range(count)]
+        self.cars = []
+        colors = GameConfig.CAR_COLORS
+        for index in range(count):
+            car = RealisticRallyCar(track, sound=False, body_color=colors[index % len(colors)])
+            car.input_source = self.inputs[index]
+            self.cars.append(car)
+
+        # 台ごとの速さ（前のグリッドほど速い）
+        self.skill = np.linspace(1.0, 1.0 - AIConfig.SKILL_SPREAD, count) if count else None
+        gears = sorted(CarConfig.GEAR_RATIOS)
+        self.gear_min_speeds = np.array([0.0] + [CarConfig.GEAR_RATIOS[gear]["min_speed"] for gear in gears])
+        self.gear_max_speeds = np.array([0.0] + [CarConfig.GEAR_RATIOS[gear]["max_speed"] for gear in gears])
+        self.max_gear = gears[-1]
+        self.preview = np.array(AIConfig.SPEED_PREVIEW, dtype=np.float64)
+        self.reset()
+
+    def reset(self):
+        """スタートグリッドに並べ直す"""
+        self.frame = 0
+        self.active = [True] * len(self.cars)
+        if not self.cars:
+            return
+        self.racing_line.update(self.track.chunks)
+        start_y = GameConfig.SCREEN_HEIGHT - 100
+        for index, car in enumerate(self.cars):
+            row = index // 2
+            y = start_y - AIConfig.GRID_ROW_SPACING * (row + 1)
+            side = -1 if index % 2 == 0 else 1
+            x = float(self.racing_line.get_x(y)) + side * AIConfig.GRID_COLUMN_OFFSET
+            car.reset((x, y))
+            self.inputs[index].controls = DriverInput()
+
+    def resume(self, frame):
+        """スナップショットから戻した状態で再開（次の更新で全台の操作を決め直す）"""
+        self.frame = frame - frame % AIConfig.DECISION_INTERVAL
+        for car_input in self.inputs:
+            car_input.controls = DriverInput()
+    
+    def rebase(self, shift_y):
+        """全台をワールド座標で shift_y だけ下にずらす（チャンクのレーシングラインはトラック側で移動済み）"""
+        for car in self.cars:
+            car.rebase(shift_y)
+
+    def update(self, camera_bottom):
+        """全台の更新（判断は DECISION_INTERVAL フレームごとにまとめて行う）
+
+        camera_bottom より後ろに取り残された車はリタイアさせる（その先のチャンクは削除済み）。
+        """
+        if not self.cars:
+            return
+        if self.frame % AIConfig.DECISION_INTERVAL == 0:
+            self.decide(self.cars, self.inputs, self.skill)
+        self.frame += 1
+
+        zoom = self.track.zoom
+        for index, car in enumerate(self.cars):
+            if not self.active[index]:
+                continue
+            car.set_render_zoom(zoom)
+            car.update_for_endless_mode()
+            if car.position.y > camera_bottom:
+                self.active[index] = False
+
+        # 先頭の車の前までチャンクを用意する
+        lead_y = self.get_lead_y()
+        if lead_y is not None:
+            self.track.extend_to(lead_y - 400)
+
+    def decide(self, cars, inputs, skill):
+        """cars の操作をまとめて決めて inputs に設定（目標点への向き・曲率から決めた目標速度・ギア）
+
+        skill は台ごとの目標速度の倍率の配列。
+        """
+        self.racing_line.update(self.track.chunks)
+        x = np.array([car.position.x for car in cars])
+        y = np.array([car.position.y for car in cars])
+        direction = np.array([car.direction for car in cars])
+        speed = np.array([car.velocity.length() for car in cars])
+        steering = np.array([car.steering_angle for car in cars])
+        gear = np.array([car.current_gear for car in cars])
+        line = self.racing_line
+
+        # ステアリング: 速度に応じた先の目標点への向きの誤差から目標舵角を決める
+        target_y = y - (AIConfig.LOOKAHEAD_BASE + AIConfig.LOOKAHEAD_PER_SPEED * speed)
+        target_x = line.get_x(target_y)
+        desired = np.degrees(np.arctan2(y - target_y, target_x - x))
+        error = (desired - direction + 180) % 360 - 180
+        desired_steering = np.clip(error * AIConfig.STEER_GAIN, -CarConfig.MAX_STEERING_ANGLE,
+                                   CarConfig.MAX_STEERING_ANGLE)
+        steer = np.where(desired_steering > steering + AIConfig.STEER_DEADBAND, 1,
+                         np.where(desired_steering < steering - AIConfig.STEER_DEADBAND, -1, 0))
+
+        # アクセル: この先の区間で最も低い目標速度を超えていれば離す（ブレーキは後退用なので使わない）
+        preview_y = y[:, None] - self.preview[None, :]
+        target_speed = line.get_speed(preview_y).min(axis=1) * skill
+        throttle = speed < target_speed
+
+        # ギア: 今のギアの最高速度に近づいたら上げ、効率の出る速度を下回ったら下げる
+        shift = np.where((speed > self.gear_max_speeds[gear] * 0.95) & (gear < self.max_gear) & throttle, 1,
+                         np.where((speed < self.gear_min_speeds[gear] * 0.9) & (gear > 1), -1, 0))
+
+        for index, car_input in enumerate(inputs):
+            car_input.set_controls(bool(throttle[index]), int(steer[index]), int(shift[index]))
+
+    def get_lead_y(self):
+        """走っている車の中で最も先にいる車のY座標"""
+        ys = [car.position.y for car, active in zip(self.cars, self.active) if active]
+        return min(ys) if ys else None
+
+    def get_rank(self, car):
+        """car の順位（走っている対戦相手と比べて、1始まり）"""
+        return 1 + sum(1 for other, active in zip(self.cars, self.active)
+                       if active and other.position.y < car.position.y)
+
+    def draw(self, screen, track):
+        """画面内の対戦相手を描画"""
+        for car, active in zip(self.cars, self.active):
+            if not active:
+                continue
+            image = car.get_image(track.zoom)
+            rect = image.get_rect(center=track.world_to_screen(car.position))
+            if rect.bottom >= 0 and rect.top <= screen.get_height():
+                screen.blit(image, rect)
@@ -0,0 +1,168 @@
+import threading
+import time
+from config import AudioConfig
+
+
+# コマンド種別
+ENGINE = 0
+SKID = 1
+GEAR = 2
+STOP = 3
+RESET = 4
+
+
+class AudioWorker:
+    """サウンドコマンドをまとめてミキサーに反映するオーディオスレッド
+
+    ゲームループは対象・コマンド種別ごとの枠に最新の引数を書くだけで、ミキサーが詰まっても
+    溜まるのは対象ごとに種別の数まで。停止・初期化はそれより前の再生要求を消して枠に残るので、
+    捨てられることはなく、まとめて反映しても投稿順と同じ結果になる。ワーカーはコマンドが
+    積まれるまで待ち、起きたら tick の間隔を空けながら溜まった枠をまとめて反映する。
+    """
+
+    def __init__(self, tick=AudioConfig.AUDIO_THREAD_TICK):
+        self.tick = tick
+        self.lock = threading.Lock()
+        self.pending = {}  # {対象: {コマンド種別: 引数}}
+        self.thread = None
+        self.wake = threading.Event()  # post() と stop() で立て、ワーカーを起こす
+        self.stopping = False
+        self.commands_posted = 0
+        self.commands_applied = 0
+
+    def start(self):
+        """ワーカースレッドを開始（スレッドが使えなければFalse）"""
+        if self.thread is not None:
+            return True
+        self.stopping = False
+        thread = threading.Thread(target=self._run, name="AudioWorker", daemon=True)
+        try:
+            thread.start()
+        except RuntimeError:
+            return False
+        self.thread = thread
+        return True
+
+    def post(self, target, command, args=()):
+        """コマンドを対象の枠に書く（ゲームループから呼ぶ）"""
+        with self.lock:
+            batch = self.pending.setdefault(target, {})
+            if command in (STOP, RESET):
+                # 停止・初期化より前の再生要求は無効（停止の後でエンジン音が鳴り直さないように）
+                for played in (ENGINE, SKID, GEAR):
+                    batch.pop(played, None)
+                batch[command] = args
+            elif command == SKID and SKID in batch:
+                # スキール音は最も強い要求を残す
+                batch[SKID] = max(batch[SKID], args)
+            else:
+                # エンジン状態は最新のものだけ、ギア音は1回にまとめる
+                batch[command] = args
+        self.commands_posted += 1
+        self.wake.set()
+
+    def stop(self, timeout=1.0):
+        """積まれているコマンドを反映してからワーカースレッドを止める（ゲーム終了時に呼ぶ）"""
+        thread = self.thread
+        if thread is None:
+            return
+        self.stopping = True
+        self.wake.set()
+        thread.join(timeout)
+        self.thread = None
+
+    def _run(self):
+        """コマンドが積まれるまで待ち、続けて積まれたコマンドは tick ごとにまとめて処理"""
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            if self.pending:
+                self.process_pending()
+            if self.stopping:
+                break
+            time.sleep(self.tick)
+
+    def process_pending(self):
+        """溜まったコマンドを対象ごとに反映"""
+        with self.lock:
+            batches, self.pending = self.pending, {}
+        for target, batch in batches.items():
+            target.apply_commands(batch)
+            self.commands_applied += len(batch)
+
+
+_audio_worker = None
+
+
+def get_audio_worker():
+    """プロセス共通のオーディオワーカーを取得"""
+    global _audio_worker
+    if _audio_worker is None:
+        _audio_worker = AudioWorker()
+    return _audio_worker
+
+
+def stop_audio_worker():
+    """プロセス共通のオーディオワーカーが動いていれば止める"""
+    if _audio_worker is not None:
+        _audio_worker.stop()
+
+
+class QueuedSoundSystem:
+    """CarSoundSystem と同じインターフェースで、呼び出しをオーディオスレッドに渡すラッパー"""
+
+    def __init__(self, sound_system, worker=None):
+        self.sound_system = sound_system
+        self.worker = worker if worker is not None else get_audio_worker()
+
+    def update_engine_sound(self, rpm, throttle_input, speed=0):
+        """エンジン音の更新を要求"""
+        self.worker.post(self, ENGINE, (rpm, throttle_input, speed))
+
+    def play_skid_sound(self, intensity=1.0):
+        """スキール音の再生を要求"""
+        self.worker.post(self, SKID, (intensity,))
+
+    def play_gear_sound(self):
+        """ギア音の再生を要求"""
+        self.worker.post(self, GEAR)
+
+    def stop_engine_sound(self):
+        """エンジン音の停止を要求"""
+        self.worker.post(self, STOP)
+
+    def reset(self):
+        """再生状態の初期化を要求"""
+        self.worker.post(self, RESET)
+
+    def apply_commands(self, batch):
+        """まとめたコマンドを実際のサウンドシステムに反映（オーディオスレッドから呼ばれる）
+
+        batch に残っている再生要求はどれも停止・初期化より後に積まれたものなので、停止・初期化を先に反映する。
+        """
+        sound_system = self.sound_system
+        try:
+            if RESET in batch:
+                sound_system.reset()
+            if STOP in batch:
+                sound_system.stop_engine_sound()
+            if ENGINE in batch:
+                sound_system.update_engine_sound(*batch[ENGINE])
+            if SKID in batch:
+                sound_system.play_skid_sound(*batch[SKID])
+            if GEAR in batch:
+                sound_system.play_gear_sound()
+        except Exception as e:
+            print(f"Warning: Audio worker error: {e}")
+
+    def __getattr__(self, name):
+        # その他の属性（sounds_enabled など）は元のサウンドシステムを参照
+        return getattr(self.sound_system, name)
+
+
+def create_queued_sound_system(sound_system):
+    """オーディオスレッドが使えればラップし、使えなければそのまま返す"""
+    worker = get_audio_worker()
+    if not sound_system.sounds_enabled or not worker.start():
+        return sound_system
+    return QueuedSoundSystem(sound_system, worker)
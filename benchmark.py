@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+ベンチマークスクリプト
+トラック生成・物理・描画・サウンドのホットパスを個別に計測します
+
+    python benchmark.py run -o baseline.json
+    python benchmark.py compare baseline.json            # 新たに計測して比較
+    python benchmark.py compare baseline.json current.json
+"""
+
+import os
+
+# SDLはpygame初期化時に環境変数を読むので、pygameより先に設定する
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pygame
+
+from config import GameConfig
+from input_sources import ScriptedInput
+
+BENCHMARK_SEED = 12345
+
+
+class Benchmark:
+    """1つの計測対象"""
+
+    def __init__(self, name, setup, number, rounds=5):
+        self.name = name
+        self.setup = setup  # 計測対象の関数を返すセットアップ関数
+        self.number = number  # 1ラウンドあたりの実行回数
+        self.rounds = rounds
+
+    def run(self):
+        """計測を実行して1回あたりの時間（秒）の統計を返す"""
+        random.seed(BENCHMARK_SEED)
+        operation = self.setup()
+        operation()  # ウォームアップ（キャッシュ生成など）
+
+        timings = []
+        for _ in range(self.rounds):
+            start = time.perf_counter()
+            for _ in range(self.number):
+                operation()
+            timings.append((time.perf_counter() - start) / self.number)
+
+        return {
+            "number": self.number,
+            "rounds": self.rounds,
+            "min": min(timings),
+            "median": statistics.median(timings),
+            "mean": statistics.mean(timings),
+            "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+
+
+def _make_screen():
+    return pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+
+
+def _make_car(track):
+    from realistic_rally_car import RealisticRallyCar
+
+    car = RealisticRallyCar(track)
+    car.position = pygame.math.Vector2(GameConfig.SCREEN_WIDTH // 2, GameConfig.SCREEN_HEIGHT - 100)
+    car.input_source = ScriptedInput.weave()
+    return car
+
+
+def setup_chunk_generation():
+    from advanced_track_generator import AdvancedTrackChunk
+
+    def operation():
+        AdvancedTrackChunk(0, 0.5, GameConfig.SCREEN_WIDTH // 2)
+    return operation
+
+
+def setup_tile_lookup():
+    from endless_track_advanced import AdvancedEndlessPixelTrack, EndlessTrackConfig
+
+    track = AdvancedEndlessPixelTrack()
+    start_tile_y = int(track.camera_y // EndlessTrackConfig.TILE_SIZE)
+    tiles_per_row = GameConfig.SCREEN_WIDTH // EndlessTrackConfig.TILE_SIZE
+    positions = [(x, y) for y in range(start_tile_y, start_tile_y + 40) for x in range(tiles_per_row)]
+
+    def operation():
+        for tile_x, tile_y in positions:
+            track.get_tile_at_world_pos(tile_x, tile_y)
+    return operation
+
+
+def setup_track_draw():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    screen = _make_screen()
+    track = AdvancedEndlessPixelTrack()
+
+    def operation():
+        track.draw(screen)
+    return operation
+
+
+def setup_track_draw_zoomed():
+    from endless_track_advanced import AdvancedEndlessPixelTrack, EndlessTrackConfig
+
+    screen = _make_screen()
+    track = AdvancedEndlessPixelTrack()
+    track.set_zoom_level(len(EndlessTrackConfig.ZOOM_LEVELS) - 1)
+    track.update(track.camera_y + GameConfig.SCREEN_HEIGHT // 2)
+
+    def operation():
+        track.draw(screen)
+    return operation
+
+
+def setup_car_physics():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    track = AdvancedEndlessPixelTrack()
+    car = _make_car(track)
+    start_position = pygame.math.Vector2(car.position)
+
+    def operation():
+        car.update_for_endless_mode()
+        track.update(car.position.y)
+        if car.position.y < start_position.y - 2000:
+            # トラック生成の影響を除くため、一定距離で開始位置に戻す
+            car.position.update(start_position)
+    return operation
+
+
+def setup_car_graphics():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    car = _make_car(AdvancedEndlessPixelTrack())
+    car.is_drifting = True
+    car.drift_intensity = 0.8
+
+    def operation():
+        car.direction = (car.direction + 7) % 360
+        car._update_graphics()
+    return operation
+
+
+def setup_obstacle_query():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from config import ObstacleConfig
+    from realistic_rally_car import get_body_masks
+    from realistic_car import RealisticCarRenderer
+
+    track = AdvancedEndlessPixelTrack()
+    # 車体マスク（どの向きでも）に外接する円の半径まで探す
+    masks = get_body_masks(RealisticCarRenderer().create_car_surface())
+    reach = max(max(mask.get_size()) for mask, _ in masks) / 2 + ObstacleConfig.SOLID_RADIUS
+    positions = [(x, track.camera_y + y) for y in range(0, GameConfig.SCREEN_HEIGHT, 30)
+                 for x in range(20, GameConfig.SCREEN_WIDTH, 40)]
+
+    def operation():
+        # 画面全体に散らばった400台分の周囲セルの検索と水たまり判定
+        for pos in positions:
+            track.get_solid_obstacles_near(pos, reach)
+            track.is_in_water(pos)
+    return operation
+
+
+def setup_body_collision():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from realistic_rally_car import get_body_masks
+    from realistic_car import RealisticCarRenderer
+
+    track = AdvancedEndlessPixelTrack()
+    masks = get_body_masks(RealisticCarRenderer().create_car_surface())
+    positions = [(x, track.camera_y + y) for y in range(0, GameConfig.SCREEN_HEIGHT, 30)
+                 for x in range(20, GameConfig.SCREEN_WIDTH, 40)]
+
+    def operation():
+        # 画面全体に散らばった400台分の、向きごとの車体マスクでの当たり判定
+        for index, (x, y) in enumerate(positions):
+            mask = masks[index % len(masks)][0]
+            width, height = mask.get_size()
+            track.check_body_collision(mask, (x - width / 2, y - height / 2))
+    return operation
+
+
+def setup_tachometer_draw():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from tachometer import Tachometer
+
+    screen = _make_screen()
+    car = _make_car(AdvancedEndlessPixelTrack())
+    car.velocity = pygame.math.Vector2(0, -6)
+    car.current_gear = 3
+    tachometer = Tachometer(120, GameConfig.SCREEN_HEIGHT - 120)
+
+    def operation():
+        tachometer.draw(screen, car)
+    return operation
+
+
+def setup_hud_draw():
+    from endless_game import EndlessGameUI
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    screen = _make_screen()
+    track = AdvancedEndlessPixelTrack()
+    car = _make_car(track)
+    car.velocity = pygame.math.Vector2(0, -6)
+    ui = EndlessGameUI()
+
+    def operation():
+        ui.draw_endless_hud(screen, car, track, False, 1234, "")
+    return operation
+
+
+def setup_particles():
+    from config import ParticleConfig
+    from particles import ParticleSystem
+
+    screen = _make_screen()
+    particles = ParticleSystem(seed=BENCHMARK_SEED)
+
+    def operation():
+        # 上限まで埋まった状態で放出・更新・描画
+        particles.emit(ParticleConfig.DUST, 40, (400.0, 300.0), (0.0, 2.0), 1.0)
+        particles.emit(ParticleConfig.GRAVEL, 40, (400.0, 300.0), (1.0, 2.0), 1.0)
+        particles.update()
+        particles.draw(screen, 0)
+    return operation
+
+
+def setup_sound_generation():
+    from sound_bank import SoundBank, default_sound_specs
+
+    pygame.mixer.init()
+    sample_rate, _, channels = pygame.mixer.get_init()
+
+    def operation():
+        # ディスクキャッシュを使わずに全サウンドを合成
+        SoundBank(default_sound_specs(), sample_rate, channels)._prepare()
+    return operation
+
+
+def setup_sound_generation_array():
+    from sound_bank import SoundBank, default_sound_specs
+
+    pygame.mixer.init()
+    sample_rate, _, channels = pygame.mixer.get_init()
+
+    def operation():
+        # Web版と同じNumPyを使わない合成経路
+        SoundBank(default_sound_specs(), sample_rate, channels, backend="array")._prepare()
+    return operation
+
+
+def setup_sound_system_init():
+    from realistic_car import CarSoundSystem
+
+    pygame.mixer.init()
+    CarSoundSystem().sound_bank.wait()
+
+    def operation():
+        # 合成済みのバンクを共有する2台目以降の初期化
+        CarSoundSystem()
+    return operation
+
+
+def setup_engine_audio_update():
+    from realistic_car import CarSoundSystem
+
+    pygame.mixer.init()
+    sound_system = CarSoundSystem()
+    sound_system.sound_bank.wait()
+    rpms = [800 + (i * 37) % 7200 for i in range(240)]
+
+    def operation():
+        # 1秒分（60フレーム×4）のRPM変化に追従
+        for rpm in rpms:
+            sound_system.update_engine_sound(rpm, 1.0, 5.0)
+    return operation
+
+
+def setup_full_frame():
+    from endless_game import EndlessRallyGame
+
+    _make_screen()
+    game = EndlessRallyGame()
+    game.car.input_source = ScriptedInput.weave()
+    game.fps_limit = 0
+
+    def operation():
+        if game.game_over:
+            game.restart()
+            game.car.input_source = ScriptedInput.weave()
+        game.run(max_frames=game.frame_count + 1)
+    return operation
+
+
+def setup_restart():
+    from endless_game import EndlessRallyGame
+
+    _make_screen()
+    game = EndlessRallyGame()
+    game.fps_limit = 0
+
+    def operation():
+        # リスタート直後の1フレーム目まで
+        game.restart()
+        game.run(max_frames=game.frame_count + 1)
+    return operation
+
+
+def setup_split_screen_frame():
+    from split_screen_game import SplitScreenRallyGame
+
+    _make_screen()
+    game = SplitScreenRallyGame()
+    game.fps_limit = 0
+
+    def start():
+        for player in game.players:
+            player.car.input_source = ScriptedInput.weave()
+    start()
+
+    def operation():
+        # 2台分の更新と左右2画面の描画
+        if game.game_over:
+            game.restart()
+            start()
+        game.run(max_frames=game.frame_count + 1)
+    return operation
+
+
+def setup_ai_opponents():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from ai_driver import OpponentField
+
+    _make_screen()
+    track = AdvancedEndlessPixelTrack()
+    field = OpponentField(track, 8)
+
+    def operation():
+        # 8台の判断（まとめて）・物理・スプライト更新（カメラは最後尾の車を追う）
+        if field.get_lead_y() is None:
+            field.reset()
+        track.update(max(car.position.y for car in field.cars), 0)
+        field.update(float("inf"))
+    return operation
+
+
+def setup_full_frame_opponents():
+    from endless_game import EndlessRallyGame
+
+    _make_screen()
+    game = EndlessRallyGame(opponents=8)
+    game.car.input_source = ScriptedInput.weave()
+    game.fps_limit = 0
+
+    def operation():
+        if game.game_over:
+            game.restart()
+            game.car.input_source = ScriptedInput.weave()
+        game.run(max_frames=game.frame_count + 1)
+    return operation
+
+
+def setup_net_snapshot():
+    from net_protocol import DeltaEncoder, DeltaDecoder, encode_snapshot, decode_snapshot
+
+    encoder = DeltaEncoder()
+    decoder = DeltaDecoder()
+    tick = [0]
+
+    def operation():
+        # 8台が走っている1ティック分のスナップショットの量子化差分の作成と適用
+        t = tick[0]
+        states = {player_id: (3200 + player_id * 40 + t % 17, 4000 - t * 45 - player_id * 300,
+                              (t * 90 + player_id * 1000) % 65536, 3, 550 + player_id)
+                  for player_id in range(8)}
+        body = encode_snapshot(encoder, t, states)
+        decode_snapshot(decoder, body)
+        tick[0] = t + 1
+    return operation
+
+
+def _make_track_pack(distance):
+    """ベンチマーク用のトラックパックを一時ディレクトリに書き出してパスを返す"""
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from track_pack import export_track_pack
+
+    path = os.path.join(tempfile.gettempdir(), f"benchmark_{BENCHMARK_SEED}_{distance}.qrtp")
+    export_track_pack(AdvancedEndlessPixelTrack(BENCHMARK_SEED), path, distance)
+    return path
+
+
+def setup_track_pack_load():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from track_pack import TrackPack
+
+    path = _make_track_pack(100000)
+
+    def operation():
+        # 100kmのステージを開いて、スタート地点のチャンクを読み込んだトラックを作る
+        pack = TrackPack(path)
+        AdvancedEndlessPixelTrack(pack.stage_seed, pack)
+        pack.close()
+    return operation
+
+
+def setup_track_pack_chunk():
+    from track_pack import TrackPack
+
+    pack = TrackPack(_make_track_pack(100000))
+    y_offsets = [pack.load_chunk(random.randrange(pack.chunk_count)).y_offset for _ in range(200)]
+    position = [0]
+
+    def operation():
+        # インデックスの二分探索と行レコードからのチャンク作成
+        pack.get_chunk_at(y_offsets[position[0] % len(y_offsets)])
+        position[0] += 1
+    return operation
+
+
+def _get_window_at(distance):
+    """スタートから distance m 先を走っているときのトラックの (原点, 最も下のチャンク, 最も上のチャンク)"""
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    track = AdvancedEndlessPixelTrack(BENCHMARK_SEED)
+    lead_y = GameConfig.SCREEN_HEIGHT - 100 - distance * 10
+    track.camera.reset(lead_y)
+    track.update_chunks()
+    track.rebase(track.get_rebase_shift(lead_y))
+    return (track.origin_y, *track.get_window())
+
+
+def setup_resume_window():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+
+    origin_y, bottom, top = _get_window_at(10000)
+
+    def operation():
+        # 途中保存からの再開・削除済みより前へのリウィンド（10km先の範囲をステージシードから作り直す）
+        track = AdvancedEndlessPixelTrack(BENCHMARK_SEED)
+        track.restore_window(BENCHMARK_SEED, origin_y, bottom, top)
+    return operation
+
+
+def setup_snapshot_capture():
+    from endless_game import EndlessRallyGame
+
+    _make_screen()
+    game = EndlessRallyGame(opponents=4)
+    game.car.input_source = ScriptedInput.weave()
+    game.fps_limit = 0
+    game.run(max_frames=120)
+
+    def operation():
+        # リウィンド用リングバッファへの1回分の書き込み
+        game.snapshots.capture(game)
+    return operation
+
+
+def setup_autopilot():
+    from endless_track_advanced import AdvancedEndlessPixelTrack
+    from input_sources import AutopilotInput
+
+    track = AdvancedEndlessPixelTrack()
+    car = _make_car(track)
+    car.position = pygame.math.Vector2(track.get_start_position())
+    autopilot = AutopilotInput(car)
+
+    def operation():
+        # 1フレーム分の判断（前方の行の読み取り、目標速度、ステアリングとシフト）
+        autopilot.read()
+    return operation
+
+
+BENCHMARKS = [
+    Benchmark("track_chunk_generation", setup_chunk_generation, number=200),
+    Benchmark("tile_lookup_2000", setup_tile_lookup, number=20),
+    Benchmark("track_draw", setup_track_draw, number=20),
+    Benchmark("track_draw_zoomed", setup_track_draw_zoomed, number=20),
+    Benchmark("obstacle_query_400", setup_obstacle_query, number=20),
+    Benchmark("body_collision_400", setup_body_collision, number=20),
+    Benchmark("car_update_for_endless_mode", setup_car_physics, number=500),
+    Benchmark("car_update_graphics", setup_car_graphics, number=500),
+    Benchmark("tachometer_draw", setup_tachometer_draw, number=200),
+    Benchmark("hud_draw", setup_hud_draw, number=200),
+    Benchmark("particles_full_pool", setup_particles, number=200),
+    Benchmark("sound_generation", setup_sound_generation, number=1, rounds=3),
+    Benchmark("sound_generation_array", setup_sound_generation_array, number=1, rounds=1),
+    Benchmark("sound_system_init", setup_sound_system_init, number=20),
+    Benchmark("engine_audio_update_240", setup_engine_audio_update, number=20),
+    Benchmark("full_frame_scripted", setup_full_frame, number=60),
+    Benchmark("restart_game", setup_restart, number=20),
+    Benchmark("split_screen_frame", setup_split_screen_frame, number=60),
+    Benchmark("net_snapshot_8_cars", setup_net_snapshot, number=1000),
+    Benchmark("ai_opponents_8", setup_ai_opponents, number=200),
+    Benchmark("full_frame_8_opponents", setup_full_frame_opponents, number=60),
+    Benchmark("track_pack_load_100km", setup_track_pack_load, number=20),
+    Benchmark("track_pack_chunk_fetch", setup_track_pack_chunk, number=1000),
+    Benchmark("resume_window_10km", setup_resume_window, number=5),
+    Benchmark("snapshot_capture_4_opponents", setup_snapshot_capture, number=1000),
+    Benchmark("autopilot_read", setup_autopilot, number=1000),
+]
+
+
+def machine_info():
+    """実行環境の情報"""
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "pygame": pygame.version.ver,
+        "sdl": ".".join(str(v) for v in pygame.get_sdl_version()),
+        "numpy": numpy_version,
+        "video_driver": os.environ.get("SDL_VIDEODRIVER"),
+        "audio_driver": os.environ.get("SDL_AUDIODRIVER"),
+    }
+
+
+def run_benchmarks(name_filter=None):
+    """全ベンチマークを実行"""
+    pygame.init()
+    _make_screen()
+
+    results = {}
+    for benchmark in BENCHMARKS:
+        if name_filter and name_filter not in benchmark.name:
+            continue
+        stats = benchmark.run()
+        results[benchmark.name] = stats
+        print(f"{benchmark.name:32s} {stats['median'] * 1000:10.4f} ms  "
+              f"(min {stats['min'] * 1000:.4f} ms, {benchmark.rounds}x{benchmark.number})")
+
+    pygame.quit()
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "machine": machine_info(),
+        "benchmarks": results,
+    }
+
+
+def compare_results(baseline, current, threshold, metric="median"):
+    """ベースラインと比較して、閾値を超えて遅くなったベンチマークを返す"""
+    regressions = []
+    print(f"{'benchmark':32s} {'baseline':>12s} {'current':>12s} {'change':>9s}")
+    for name, base_stats in baseline["benchmarks"].items():
+        if name not in current["benchmarks"]:
+            print(f"{name:32s} {'(missing)':>12s}")
+            continue
+        base_time = base_stats[metric]
+        current_time = current["benchmarks"][name][metric]
+        change = (current_time - base_time) / base_time if base_time > 0 else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:32s} {base_time * 1000:10.4f}ms {current_time * 1000:10.4f}ms {change:+8.1%}{flag}")
+
+    if baseline.get("machine") != current.get("machine"):
+        print("Note: baseline was recorded on a different machine or environment")
+    return regressions
+
+
+def _load(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save(results, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {path}")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally benchmark suite")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("-o", "--output", help="write results to this JSON file")
+    run_parser.add_argument("-k", "--filter", help="only run benchmarks whose name contains this string")
+
+    compare_parser = subparsers.add_parser("compare", help="compare results against a saved baseline")
+    compare_parser.add_argument("baseline", help="baseline results JSON")
+    compare_parser.add_argument("current", nargs="?", help="current results JSON (runs the suite if omitted)")
+    compare_parser.add_argument("-o", "--output", help="write fresh results to this JSON file")
+    compare_parser.add_argument("-t", "--threshold", type=float, default=0.10,
+                                help="relative slowdown flagged as a regression (default: 0.10)")
+    compare_parser.add_argument("--metric", choices=("min", "median", "mean"), default="median")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run_benchmarks(args.filter)
+        if args.output:
+            _save(results, args.output)
+        return 0
+
+    baseline = _load(args.baseline)
+    if args.current:
+        current = _load(args.current)
+    else:
+        current = run_benchmarks()
+        if args.output:
+            _save(current, args.output)
+        print()
+
+    regressions = compare_results(baseline, current, args.threshold, args.metric)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
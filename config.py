@@ -1,3 +1,5 @@
+import os
+
 # ゲーム設定
 class GameConfig:
     SCREEN_WIDTH = 800
@@ -11,6 +13,10 @@ class GameConfig:
     RED = (255, 0, 0)
     BLUE = (0, 0, 255)
     YELLOW = (255, 255, 0)
+    
+    # 車体の色（CPUの対戦相手とネットワーク対戦の他のプレイヤー）
+    CAR_COLORS = ((40, 90, 210), (230, 200, 40), (40, 170, 80), (230, 120, 30),
+                  (150, 60, 190), (40, 190, 200), (235, 235, 235), (90, 90, 90))
 
 # 車両設定
 class CarConfig:
@@ -32,3 +38,186 @@ class CarConfig:
         5: {"max_speed": 9.8, "base_acceleration": 0.045, "min_speed": 6.8},  # 5速: 高速域は時間をかけて
         6: {"max_speed": 11.0, "base_acceleration": 0.035, "min_speed": 8.5}  # 6速: 最高速は徐々に
     }
+    
+    # 路面タイプ別のグリップ係数（LATERAL_GRIP に掛ける、表に無い路面は1.0）
+    SURFACE_GRIP = {
+        "gravel": 0.8,   # グラベル：少し滑りやすい
+        "dirt": 0.7,     # ダート：滑りやすい
+        "tarmac": 1.2,   # ターマック：グリップ良好
+        "mud": 0.5,      # 泥：非常に滑りやすい
+    }
+    
+    # 路面タイプ別の摩擦係数（BASE_DECELERATION と転がり抵抗に掛ける）
+    SURFACE_FRICTION = {
+        "gravel": 0.9,   # グラベル：少し摩擦が少ない
+        "dirt": 0.7,     # ダート：摩擦が少ない（滑りやすい）
+        "tarmac": 1.3,   # ターマック：摩擦が大きい
+        "mud": 0.4,      # 泥：摩擦が非常に少ない
+    }
+
+# 砂利・土煙パーティクル（particles.ParticleSystem）
+class ParticleConfig:
+    MAX_PARTICLES = 600  # 同時に存在できるパーティクルの上限
+    FADE_LEVELS = 4  # 寿命に応じたフェード段階数（スプライトの事前描画数）
+    MIN_EMIT_SPEED = 1.0  # これ以下の速度では放出しない
+    LAZY_INIT = False  # True なら配列の確保（とNumPyの読み込み）を prepare() か最初の放出まで遅らせる
+    SCALED_SPRITE_CACHE_SIZE = 8  # ズーム倍率ごとのスプライトを残す数（分割画面では2つのカメラの倍率）
+    
+    # 粒子の種類
+    GRAVEL = 0
+    DUST = 1
+    SMOKE = 2
+    MUD = 3
+    GRASS = 4
+    
+    # 種類ごとのパラメータ
+    KINDS = {
+        GRAVEL: {"color": (120, 100, 80), "size": 2, "life": (12, 24), "speed": 0.6, "drag": 0.86},
+        DUST: {"color": (190, 160, 120), "size": 5, "life": (30, 50), "speed": 0.25, "drag": 0.93},
+        SMOKE: {"color": (210, 210, 210), "size": 6, "life": (25, 40), "speed": 0.15, "drag": 0.95},
+        MUD: {"color": (80, 52, 25), "size": 3, "life": (14, 26), "speed": 0.5, "drag": 0.88},
+        GRASS: {"color": (40, 110, 30), "size": 2, "life": (10, 18), "speed": 0.4, "drag": 0.88},
+    }
+    
+    # 路面ごとの放出内容（種類, 1フレームあたりの最大放出数）
+    SURFACE_EMISSION = {
+        "gravel": ((GRAVEL, 3.0), (DUST, 1.0)),
+        "dirt": ((DUST, 2.5), (GRAVEL, 1.0)),
+        "tarmac": ((SMOKE, 1.2),),
+        "mud": ((MUD, 3.0),),
+        "grass": ((GRASS, 2.0), (DUST, 0.5)),
+    }
+
+# 自動運転（トラックの中心線を追う入力ソース、input_sources.AutopilotInput）
+class AutopilotConfig:
+    LOOKAHEAD_BASE = 40  # ステアリングの目標点までの距離（ピクセル）
+    LOOKAHEAD_PER_SPEED = 6  # 速度1あたりに延ばす距離
+    STEER_GAIN = 1.5  # 向きの誤差1度あたりの目標舵角
+    STEER_DEADBAND = 2.0  # 目標舵角との差がこれ以下ならハンドルを戻す
+    
+    # 目標速度（この先の中心線の曲がり具合とトラック幅から決める）
+    PREVIEW_STEP = 48  # 中心線を調べる間隔（ピクセル）
+    PREVIEW_POINTS = 8  # 調べる点の数
+    LATERAL_ACCEL = 0.35  # 曲率から目標速度を決める横加速度の上限
+    MIN_TARGET_SPEED = 2.5
+    MAX_TARGET_SPEED = 11.0
+    NARROW_WIDTH = 64  # これより狭い区間は幅に比例して目標速度を下げる（ピクセル）
+    
+    # ギア（CarConfig.GEAR_RATIOS の速度帯で選ぶ）
+    SHIFT_UP_RATIO = 0.95  # 今のギアの最高速度のこの割合を超えたらシフトアップ
+    SHIFT_DOWN_EFFICIENCY = 0.8  # トルク効率がこれを下回ったらシフトダウン
+    SHIFT_INTERVAL = 8  # シフトの間隔の最小フレーム数
+
+# CPUの対戦相手（ai_driver.OpponentField、レーシングラインとNumPyでまとめた判断）
+class AIConfig:
+    DECISION_INTERVAL = 2  # 全台の操作をまとめて決める間隔（フレーム）
+    
+    # レーシングライン
+    LINE_SMOOTHING = 7  # 中心線を平滑化する幅（行数、奇数）
+    EDGE_MARGIN = 22  # コース端からの余裕（ピクセル）
+    LATERAL_ACCEL = 0.5  # 目標速度を決める横加速度の上限（ピクセル/フレーム²）
+    MIN_TARGET_SPEED = 3.0
+    MAX_TARGET_SPEED = 11.0
+    
+    # 操作
+    LOOKAHEAD_BASE = 36  # 目標点までの距離（ピクセル）
+    LOOKAHEAD_PER_SPEED = 7  # 速度1あたりに延ばす距離
+    SPEED_PREVIEW = (0, 64, 128, 192, 256, 320)  # 目標速度を確認する先の距離（ブレーキが弱いので遠くまで見る）
+    STEER_GAIN = 1.5  # 向きの誤差1度あたりの目標舵角
+    STEER_DEADBAND = 2.0  # 目標舵角との差がこれ以下ならハンドルを戻す
+    SKILL_SPREAD = 0.12  # 台ごとの目標速度の倍率のばらつき（先頭の車が1.0）
+    
+    # スタートグリッド（プレイヤーの前に2列）
+    GRID_ROW_SPACING = 44
+    GRID_COLUMN_OFFSET = 16
+
+# 障害物・ハザード設定（トラック脇の木・岩・水たまりと、トラック上の泥）
+class ObstacleConfig:
+    EDGE_CLEARANCE = 24  # トラック端から障害物を置くタイルの中心までの最短距離（ピクセル）
+    BORDER_DEPTH = 64  # トラック脇の障害物が多い帯の幅（ピクセル）
+    BORDER_DENSITY = 0.12  # 帯のタイルに障害物を置く確率（難易度0）
+    BORDER_DENSITY_PER_DIFFICULTY = 0.18  # 難易度1で増える確率
+    SCENERY_DENSITY = 0.03  # 帯より外のタイルに木を置く確率
+    ROCK_SHARE = 0.35  # 帯の障害物のうち岩の割合
+    WATER_SHARE = 0.1  # 帯の障害物のうち水たまりの割合
+    MUD_PATCH_CHANCE = 0.15  # チャンクに泥の区間を置く確率（難易度0）
+    MUD_PATCH_CHANCE_PER_DIFFICULTY = 0.35
+    MUD_PATCH_RADIUS = (1, 2)  # 泥の区間の半径（タイル）
+    
+    # 当たり判定（木・岩はタイル中心の円）
+    SOLID_RADIUS = 6  # 木・岩の半径（ピクセル）
+    BOUNCE = 0.3  # ぶつかったときの跳ね返り係数
+    IMPACT_SPEED_LOSS = 0.6  # ぶつかったときに残る速度の割合
+    WATER_DRAG = 0.9  # 水たまりの中で毎フレーム残る速度の割合
+
+# 車体の当たり判定（車体の形のマスクとチャンクごとのマスクの重なりで判定）
+class CollisionConfig:
+    MASK_ANGLE_STEP = 3  # 車体マスクを用意する向きの刻み（度）
+    OFF_TRACK_DRAG = 0.05  # 車体全体がトラック外のときに毎フレーム失う速度の割合（はみ出した割合に比例）
+    OFF_TRACK_RATIO = 0.5  # 車体のこの割合を超えてはみ出したらトラック外（ゲームオーバー判定・スイープの集計）
+
+# 走行状態のスナップショット（リウィンドと途中保存）
+class SnapshotConfig:
+    INTERVAL = 6  # スナップショットを取る間隔（フレーム）
+    CAPACITY = 100  # リングバッファに残す数（INTERVAL × CAPACITY フレーム分）
+    REWIND_FRAMES = 180  # 1回のリウィンドで戻るフレーム数
+    SAVE_PATH = os.path.join("saves", "quicksave.qrsv")  # F5 で保存する先
+
+# 走行のリプレイ（ステージシードとフレームごとの操作、replays.py）
+class ReplayConfig:
+    DIRECTORY = "replays"  # --record で保存する先
+    VIDEO_FPS = 60  # 書き出す動画のフレームレート（ゲームの1フレームが動画の1フレーム）
+    DISTANCE_TOLERANCE = 0.5  # 検証で再現した進行距離と記録の差の許容量（m、浮動小数点の環境差の分）
+
+# サウンド設定
+class AudioConfig:
+    SAMPLE_RATE = 22050
+    BUFFER_SIZE = 512
+    
+    # 合成済みサウンドのディスクキャッシュ
+    USE_DISK_CACHE = True
+    SOUND_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+                                   "amazon-q-rally")
+    BACKGROUND_SYNTHESIS = True  # 別スレッドで合成（最初のフレームを待たせない）
+    INCREMENTAL_SYNTHESIS_BUDGET = 0.004  # スレッドが使えない環境で1フレームに合成へ使う時間（秒）
+    # 合成方式: "auto"（NumPyがあれば使う）、"numpy"、"array"（標準ライブラリのみ・Web版向け）
+    SYNTH_BACKEND = "auto"
+    
+    # ミキサー操作をオーディオスレッドで行う（ゲームループはキューに積むだけ）
+    USE_AUDIO_THREAD = True
+    AUDIO_THREAD_TICK = 0.004  # キューを処理する最短の間隔（秒、キューが空の間はコマンドが積まれるまで待つ）
+    
+    # エンジン音モード: "crossfade"（密なRPMウェーブテーブルを2チャンネルでクロスフェード）
+    #                  "nearest"（8段階のループから最も近いものを1チャンネルで再生）
+    ENGINE_AUDIO_MODE = "crossfade"
+    ENGINE_WAVETABLE_MIN_RPM = 750
+    ENGINE_WAVETABLE_MAX_RPM = 8000
+    ENGINE_WAVETABLE_RPM_STEP = 250
+    ENGINE_LOOP_DURATION = 0.25  # ウェーブテーブル1ループの長さ（秒、基本波の整数周期に丸める）
+    CROSSFADE_STEPS = 8  # クロスフェード比の量子化段階数
+    VOLUME_STEPS = 16  # 音量の量子化段階数
+    
+    # ミキサーチャンネル割り当て（Sound.play() が使わないよう予約する）
+    ENGINE_CHANNELS = (0, 2)
+    SKID_CHANNEL = 1
+    RESERVED_CHANNELS = 3
+
+# ネットワーク対戦設定（LAN用の asyncio サーバー）
+class NetworkConfig:
+    DEFAULT_HOST = "127.0.0.1"
+    DEFAULT_PORT = 47800
+    MAX_PLAYERS = 8
+    TICK_RATE = 20  # サーバーが状態を配信する回数（毎秒）
+    CONNECT_TIMEOUT = 3.0  # 接続・参加応答を待つ時間（秒）
+    MAX_WRITE_BUFFER = 64 * 1024  # サーバーの送信待ちがこれを超えたクライアントは切断する（受信が止まった相手、バイト）
+    
+    # 状態の量子化
+    POSITION_SCALE = 8  # 1/8ピクセル単位
+    HEADING_STEPS = 65536  # 1周を16ビットで表す
+    SPEED_SCALE = 100  # 0.01単位
+    
+    # リモートの車の補間
+    INTERPOLATION_DELAY = 0.1  # この時間だけ遅らせて受信済みの2状態の間を補間（秒）
+    MAX_EXTRAPOLATION = 0.25  # 受信が途切れたときに外挿する最長時間（秒）
+    
+    STATS_INTERVAL = 5.0  # サーバーが通信量・処理時間を表示する間隔（秒）
@@ -1,6 +1,7 @@
 import pygame
 import math
 from config import GameConfig
+from ui import get_font
 
 class DeathLine:
     """後ろから迫ってくるゲームオーバーライン"""
@@ -48,19 +49,21 @@ class DeathLine:
             # 安全状態
             self.warning_alpha = 0
     
-    def draw(self, screen, camera_y):
+    def draw(self, screen, camera_y, zoom=1.0):
         """デスラインの描画"""
         # 画面座標でのライン位置
-        screen_y = self.y_position - camera_y
+        screen_y = (self.y_position - camera_y) * zoom
+        # 描画先の大きさ（分割画面ではプレイヤーごとの表示領域）
+        width, height = screen.get_size()
         
         # ラインが画面内にある場合のみ描画
-        if -50 <= screen_y <= GameConfig.SCREEN_HEIGHT + 50:
+        if -50 <= screen_y <= height + 50:
             # メインのデスライン（赤い線）
             pygame.draw.line(screen, (255, 0, 0), 
-                           (0, screen_y), (GameConfig.SCREEN_WIDTH, screen_y), 4)
+                           (0, screen_y), (width, screen_y), 4)
             
             # ライン上の装飾（危険マーク）
-            for x in range(0, GameConfig.SCREEN_WIDTH, 40):
+            for x in range(0, width, 40):
                 # 三角形の危険マーク
                 points = [
                     (x + 20, screen_y - 8),
@@ -82,22 +85,27 @@ class DeathLine:
         # 画面端に静的な警告バーを表示
         edge_width = 8
         warning_color = (255, 100, 100) if self.warning_alpha > 75 else (255, 200, 100)
+        width, height = screen.get_size()
         
         # 左右の端
         pygame.draw.rect(screen, warning_color, 
-                        (0, 0, edge_width, GameConfig.SCREEN_HEIGHT))
+                        (0, 0, edge_width, height))
         pygame.draw.rect(screen, warning_color, 
-                        (GameConfig.SCREEN_WIDTH - edge_width, 0, edge_width, GameConfig.SCREEN_HEIGHT))
+                        (width - edge_width, 0, edge_width, height))
         
         # 上下の端（薄く）
         top_bottom_alpha = self.warning_alpha // 2
         if top_bottom_alpha > 0:
-            warning_surface = pygame.Surface((GameConfig.SCREEN_WIDTH, edge_width))
+            warning_surface = pygame.Surface((width, edge_width))
             warning_surface.set_alpha(top_bottom_alpha)
             warning_surface.fill(warning_color)
             
             screen.blit(warning_surface, (0, 0))  # 上端
-            screen.blit(warning_surface, (0, GameConfig.SCREEN_HEIGHT - edge_width))  # 下端
+            screen.blit(warning_surface, (0, height - edge_width))  # 下端
+    
+    def rebase(self, shift_y):
+        """ワールド座標を shift_y だけ下にずらす（トラックの原点の移動に合わせる）"""
+        self.y_position += shift_y
     
     def check_collision(self, car_position):
         """車との衝突判定"""
@@ -130,10 +138,14 @@ class DeathLineUI:
     """デスライン関連のUI表示"""
     
     def __init__(self):
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.font = get_font(36)
+        self.small_font = get_font(24)
         self.last_distance_ratio = 1.0  # 滑らかなアニメーション用
     
+    def reset(self):
+        """表示アニメーションをリセット"""
+        self.last_distance_ratio = 1.0
+    
     def draw_death_line_info(self, screen, death_line, car_position):
         """デスライン情報の表示"""
         distance = death_line.get_distance_to_car(car_position)
@@ -162,7 +174,7 @@ class DeathLineUI:
     
     def _draw_distance_bar(self, screen, current_distance, max_distance):
         """距離バーの描画（滑らかなアニメーション）"""
-        bar_x = GameConfig.SCREEN_WIDTH - 50
+        bar_x = screen.get_width() - 50
         bar_y = 50
         bar_width = 20
         bar_height = 200
@@ -1,143 +1,482 @@
+import os
 import pygame
+import random
 import sys
-from config import GameConfig
+from config import GameConfig, SnapshotConfig, ReplayConfig
 from realistic_rally_car import RealisticRallyCar
 from ui import GameUI
 from endless_track_advanced import AdvancedEndlessPixelTrack  # 元に戻す
 from death_line import DeathLine, DeathLineUI
 from tachometer import Tachometer
+from frame_profiler import FrameProfiler
+from particles import ParticleSystem
+from realistic_car import init_audio
+from startup_timer import StartupTimer
+from net_client import RemoteCarRenderer
+from ai_driver import OpponentField
+from snapshots import SnapshotRing, get_record_size, restore, save_run, load_run
+from input_sources import RecordingInput
+from replays import Replay, get_file_name
 
 class EndlessRallyGame:
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
-        pygame.display.set_caption("Endless Rally Game - Realistic Edition")
+    # プロファイル開始キー
+    PROFILE_KEY = pygame.K_F9
+    # リウィンド・途中保存のキー
+    REWIND_KEY = pygame.K_BACKSPACE
+    SAVE_KEY = pygame.K_F5
+    
+    def __init__(self, screen=None, profiler=None, startup_timer=None, network=None, opponents=0, track_pack=None,
+                 stage_seed=None):
+        for _ in self._init_steps(screen, profiler, startup_timer, network, opponents, track_pack, stage_seed):
+            pass
+    
+    @classmethod
+    def create_steps(cls, *args, **kwargs):
+        """ゲームを段階に分けて作るジェネレータ（引数はコンストラクタと同じ、作ったゲームを返す）
+        
+        段階（オーディオ・トラック・車・対戦相手・UI）の間で yield するので、
+        タイトル画面の1フレームに1段階ずつ進められる。
+        """
+        game = cls.__new__(cls)
+        yield from game._init_steps(*args, **kwargs)
+        return game
+    
+    def _init_steps(self, screen=None, profiler=None, startup_timer=None, network=None, opponents=0, track_pack=None,
+                    stage_seed=None):
+        """コンストラクタの本体（段階の間で yield）"""
+        # 起動時間の計測（main.py の --startup-profile で表示）
+        self.startup_timer = startup_timer if startup_timer is not None else StartupTimer()
+        timer = self.startup_timer
+        
+        if screen is None:
+            with timer.phase("display"):
+                pygame.init()
+                screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+                pygame.display.set_caption("Endless Rally Game - Realistic Edition")
+        # 呼び出し側（Web版など）が用意した画面にも描画できる
+        self.screen = screen
         self.clock = pygame.time.Clock()
         
+        with timer.phase("audio"):
+            init_audio()
+        yield
+        
+        # ネットワーク対戦（接続済みの NetworkClient、トラックはサーバーのステージシードから生成）
+        self.network = network
+        self.remote_car_renderer = RemoteCarRenderer() if network is not None else None
+        if network is not None:
+            stage_seed = network.stage_seed
+        
+        # 保存済みのステージ（全員が同じトラックを走る必要があるネットワーク対戦では使わない）
+        if network is not None:
+            track_pack = None
+        if track_pack is not None:
+            stage_seed = track_pack.stage_seed
+        # 指定が無ければステージシードを乱数で決める（リウィンド・途中保存からトラックを作り直せるように）
+        self.random_stage = stage_seed is None
+        if self.random_stage:
+            stage_seed = random.getrandbits(32)
+        
         # 高度なエンドレストラック作成
-        self.track = AdvancedEndlessPixelTrack()
+        with timer.phase("track generation"):
+            self.track = AdvancedEndlessPixelTrack(stage_seed, track_pack)
+        yield
         
         # リアルな車両作成
-        self.car = RealisticRallyCar(self.track)
-        # 車を画面の下部に配置
-        self.car.position = pygame.math.Vector2(GameConfig.SCREEN_WIDTH // 2, GameConfig.SCREEN_HEIGHT - 100)
-        self.car.rect.center = self.car.position
+        with timer.phase("car and sprites"):
+            self.car = RealisticRallyCar(self.track)
+            # 車を画面の下部のトラック上に配置（スタート地点はトラックの中心からずれていることがある）
+            self.car.position = pygame.math.Vector2(self.track.get_start_position())
+            self.car.rect.center = self.car.position
+            
+            self.all_sprites = pygame.sprite.Group()
+            self.all_sprites.add(self.car)
+        yield
         
-        self.all_sprites = pygame.sprite.Group()
-        self.all_sprites.add(self.car)
+        # CPUの対戦相手（プレイヤーの前のグリッドに並ぶ）
+        self.opponents = None
+        if opponents > 0:
+            with timer.phase("ai opponents"):
+                self.opponents = OpponentField(self.track, opponents)
+        
+        # リウィンド用のスナップショット（他のプレイヤーがいるネットワーク対戦では使わない）
+        self.snapshots = None
+        if network is None:
+            car_count = 1 + (len(self.opponents.cars) if self.opponents is not None else 0)
+            self.snapshots = SnapshotRing(get_record_size(car_count))
+        yield
         
         # デスライン作成
         self.death_line = DeathLine()
         self.death_line.reset(self.car.position)
         
-        # タコメーター作成（左下に配置）
-        self.tachometer = Tachometer(120, GameConfig.SCREEN_HEIGHT - 120)
+        # 砂利・土煙パーティクル
+        with timer.phase("particles"):
+            self.particles = ParticleSystem()
+        yield
         
-        self.ui = EndlessGameUI()
-        self.death_line_ui = DeathLineUI()
+        with timer.phase("ui and fonts"):
+            # タコメーター作成（左下に配置）
+            self.tachometer = Tachometer(120, GameConfig.SCREEN_HEIGHT - 120)
+            
+            self.ui = EndlessGameUI()
+            self.ui.show_rewind_help = self.snapshots is not None
+            self.death_line_ui = DeathLineUI()
         
         # ゲーム状態
         self.game_over = False
         self.game_over_reason = ""
         self.best_distance = 0
+        
+        # プロファイラ（F9で次のNフレームを計測）
+        self.profiler = profiler if profiler is not None else FrameProfiler()
+        self.profile_start_frame = None  # 指定フレームで自動計測開始
+        self.fps_limit = GameConfig.FPS  # 0でフレームレート制限なし（ヘッドレス用）
+        self.startup_report = False  # Trueなら最初のフレームの後に起動時間を表示
+        self.frame_count = 0
+        
+        # run_frame() の結果（False になったらループ終了）
+        self.running = True
+        self.quit_to_menu = False
+        
+        # 走行のリプレイ記録（start_recording() で開始）
+        self.replay_dir = None
+        self.recording = None  # 今の走行の操作を記録している RecordingInput
+        self.recording_start = 0  # 今の走行を始めたフレーム番号
+        self.recording_saved = False
     
-    def run(self):
+    def run(self, max_frames=None):
         """メインゲームループ"""
-        running = True
-        quit_to_menu = False
-        
-        while running:
-            # イベント処理
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                    quit_to_menu = False  # アプリケーション終了
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r and self.game_over:
-                        self._restart_game()
-                    elif event.key == pygame.K_m and self.game_over:
-                        running = False
-                        quit_to_menu = True  # メニューに戻る
-                    elif event.key == pygame.K_ESCAPE:
-                        running = False
-                        quit_to_menu = True  # メニューに戻る
+        self.running = True
+        self.quit_to_menu = False
+        
+        while self.running:
+            if self.frame_count == self.profile_start_frame:
+                self.profiler.request()
+            self.profiler.begin_frame()
             
-            if not self.game_over:
-                # 更新
-                self.car.update_for_endless_mode()
-                
-                # トラック更新（カメラ追従）
-                self.track.update(self.car.position.y)
-                
-                # デスライン更新
-                self.death_line.update(self.car.position, self.track.get_distance_traveled())
-                
-                # ゲームオーバー判定
-                self._check_game_over()
+            self.run_frame()
             
-            # 描画
-            # 背景をクリア
-            self.screen.fill((34, 139, 34))  # 草の色で背景を塗りつぶし
+            pygame.display.flip()
+            if self.frame_count == 1:
+                self.startup_timer.mark("first game frame")
+                if self.startup_report:
+                    print(self.startup_timer.report())
+            self.profiler.end_frame()
+            self.clock.tick(self.fps_limit)
             
-            # カメラオフセットを適用してトラックを描画
-            camera_offset = pygame.math.Vector2(0, self.track.camera_y)
+            if max_frames is not None and self.frame_count >= max_frames:
+                self.running = False
+        
+        # 計測途中で終了した場合も結果を書き出す
+        self.profiler.finish()
+        # 途中で終えた走行も記録しておく
+        if self.recording is not None and not self.recording_saved and self.recording.inputs:
+            self._save_recording()
+        
+        # 戻り値でメニューに戻るかアプリ終了かを判断
+        return self.quit_to_menu
+    
+    def run_frame(self, events=None):
+        """1フレーム分のイベント処理・更新・描画（画面の反映とフレーム待ちは呼び出し側）
+        
+        ゲームを続ける間はTrueを返す。Falseの場合は quit_to_menu でメニューに戻るか
+        アプリ終了かを判断する。
+        """
+        if events is None:
+            events = pygame.event.get()
+        for event in events:
+            self.handle_event(event)
+        
+        if self.running:
+            self.update()
+            self.draw()
+            self.frame_count += 1
+        return self.running
+    
+    def restart(self):
+        """スタートからやり直す（ゲームオーバー前でも、run_frame() がFalseを返した後でも使える）"""
+        self._restart_game()
+        self.running = True
+        self.quit_to_menu = False
+    
+    def handle_event(self, event):
+        """イベント処理"""
+        if event.type == pygame.QUIT:
+            self.running = False
+            self.quit_to_menu = False  # アプリケーション終了
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_r and self.game_over:
+                self.restart()
+            elif event.key == pygame.K_m and self.game_over:
+                self.running = False
+                self.quit_to_menu = True  # メニューに戻る
+            elif event.key == pygame.K_ESCAPE:
+                self.running = False
+                self.quit_to_menu = True  # メニューに戻る
+            elif event.key == self.PROFILE_KEY:
+                self.profiler.request()
+            elif event.key == self.REWIND_KEY:
+                self.rewind()
+            elif event.key == self.SAVE_KEY and self.snapshots is not None:
+                self.save_run(SnapshotConfig.SAVE_PATH)
+    
+    def update(self):
+        """ゲーム状態の更新"""
+        if not self.game_over:
+            self.car.update_for_endless_mode()
             
-            # トラックを描画
-            self.track.draw(self.screen)
+            # トラック更新（カメラ追従）
+            self.track.update(self.car.position.y, self.car.velocity.length())
+            self.car.set_render_zoom(self.track.zoom)
             
-            # デスラインを描画
-            self.death_line.draw(self.screen, self.track.camera_y)
+            # 対戦相手（後方に取り残された車はリタイア）
+            if self.opponents is not None:
+                self.opponents.update(self.track.camera_y + self.track.view_height + 300)
             
-            # 車両を画面座標で描画
-            car_screen_pos = self.car.position - camera_offset
-            self.car.rect.center = car_screen_pos
-            self.all_sprites.draw(self.screen)
+            # 先に進んだら原点を移して座標を小さく保つ
+            self._rebase_origin(self.car.position.y)
             
-            # UI描画
-            self.ui.draw_endless_hud(self.screen, self.car, self.track, self.game_over, self.best_distance, self.game_over_reason)
-            self.death_line_ui.draw_death_line_info(self.screen, self.death_line, self.car.position)
+            # ドリフト時の砂利・土煙とタイヤ痕
+            self._emit_particles(self.car)
+            skid_segments = self.car.get_skid_segments()
+            if skid_segments:
+                self.track.stamp_skid_marks(skid_segments, self.car.drift_intensity)
             
-            # タコメーター描画
-            self.tachometer.draw(self.screen, self.car)
+            # デスライン更新
+            self.death_line.update(self.car.position, self.track.get_distance_traveled())
             
-            pygame.display.flip()
-            self.clock.tick(GameConfig.FPS)
+            # ゲームオーバー判定
+            self._check_game_over()
+            
+            if self.snapshots is not None and not self.game_over and self.frame_count % SnapshotConfig.INTERVAL == 0:
+                self.snapshots.capture(self)
         
-        # 戻り値でメニューに戻るかアプリ終了かを判断
-        return quit_to_menu
+        # 自車の状態を送り、他の車の受信状態を反映
+        if self.network is not None:
+            self.network.update(self.car, self.track.origin_y)
+        
+        self.particles.update()
+    
+    def draw(self):
+        """画面の描画"""
+        # 背景をクリア
+        self.screen.fill((34, 139, 34))  # 草の色で背景を塗りつぶし
+        
+        # トラックを描画
+        self.track.draw(self.screen)
+        
+        # デスラインを描画
+        self.death_line.draw(self.screen, self.track.camera_y, self.track.zoom)
+        
+        # パーティクルを描画（車の下に表示）
+        self.particles.draw(self.screen, self.track.camera_y, self.track.zoom, self.track.screen_offset_x)
+        
+        # 対戦相手と他のプレイヤーの車（自車の下に表示）
+        if self.opponents is not None:
+            self.opponents.draw(self.screen, self.track)
+        if self.network is not None:
+            self._draw_remote_cars()
+        
+        # 車両を画面座標で描画
+        self.car.rect.center = self.track.world_to_screen(self.car.position)
+        self.all_sprites.draw(self.screen)
+        
+        # UI描画
+        self.ui.draw_endless_hud(self.screen, self.car, self.track, self.game_over, self.best_distance, self.game_over_reason)
+        self.death_line_ui.draw_death_line_info(self.screen, self.death_line, self.car.position)
+        
+        if self.opponents is not None:
+            self.ui.draw_race_position(self.screen, self.get_race_position(), len(self.opponents.cars) + 1)
+        if self.network is not None:
+            self.ui.draw_network_info(self.screen, self.network)
+        
+        # タコメーター描画
+        self.tachometer.draw(self.screen, self.car)
+    
+    def _rebase_origin(self, lead_y):
+        """先頭の車が lead_y まで進んでいれば、ワールド座標をチャンク単位で下にずらす
+        
+        トラック（チャンクとカメラ）・車・対戦相手・デスライン・パーティクルを同じだけ動かす。
+        進行距離はトラックが移動量を別に持つので変わらない。
+        """
+        shift_y = self.track.get_rebase_shift(lead_y)
+        if not shift_y:
+            return
+        self.track.rebase(shift_y)
+        for car in self._get_world_cars():
+            car.rebase(shift_y)
+        if self.opponents is not None:
+            self.opponents.rebase(shift_y)
+        for death_line in self._get_death_lines():
+            death_line.rebase(shift_y)
+        self.particles.rebase(shift_y)
+    
+    def _get_world_cars(self):
+        """原点の移動で動かすプレイヤーの車"""
+        return [self.car]
+    
+    def _get_death_lines(self):
+        """原点の移動で動かすデスライン"""
+        return [self.death_line]
+    
+    def rewind(self):
+        """REWIND_FRAMES フレーム前のスナップショットに戻す（ゲームオーバー後も使える）"""
+        if self.snapshots is None:
+            return
+        data = self.snapshots.rewind(self.frame_count - SnapshotConfig.REWIND_FRAMES)
+        if data is not None:
+            restore(self, data)
+            self.particles.clear()
+            self.death_line_ui.reset()
+            # 戻ったフレームまでの操作を残す
+            if self.recording is not None:
+                self.recording.truncate(self.frame_count - self.recording_start)
+                self.recording_saved = False
+    
+    def save_run(self, path):
+        """今の状態をファイルに保存"""
+        try:
+            save_run(self, path)
+        except OSError as e:
+            print(f"Warning: Could not save the run to {path}: {e}")
+            return
+        print(f"Saved run to {path}")
+    
+    def load_run(self, path):
+        """保存した状態から再開（失敗したらスタートから）"""
+        try:
+            load_run(self, path)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not resume {path}: {e}")
+            return False
+        if self.snapshots is not None:
+            self.snapshots.clear()
+        self.particles.clear()
+        self.death_line_ui.reset()
+        # 再開した走行はスタートから再現できないので、次の走行から記録する
+        if self.recording is not None:
+            self.car.input_source = self.recording.source
+            self.recording = None
+        return True
+    
+    def start_recording(self, directory=ReplayConfig.DIRECTORY):
+        """走行ごとにリプレイを directory に保存する（ゲームオーバーと終了時）"""
+        if self.network is not None or self.track.track_pack is not None:
+            print("Warning: Network games and track packs cannot be recorded")
+            return False
+        self.replay_dir = directory
+        self._begin_recording()
+        return True
+    
+    def _begin_recording(self):
+        """今の車の入力ソースを包んで、この走行の操作の記録を始める"""
+        if self.replay_dir is None:
+            return
+        source = self.car.input_source
+        if isinstance(source, RecordingInput):
+            source = source.source
+        self.recording = RecordingInput(source)
+        self.recording_start = self.frame_count
+        self.recording_saved = False
+        self.car.input_source = self.recording
+    
+    def _save_recording(self):
+        """記録中の走行をリプレイとして保存"""
+        opponents = len(self.opponents.cars) if self.opponents is not None else 0
+        replay = Replay(self.track.stage_seed, opponents, self.recording.inputs,
+                        self.track.get_distance_traveled(), self.game_over_reason)
+        path = os.path.join(self.replay_dir, get_file_name(replay))
+        try:
+            replay.save(path)
+        except OSError as e:
+            print(f"Warning: Could not save the replay to {path}: {e}")
+            return
+        self.recording_saved = True
+        print(f"Saved replay to {path} ({replay.frames} frames, {replay.distance:.0f} m)")
+    
+    def _draw_remote_cars(self):
+        """ネットワーク対戦の他の車を補間した位置に描画（当たり判定の無いゴースト）"""
+        render_time = self.network.get_render_time()
+        zoom = self.track.zoom
+        origin_y = self.track.origin_y  # 受信した位置はスタート地点基準
+        for remote in self.network.remote_cars.values():
+            pose = remote.sample(render_time)
+            if pose is None:
+                continue
+            x, y, heading = pose
+            image = self.remote_car_renderer.get_image(remote.player_id, heading, zoom)
+            self.screen.blit(image, image.get_rect(center=self.track.world_to_screen((x, y + origin_y))))
+    
+    def get_state(self):
+        """現在のゲーム状態（Web版やツールからの参照用）"""
+        return {
+            "running": self.running,
+            "quit_to_menu": self.quit_to_menu,
+            "game_over": self.game_over,
+            "game_over_reason": self.game_over_reason,
+            "frame": self.frame_count,
+            "distance": self.track.get_distance_traveled(),
+            "best_distance": self.best_distance,
+            "remote_cars": len(self.network.remote_cars) if self.network is not None else 0,
+            "race_position": self.get_race_position(),
+        }
+    
+    def get_race_position(self):
+        """対戦相手と比べた順位（対戦相手がいなければNone）"""
+        if self.opponents is None:
+            return None
+        return self.opponents.get_rank(self.car)
+    
+    def _emit_particles(self, car):
+        """車の状態と路面に応じてパーティクルを放出"""
+        if self.track.is_on_track(car.position):
+            surface_type = self.track.get_surface_at_position(car.position)
+        else:
+            surface_type = "grass"
+        self.particles.emit_from_car(car, surface_type)
     
     def _check_game_over(self):
         """ゲームオーバー判定"""
-        # デスラインとの衝突チェック
-        if self.death_line.check_collision(self.car.position):
-            self.game_over_reason = "Caught by Death Line!"
+        reason = self._evaluate_game_over(self.car, self.death_line, self)
+        if reason:
+            self.game_over_reason = reason
             self._game_over()
-            return
+    
+    def _evaluate_game_over(self, car, death_line, timers):
+        """車のゲームオーバー判定（理由を返す、続行なら空文字）
+        
+        timers は off_track_timer / stuck_timer を持つオブジェクト（ゲーム本体や分割画面のプレイヤー）。
+        """
+        # デスラインとの衝突チェック
+        if death_line.check_collision(car.position):
+            return "Caught by Death Line!"
         
-        # トラックから大きく外れた場合
-        if not self.track.is_on_track(self.car.position):
+        reason = ""
+        # トラックから大きく外れた場合（中心点ではなく車体のはみ出した割合で判定）
+        if car.is_off_track():
             # 少し猶予を与える
-            if hasattr(self, 'off_track_timer'):
-                self.off_track_timer += 1
-                if self.off_track_timer > 120:  # 2秒間トラック外（短縮）
-                    self.game_over_reason = "Off Track Too Long!"
-                    self._game_over()
+            if hasattr(timers, 'off_track_timer'):
+                timers.off_track_timer += 1
+                if timers.off_track_timer > 120:  # 2秒間トラック外（短縮）
+                    reason = "Off Track Too Long!"
             else:
-                self.off_track_timer = 0
+                timers.off_track_timer = 0
         else:
-            self.off_track_timer = 0
+            timers.off_track_timer = 0
         
         # 速度が極端に遅くなった場合（スタック判定）
-        if self.car.velocity.length() < 0.1:
-            if hasattr(self, 'stuck_timer'):
-                self.stuck_timer += 1
-                if self.stuck_timer > 180:  # 3秒間停止（短縮）
-                    self.game_over_reason = "Vehicle Stuck!"
-                    self._game_over()
+        if car.velocity.length() < 0.1:
+            if hasattr(timers, 'stuck_timer'):
+                timers.stuck_timer += 1
+                if timers.stuck_timer > 180:  # 3秒間停止（短縮）
+                    reason = "Vehicle Stuck!"
             else:
-                self.stuck_timer = 0
+                timers.stuck_timer = 0
         else:
-            self.stuck_timer = 0
+            timers.stuck_timer = 0
+        
+        return reason
     
     def _game_over(self):
         """ゲームオーバー処理"""
@@ -145,6 +484,8 @@ class EndlessRallyGame:
         distance = self.track.get_distance_traveled()
         if distance > self.best_distance:
             self.best_distance = distance
+        if self.recording is not None:
+            self._save_recording()
     
     def _restart_game(self):
         """ゲーム再開"""
@@ -153,28 +494,28 @@ class EndlessRallyGame:
         self.off_track_timer = 0
         self.stuck_timer = 0
         
-        # 高度なトラックをリセット
-        self.track = AdvancedEndlessPixelTrack()
-        
-        # リアルな車両をリセット
-        self.car = RealisticRallyCar(self.track)
-        self.car.position = pygame.math.Vector2(GameConfig.SCREEN_WIDTH // 2, GameConfig.SCREEN_HEIGHT - 100)
-        self.car.velocity = pygame.math.Vector2(0, 0)
-        self.car.direction = 90  # 上向きに設定
-        self.car.current_gear = 1
-        self.car.rect.center = self.car.position
-        
-        # スプライトグループを更新
-        self.all_sprites.empty()
-        self.all_sprites.add(self.car)
-        
-        # デスラインをリセット
-        self.death_line.reset(self.car.position)
+        # トラック・車両・デスラインをその場でリセット（サーフェスやサウンドは再利用）
+        self._reset_track()
+        self.car.reset(self.track.get_start_position())
+        self.particles.clear()
+        if self.opponents is not None:
+            self.opponents.reset()
+        if self.snapshots is not None:
+            self.snapshots.clear()
         self.death_line.reset(self.car.position)
+        self.death_line_ui.reset()
+        self._begin_recording()
+
+    def _reset_track(self):
+        """トラックをスタート状態に戻す（ステージシードを乱数で決めたゲームは新しいステージにする）"""
+        if self.random_stage:
+            self.track.stage_seed = random.getrandbits(32)
+        self.track.reset()
 
 class EndlessGameUI(GameUI):
     def __init__(self):
         super().__init__()
+        self.show_rewind_help = False  # リウィンド・保存キーの説明を表示する
     
     def draw_endless_hud(self, screen, car, track, game_over, best_distance, game_over_reason=""):
         """エンドレスモード用HUD"""
@@ -221,6 +562,8 @@ class EndlessGameUI(GameUI):
             "Q: Shift Up",
             "E: Shift Down"
         ]
+        if self.show_rewind_help:
+            controls_text.extend(["BkSp: Rewind", "F5: Save"])
         
         if game_over:
             controls_text.extend([
@@ -245,6 +588,22 @@ class EndlessGameUI(GameUI):
         # 進行方向インジケーター
         self._draw_progress_indicator(screen, car, track)
     
+    def draw_race_position(self, screen, position, total):
+        """順位（画面上部中央）"""
+        text = self.font.render(f"Pos {position}/{total}", True, GameConfig.YELLOW if position == 1 else GameConfig.WHITE)
+        screen.blit(text, text.get_rect(midtop=(GameConfig.SCREEN_WIDTH // 2, 10)))
+    
+    def draw_network_info(self, screen, network):
+        """ネットワーク対戦の接続状態と通信量"""
+        if network.connected:
+            sent_rate, received_rate = network.stats.get_rates()
+            lines = [(f"Online: P{network.player_id + 1}, {len(network.remote_cars)} rivals", GameConfig.GREEN),
+                     (f"Net: up {sent_rate:.0f} B/s, down {received_rate:.0f} B/s", GameConfig.WHITE)]
+        else:
+            lines = [("Offline: connection lost", GameConfig.RED)]
+        for i, (text, color) in enumerate(lines):
+            screen.blit(self.small_font.render(text, True, color), (10, 240 + i * 20))
+    
     def _draw_progress_indicator(self, screen, car, track):
         """進行状況インジケーター"""
         # 画面右側に進行バー
@@ -1,8 +1,10 @@
 import pygame
+import collections
 import random
 import math
 from config import GameConfig
 from advanced_track_generator import AdvancedTrackChunk
+from surface_cache import LRUSurfaceCache
 
 class EndlessTrackConfig:
     TILE_SIZE = 16
@@ -11,6 +13,25 @@ class EndlessTrackConfig:
     TRACK_WIDTH_MAX = 8  # 最大トラック幅
     DIFFICULTY_INCREASE_RATE = 0.0008  # 難易度上昇率を少し下げる
     
+    # タイヤ痕
+    SKID_MARK_WIDTH = 2
+    SKID_MARK_LIGHT = 70  # 弱いドリフト時の明るさ
+    SKID_MARK_DARK = 30  # 強いドリフト時の明るさ
+    
+    # 速度連動ズーム（チャンクの幅・高さが整数ピクセルになる倍率のみ）
+    DYNAMIC_ZOOM = True
+    ZOOM_LEVELS = (1.0, 0.9, 0.8, 0.7, 0.6)
+    ZOOM_SPEED_THRESHOLDS = (4.5, 6.5, 8.2, 9.8)  # この速度を超えると1段階ズームアウト
+    ZOOM_HYSTERESIS = 0.4  # ズームインに戻るときの速度の余裕
+    ZOOM_CHANGE_INTERVAL = 12  # ズーム段階を1つ変えるまでの最短フレーム数
+    SCALED_CHUNK_CACHE_SIZE = 24  # 縮小済みチャンクサーフェスの保持上限
+    FREE_CHUNK_SURFACES = 8  # 再利用のために保持する削除済みチャンクサーフェスの上限
+    RETIRED_CHUNKS = 24  # リウィンド用に残す削除済みチャンク（サーフェス無し）の上限
+    
+    # 原点の移動（先頭の車がスタート地点からこのチャンク数より先に進んだら、チャンク単位で
+    # ワールド座標を下にずらし、座標をどこまで走っても小さい値に保つ）
+    REBASE_CHUNKS = 16
+    
     # タイルタイプ
     GRASS = 0
     GRAVEL = 1
@@ -33,18 +54,155 @@ class EndlessTrackConfig:
         MUD: (101, 67, 33)
     }
 
+class TrackCamera:
+    """トラックを映すカメラ（表示範囲・ズーム段階・画面上の表示領域）
+    
+    camera_y は表示範囲の上端のワールド座標。表示領域（viewport）の幅にトラック幅が
+    収まる倍率を基準に、速度に応じてズーム段階を切り替える。
+    """
+    
+    def __init__(self, viewport=None):
+        if viewport is None:
+            viewport = (0, 0, GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT)
+        self.viewport = pygame.Rect(viewport)
+        self.base_zoom = self.viewport.width / GameConfig.SCREEN_WIDTH
+        self.view_surface = None  # 画面のうち表示領域部分（サブサーフェス）
+        self.reset()
+    
+    def reset(self, focus_y=GameConfig.SCREEN_HEIGHT - 100):
+        """初期状態に戻す（focus_y が表示範囲の中央に来るように）"""
+        self.set_zoom_level(0)
+        self.zoom_cooldown = 0
+        self.camera_y = focus_y - self.view_height / 2
+    
+    def follow(self, car_y_position, car_speed=0.0):
+        """車を表示範囲の中央に捉える"""
+        # 速度に応じてズーム段階を更新
+        if EndlessTrackConfig.DYNAMIC_ZOOM:
+            self._update_zoom(car_speed)
+        
+        # カメラ位置を更新（車を画面中央に表示）
+        self.camera_y = car_y_position - self.view_height / 2
+    
+    def _update_zoom(self, car_speed):
+        """速度に応じたズーム段階の選択（高速でズームアウト）"""
+        if self.zoom_cooldown > 0:
+            self.zoom_cooldown -= 1
+            return
+        
+        thresholds = EndlessTrackConfig.ZOOM_SPEED_THRESHOLDS
+        level = self.zoom_level
+        if level < len(thresholds) and car_speed > thresholds[level]:
+            level += 1
+        elif level > 0 and car_speed < thresholds[level - 1] - EndlessTrackConfig.ZOOM_HYSTERESIS:
+            level -= 1
+        
+        if level != self.zoom_level:
+            self.set_zoom_level(level)
+            self.zoom_cooldown = EndlessTrackConfig.ZOOM_CHANGE_INTERVAL
+    
+    def set_zoom_level(self, level):
+        """ズーム段階を設定"""
+        self.zoom_level = level
+        self.zoom = self.base_zoom * EndlessTrackConfig.ZOOM_LEVELS[level]
+        self.view_height = self.viewport.height / self.zoom
+        # トラック幅を表示領域の中央に寄せる
+        self.screen_offset_x = int(self.viewport.width * (1 - EndlessTrackConfig.ZOOM_LEVELS[level]) / 2)
+    
+    def world_to_screen(self, pos):
+        """ワールド座標を表示領域内の座標に変換"""
+        return pygame.math.Vector2(pos[0] * self.zoom + self.screen_offset_x,
+                                   (pos[1] - self.camera_y) * self.zoom)
+    
+    def get_view(self, screen):
+        """描画先（画面全体なら画面そのもの、そうでなければ表示領域のサブサーフェス）"""
+        if self.viewport == screen.get_rect():
+            return screen
+        if self.view_surface is None or self.view_surface.get_parent() is not screen:
+            self.view_surface = screen.subsurface(self.viewport)
+        return self.view_surface
+
+
 class AdvancedEndlessPixelTrack:
-    def __init__(self):
+    def __init__(self, stage_seed=None, track_pack=None):
+        # ステージシード（指定するとチャンク生成が専用の乱数と位置だけで決まり、
+        # 同じシードならどの端末でも、どの順で生成しても同じトラックになる）
+        self.stage_seed = stage_seed
+        # 保存済みのステージ（track_pack.TrackPack）。収録範囲のチャンクは生成せずに読み込む
+        self.track_pack = track_pack
         self.chunks = []
+        self.tile_surfaces = {}
+        self.scaled_chunk_cache = LRUSurfaceCache(EndlessTrackConfig.SCALED_CHUNK_CACHE_SIZE)
+        self.scaled_zooms = set()  # 縮小済みサーフェスを作ったことのある倍率
+        # 削除したチャンクのサーフェスを次のチャンクで使い回す
+        self.free_chunk_surfaces = []
+        # 削除したチャンク（リウィンドで後ろに戻ったときに作り直さずに使う）
+        self.retired_chunks = collections.deque(maxlen=EndlessTrackConfig.RETIRED_CHUNKS)
+        
+        # 1人用のカメラ。分割画面では cameras を差し替え、全カメラの範囲をチャンクで覆う
+        self.camera = TrackCamera()
+        self.cameras = [self.camera]
+        
+        self.reset()
+    
+    # 1人用カメラの状態（従来の属性名で参照できるように）
+    @property
+    def camera_y(self):
+        return self.camera.camera_y
+    
+    @property
+    def zoom(self):
+        return self.camera.zoom
+    
+    @property
+    def zoom_level(self):
+        return self.camera.zoom_level
+    
+    @property
+    def view_height(self):
+        return self.camera.view_height
+    
+    @property
+    def screen_offset_x(self):
+        return self.camera.screen_offset_x
+    
+    def set_zoom_level(self, level):
+        """ズーム段階を設定"""
+        self.camera.set_zoom_level(level)
+    
+    def world_to_screen(self, pos):
+        """ワールド座標を画面座標に変換"""
+        return self.camera.world_to_screen(pos)
+    
+    def reset(self):
+        """トラックを初期状態に戻す（タイル・チャンクのサーフェスは再利用）"""
         # カメラの初期位置を車の位置に合わせる
-        self.camera_y = GameConfig.SCREEN_HEIGHT - 100 - GameConfig.SCREEN_HEIGHT // 2
+        for camera in self.cameras:
+            camera.reset()
         self.distance_traveled = 0
         self.difficulty = 0.0
-        self.tile_surfaces = {}
+        # 原点の移動量（ピクセル、チャンクの高さの倍数）。スタート地点基準の座標 = ワールド座標 - origin_y
+        self.origin_y = 0
+        self.rng = random.Random(self.stage_seed) if self.stage_seed is not None else random
+        # 障害物の配置用（シード指定時はシードから決め、同じステージなら同じ配置になる）
+        self.obstacle_salt = self.stage_seed if self.stage_seed is not None else random.getrandbits(32)
+        
+        self._release_chunks(self.chunks)
+        self.chunks = []
+        self.retired_chunks.clear()
+        self.scaled_chunk_cache.clear()
         
         # 初期チャンクを生成
         self._generate_initial_chunks()
     
+    def _release_chunks(self, chunks):
+        """削除するチャンクのサーフェスを再利用プールに戻す"""
+        for chunk in chunks:
+            if chunk.surface is not None:
+                if len(self.free_chunk_surfaces) < EndlessTrackConfig.FREE_CHUNK_SURFACES:
+                    self.free_chunk_surfaces.append(chunk.surface)
+                chunk.surface = None
+    
     def _generate_initial_chunks(self):
         """初期チャンクを生成（シンプルに）"""
         chunks_needed = 20
@@ -56,22 +214,62 @@ class AdvancedEndlessPixelTrack:
         for i in range(chunks_needed):
             # 車の位置から上下にチャンクを配置（タイル座標で）
             y_offset = car_tile_y - (chunks_needed // 2 - i) * EndlessTrackConfig.CHUNK_HEIGHT
-            chunk = AdvancedTrackChunk(y_offset, 0.1, prev_center)  # 初期難易度を低く
-            self.chunks.append(chunk)
+            chunk = self._load_pack_chunk(y_offset)
+            if chunk is None:
+                chunk = AdvancedTrackChunk(y_offset, 0.1, prev_center, rng=self.rng)  # 初期難易度を低く
+            self._prepare_chunk(chunk)
+            # リストは下から上の順に保つ（末尾が最も上のチャンク）
+            self.chunks.insert(0, chunk)
             prev_center = chunk.get_last_center()
     
-    def update(self, car_y_position):
+    def update(self, car_y_position, car_speed=0.0):
         """トラックの更新（カメラ追従とチャンク生成）"""
-        # カメラ位置を更新（車を画面中央に表示）
-        self.camera_y = car_y_position - GameConfig.SCREEN_HEIGHT // 2
-        
-        # 進行距離を更新
-        initial_car_y = GameConfig.SCREEN_HEIGHT - 100
-        self.distance_traveled = max(0, (initial_car_y - car_y_position) / 10)
+        self.camera.follow(car_y_position, car_speed)
+        self.update_progress(car_y_position)
+        self.update_chunks()
+    
+    def update_progress(self, lead_car_y):
+        """先頭の車の位置から進行距離と難易度を更新"""
+        self.distance_traveled = self.get_distance_at(lead_car_y)
         
         # 難易度を更新
         self.difficulty = min(1.0, self.distance_traveled * EndlessTrackConfig.DIFFICULTY_INCREASE_RATE)
+    
+    def get_distance_at(self, car_y_position):
+        """スタート位置からの進行距離（原点の移動量を含む）"""
+        initial_car_y = GameConfig.SCREEN_HEIGHT - 100
+        return max(0, (initial_car_y - car_y_position + self.origin_y) / 10)
+    
+    @property
+    def origin_tile_y(self):
+        """原点の移動量（タイル数）"""
+        return self.origin_y // EndlessTrackConfig.TILE_SIZE
+    
+    def get_rebase_shift(self, lead_y):
+        """先頭の車が lead_y にいるときの原点の移動量（ピクセル、移動不要なら0）"""
+        chunk_pixels = EndlessTrackConfig.CHUNK_HEIGHT * EndlessTrackConfig.TILE_SIZE
+        chunks_ahead = int((GameConfig.SCREEN_HEIGHT - 100 - lead_y) // chunk_pixels)
+        if chunks_ahead < EndlessTrackConfig.REBASE_CHUNKS:
+            return 0
+        return chunks_ahead * chunk_pixels
+    
+    def rebase(self, shift_y):
+        """ワールド座標を shift_y（チャンクの高さの倍数）だけ下にずらす
         
+        チャンク（リウィンド用に残したものも含む）とカメラを動かす。車・デスライン・
+        パーティクルなどは呼び出し側がそれぞれの rebase で同じだけ動かす。
+        """
+        shift_tiles = shift_y // EndlessTrackConfig.TILE_SIZE
+        self.origin_y += shift_y
+        for chunk in self.chunks:
+            chunk.rebase(shift_tiles)
+        for chunk in self.retired_chunks:
+            chunk.rebase(shift_tiles)
+        for camera in self.cameras:
+            camera.camera_y += shift_y
+    
+    def update_chunks(self):
+        """全カメラの表示範囲を覆うようにチャンクを生成・削除"""
         # 新しいチャンクが必要かチェック
         self._check_and_generate_chunks()
         
@@ -80,6 +278,12 @@ class AdvancedEndlessPixelTrack:
     
     def _check_and_generate_chunks(self):
         """新しいチャンクの生成が必要かチェック（高度な生成システム使用）"""
+        # 最も先にいるカメラの上端
+        camera_top = min(camera.camera_y for camera in self.cameras) - 400  # 十分なバッファ
+        self.extend_to(camera_top)
+    
+    def extend_to(self, world_y):
+        """ワールドY座標 world_y までチャンクを生成（カメラより先を走るCPUの車用にも使う）"""
         if not self.chunks:
             return
         
@@ -87,24 +291,118 @@ class AdvancedEndlessPixelTrack:
         last_chunk = self.chunks[-1]
         last_chunk_top = last_chunk.y_offset * EndlessTrackConfig.TILE_SIZE
         
-        # カメラの上端
-        camera_top = self.camera_y - 400  # 十分なバッファ
-        
         # 新しいチャンクが必要な場合
-        while last_chunk_top > camera_top:
+        while last_chunk_top > world_y:
             new_y_offset = last_chunk.y_offset - last_chunk.height  # 上方向に生成
             prev_center = last_chunk.track_center_line[0] if last_chunk.track_center_line else None
-            new_chunk = AdvancedTrackChunk(new_y_offset, self.difficulty, prev_center)
+            new_chunk = self._load_pack_chunk(new_y_offset)
+            if new_chunk is None:
+                new_chunk = AdvancedTrackChunk(new_y_offset, self._get_chunk_difficulty(new_y_offset), prev_center,
+                                               grow_upward=True, rng=self.rng)
+            self._prepare_chunk(new_chunk)
             self.chunks.append(new_chunk)
             last_chunk = new_chunk
             last_chunk_top = last_chunk.y_offset * EndlessTrackConfig.TILE_SIZE
     
+    def _load_pack_chunk(self, y_offset):
+        """トラックパックに収録されたチャンク（パック無し・収録範囲外ならNone）"""
+        if self.track_pack is None:
+            return None
+        # パックはスタート地点基準のタイルYで引く
+        chunk = self.track_pack.get_chunk_at(y_offset - self.origin_tile_y)
+        if chunk is not None:
+            chunk.rebase(self.origin_tile_y)
+        return chunk
+    
+    def _prepare_chunk(self, chunk):
+        """新しいチャンクに障害物の乱数のシードを設定（配置とマスクの作成は初めて描画・判定するとき）
+        
+        障害物はチャンクの位置（スタート地点基準）とステージだけで決まる乱数で配置する。
+        """
+        chunk.obstacle_seed = f"{self.obstacle_salt}:{chunk.y_offset - self.origin_tile_y}"
+    
+    def _get_chunk_difficulty(self, y_offset):
+        """新しいチャンクの難易度（シード指定時は車の進み具合に依らずチャンクの位置で決める）"""
+        if self.stage_seed is None:
+            return self.difficulty
+        distance = self.get_distance_at(y_offset * EndlessTrackConfig.TILE_SIZE)
+        return min(1.0, distance * EndlessTrackConfig.DIFFICULTY_INCREASE_RATE)
+    
     def _cleanup_old_chunks(self):
-        """画面外の古いチャンクを削除"""
-        camera_bottom = self.camera_y + GameConfig.SCREEN_HEIGHT + 400  # バッファ
+        """どのカメラからも外れた古いチャンクを削除"""
+        camera_bottom = max(camera.camera_y + camera.view_height for camera in self.cameras) + 400  # バッファ
+        
+        kept_chunks = [chunk for chunk in self.chunks 
+                       if chunk.y_offset * EndlessTrackConfig.TILE_SIZE < camera_bottom]
+        if len(kept_chunks) != len(self.chunks):
+            kept_ids = {id(chunk) for chunk in kept_chunks}
+            self._retire_chunks([chunk for chunk in self.chunks if id(chunk) not in kept_ids])
+        self.chunks = kept_chunks
+    
+    def _retire_chunks(self, chunks):
+        """削除するチャンクをリウィンド用に残す（サーフェスと縮小済みサーフェスは手放す）"""
+        if not chunks:
+            return
+        retired_ids = {id(chunk) for chunk in chunks}
+        self.scaled_chunk_cache.discard_where(lambda key: key[0] in retired_ids)
+        self._release_chunks(chunks)
+        self.retired_chunks.extend(chunks)
+    
+    def get_window(self):
+        """今あるチャンクの範囲 (最も下のチャンクのタイルY, 最も上のチャンクのタイルY)"""
+        return self.chunks[0].y_offset, self.chunks[-1].y_offset
+    
+    def restore_window(self, stage_seed, origin_y, bottom, top):
+        """原点を origin_y、チャンクの範囲を bottom〜top（タイルY）に戻す（リウィンド・途中保存からの再開用）
+        
+        同じステージで、削除済みのチャンクと今のチャンクで範囲が揃えばそれを使う。
+        揃わなければステージシードから作り直す（シード指定時のチャンクは生成順だけで決まる）。
+        """
+        if stage_seed != self.stage_seed:
+            self.stage_seed = stage_seed
+            self._regenerate_window(origin_y, bottom, top)
+            return
+        if origin_y != self.origin_y:
+            self.rebase(origin_y - self.origin_y)
         
-        self.chunks = [chunk for chunk in self.chunks 
-                      if chunk.y_offset * EndlessTrackConfig.TILE_SIZE < camera_bottom]
+        available = {chunk.y_offset: chunk for chunk in self.retired_chunks}
+        available.update((chunk.y_offset, chunk) for chunk in self.chunks)
+        # 範囲の下から隙間なく続くチャンクを集める（範囲より上に生成済みのものも同じトラックの続きなので残す）
+        chunks = []
+        y_offset = bottom
+        while y_offset in available:
+            chunks.append(available[y_offset])
+            y_offset -= EndlessTrackConfig.CHUNK_HEIGHT
+        if not chunks or chunks[-1].y_offset > top:
+            self._regenerate_window(origin_y, bottom, top)
+            return
+        
+        kept_ids = {id(chunk) for chunk in chunks}
+        retired = [chunk for chunk in self.retired_chunks if id(chunk) not in kept_ids]
+        self.retired_chunks.clear()
+        self.retired_chunks.extend(retired)
+        self._retire_chunks([chunk for chunk in self.chunks if id(chunk) not in kept_ids])
+        self.chunks = chunks
+    
+    def _regenerate_window(self, origin_y, bottom, top):
+        """ステージシードからスタート地点のチャンクを作り直し、top まで生成して bottom より下を捨てる
+        
+        生成はスタート地点基準の座標で行い、最後に原点を origin_y に移す。
+        """
+        if self.stage_seed is None:
+            raise ValueError("a track without a stage seed cannot be rebuilt")
+        self.reset()
+        origin_tiles = origin_y // EndlessTrackConfig.TILE_SIZE
+        bottom -= origin_tiles
+        top -= origin_tiles
+        while True:
+            # 範囲より下のチャンクは作り直しの途中で捨てる（まだ描画していないのでサーフェスは無い）
+            while len(self.chunks) > 1 and self.chunks[0].y_offset > bottom:
+                self.chunks.pop(0)
+            if self.chunks[-1].y_offset <= top:
+                break
+            self.extend_to(self.chunks[-1].y_offset * EndlessTrackConfig.TILE_SIZE - 1)
+        self.rebase(origin_y)
     
     def _get_tile_surface(self, tile_type, x, y):
         """タイル表面をキャッシュして取得"""
@@ -112,13 +410,13 @@ class AdvancedEndlessPixelTrack:
         pattern_id = (x + y) % 8  # 8パターンのバリエーション
         key = (tile_type, pattern_id)
         if key not in self.tile_surfaces:
-            random.seed(tile_type * 1000 + pattern_id)  # 固定シード
-            surface = self._create_tile_surface(tile_type)
+            # 固定シード（グローバルな乱数状態を乱さないよう専用の乱数生成器を使う）
+            rng = random.Random(tile_type * 1000 + pattern_id)
+            surface = self._create_tile_surface(tile_type, rng)
             self.tile_surfaces[key] = surface
-            random.seed()
         return self.tile_surfaces[key]
     
-    def _create_tile_surface(self, tile_type):
+    def _create_tile_surface(self, tile_type, rng=random):
         """タイル表面を作成"""
         surface = pygame.Surface((EndlessTrackConfig.TILE_SIZE, EndlessTrackConfig.TILE_SIZE))
         base_color = EndlessTrackConfig.COLORS[tile_type]
@@ -128,9 +426,9 @@ class AdvancedEndlessPixelTrack:
             surface.fill((60, 60, 60))  # ダークグレー
             # アスファルトのテクスチャ
             for _ in range(4):
-                x = random.randint(0, 15)
-                y = random.randint(0, 15)
-                color = random.randint(55, 65)
+                x = rng.randint(0, 15)
+                y = rng.randint(0, 15)
+                color = rng.randint(55, 65)
                 surface.set_at((x, y), (color, color, color))
         
         elif tile_type == EndlessTrackConfig.GRAVEL:
@@ -138,9 +436,9 @@ class AdvancedEndlessPixelTrack:
             surface.fill((139, 119, 101))  # ベージュ
             # 砂利のテクスチャ
             for _ in range(12):
-                x = random.randint(0, 15)
-                y = random.randint(0, 15)
-                if random.random() < 0.5:
+                x = rng.randint(0, 15)
+                y = rng.randint(0, 15)
+                if rng.random() < 0.5:
                     lighter = (min(255, base_color[0]+20), min(255, base_color[1]+20), min(255, base_color[2]+20))
                 else:
                     lighter = (max(0, base_color[0]-20), max(0, base_color[1]-20), max(0, base_color[2]-20))
@@ -151,8 +449,8 @@ class AdvancedEndlessPixelTrack:
             surface.fill((160, 82, 45))  # 茶色
             # 土のテクスチャ
             for _ in range(10):
-                x = random.randint(0, 15)
-                y = random.randint(0, 15)
+                x = rng.randint(0, 15)
+                y = rng.randint(0, 15)
                 darker = (max(0, base_color[0]-25), max(0, base_color[1]-25), max(0, base_color[2]-25))
                 surface.set_at((x, y), darker)
         
@@ -160,8 +458,8 @@ class AdvancedEndlessPixelTrack:
             # 草の描画
             surface.fill(base_color)
             for _ in range(8):
-                x = random.randint(0, 15)
-                y = random.randint(0, 15)
+                x = rng.randint(0, 15)
+                y = rng.randint(0, 15)
                 darker = (max(0, base_color[0]-20), max(0, base_color[1]-20), max(0, base_color[2]-20))
                 surface.set_at((x, y), darker)
         
@@ -198,37 +496,204 @@ class AdvancedEndlessPixelTrack:
         
         return surface
     
-    def draw(self, screen):
-        """エンドレストラックの描画（タイルベースに戻す）"""
-        # 画面に表示される範囲を計算
-        start_tile_y = int(self.camera_y // EndlessTrackConfig.TILE_SIZE)
-        end_tile_y = int((self.camera_y + GameConfig.SCREEN_HEIGHT) // EndlessTrackConfig.TILE_SIZE) + 1
+    def draw(self, screen, camera=None):
+        """エンドレストラックの描画（チャンクごとのキャッシュ済みサーフェスを転送）
         
-        tiles_per_row = GameConfig.SCREEN_WIDTH // EndlessTrackConfig.TILE_SIZE
+        camera を指定した場合、screen はそのカメラの表示領域（get_view の結果）。
+        """
+        camera = camera if camera is not None else self.camera
+        for chunk, screen_y in self._visible_chunks(camera):
+            screen.blit(self._get_scaled_chunk_surface(chunk, camera.zoom), (camera.screen_offset_x, screen_y))
+    
+    def prepare_visible_chunks(self):
+        """画面内のチャンクサーフェスを先に描画しておく（最初のフレームを軽くする）"""
+        for camera in self.cameras:
+            for chunk, _ in self._visible_chunks(camera):
+                self._get_scaled_chunk_surface(chunk, camera.zoom)
+    
+    def _visible_chunks(self, camera):
+        """カメラに映るチャンクと表示領域内のy座標"""
+        chunk_pixel_height = EndlessTrackConfig.CHUNK_HEIGHT * EndlessTrackConfig.TILE_SIZE
+        for chunk in self.chunks:
+            # 隣接チャンクの間に隙間ができないよう切り捨てで揃える
+            screen_y = math.floor((chunk.y_offset * EndlessTrackConfig.TILE_SIZE - camera.camera_y) * camera.zoom)
+            
+            # 画面内にある場合のみ描画
+            if -chunk_pixel_height < screen_y < camera.viewport.height:
+                yield chunk, screen_y
+    
+    def _get_chunk_surface(self, chunk):
+        """チャンクのタイルを1枚のサーフェスに描画してキャッシュ"""
+        if chunk.surface is None:
+            tile_size = EndlessTrackConfig.TILE_SIZE
+            tiles_per_row = GameConfig.SCREEN_WIDTH // tile_size
+            size = (tiles_per_row * tile_size, chunk.height * tile_size)
+            if self.free_chunk_surfaces and self.free_chunk_surfaces[-1].get_size() == size:
+                # 全タイルで上書きするのでクリア不要
+                surface = self.free_chunk_surfaces.pop()
+            else:
+                surface = pygame.Surface(size)
+            
+            chunk.ensure_obstacles()
+            blits = []
+            origin_tile_y = self.origin_tile_y
+            for row in range(chunk.height):
+                tile_y = chunk.y_offset + row
+                for tile_x in range(tiles_per_row):
+                    tile_type = chunk.get_tile_at(tile_x, tile_y)
+                    # 模様は原点を移しても変わらないようスタート地点基準の位置で選ぶ
+                    tile_surface = self._get_tile_surface(tile_type, tile_x, tile_y - origin_tile_y)
+                    blits.append((tile_surface, (tile_x * tile_size, row * tile_size)))
+            surface.blits(blits, doreturn=False)
+            chunk.surface = surface
+        return chunk.surface
+    
+    def _get_scaled_chunk_surface(self, chunk, zoom):
+        """指定倍率に縮小したチャンクサーフェスを取得（LRUキャッシュ、カメラ間で共有）"""
+        surface = self._get_chunk_surface(chunk)
+        if zoom == 1.0:
+            return surface
         
-        for tile_y in range(start_tile_y, end_tile_y):
-            for tile_x in range(tiles_per_row):
-                # ワールド座標でのタイル取得
-                tile_type = self.get_tile_at_world_pos(tile_x, tile_y)
-                
-                # 画面座標での描画位置
-                screen_x = tile_x * EndlessTrackConfig.TILE_SIZE
-                screen_y = tile_y * EndlessTrackConfig.TILE_SIZE - self.camera_y
+        self.scaled_zooms.add(zoom)
+        size = (round(surface.get_width() * zoom), round(surface.get_height() * zoom))
+        return self.scaled_chunk_cache.get((id(chunk), zoom),
+                                           lambda: pygame.transform.scale(surface, size))
+    
+    def stamp_skid_marks(self, segments, intensity=1.0):
+        """タイヤ痕をチャンクのサーフェスに直接焼き込む
+        
+        segments はワールド座標の (始点, 終点) のリスト。痕はトラックと一緒に
+        スクロールし、チャンク削除と共に消えるので、描画コストは痕の数に依存しない。
+        縮小済みのサーフェスがあればそちらにも同じ痕を描く。
+        """
+        tile_size = EndlessTrackConfig.TILE_SIZE
+        shade = int(EndlessTrackConfig.SKID_MARK_LIGHT - 
+                    (EndlessTrackConfig.SKID_MARK_LIGHT - EndlessTrackConfig.SKID_MARK_DARK) * min(1.0, intensity))
+        color = (shade, shade - 4, shade - 8)
+        width = EndlessTrackConfig.SKID_MARK_WIDTH
+        
+        for start, end in segments:
+            top = min(start[1], end[1]) - width
+            bottom = max(start[1], end[1]) + width
+            for chunk in self.chunks:
+                chunk_top = chunk.y_offset * tile_size
+                chunk_bottom = chunk_top + chunk.height * tile_size
+                # チャンク境界をまたぐ線分は両方のチャンクに描く（はみ出しはクリップされる）
+                if bottom < chunk_top or top >= chunk_bottom:
+                    continue
+                local_start = (start[0], start[1] - chunk_top)
+                local_end = (end[0], end[1] - chunk_top)
+                pygame.draw.line(self._get_chunk_surface(chunk), color, local_start, local_end, width)
                 
-                # 画面内にある場合のみ描画
-                if -EndlessTrackConfig.TILE_SIZE <= screen_y <= GameConfig.SCREEN_HEIGHT:
-                    tile_surface = self._get_tile_surface(tile_type, tile_x, tile_y)
-                    screen.blit(tile_surface, (screen_x, screen_y))
+                for zoom in self.scaled_zooms:
+                    scaled = self.scaled_chunk_cache.peek((id(chunk), zoom))
+                    if scaled is not None:
+                        pygame.draw.line(scaled, color,
+                                         (local_start[0] * zoom, local_start[1] * zoom),
+                                         (local_end[0] * zoom, local_end[1] * zoom),
+                                         max(1, round(width * zoom)))
+    
+    def get_chunk_at_tile(self, tile_y):
+        """タイルY座標 tile_y を含むチャンク（無ければNone）
+        
+        チャンクは同じ高さで隙間なく並ぶので、最も上のチャンクからの位置で直接求める。
+        """
+        chunks = self.chunks
+        if not chunks:
+            return None
+        top = chunks[-1]
+        index = len(chunks) - 1 - (tile_y - top.y_offset) // top.height
+        if 0 <= index < len(chunks):
+            chunk = chunks[index]
+            if chunk.y_offset <= tile_y < chunk.y_offset + chunk.height:
+                return chunk
+        return None
+    
+    def get_start_position(self, offset_x=0):
+        """スタート位置（スタート地点の行のトラック中心から offset_x ずらした位置、ワールド座標）"""
+        start_y = GameConfig.SCREEN_HEIGHT - 100
+        row = self.get_track_row(int(start_y // EndlessTrackConfig.TILE_SIZE))
+        center = row[0] if row is not None else GameConfig.SCREEN_WIDTH // 2
+        return (center + offset_x, start_y)
+    
+    def get_track_row(self, tile_y):
+        """タイルY座標 tile_y の行の (トラック中心X, トラック幅)（チャンクが無ければNone）"""
+        chunk = self.get_chunk_at_tile(tile_y)
+        if chunk is None:
+            return None
+        row = tile_y - chunk.y_offset
+        if row >= len(chunk.track_center_line):
+            return None
+        return chunk.track_center_line[row], chunk.track_width[row]
     
     def get_tile_at_world_pos(self, tile_x, tile_y):
         """ワールド座標でのタイル取得"""
-        # タイル座標で直接比較
-        for chunk in self.chunks:
-            if chunk.y_offset <= tile_y < chunk.y_offset + chunk.height:
-                return chunk.get_tile_at(tile_x, tile_y)
+        chunk = self.get_chunk_at_tile(tile_y)
+        if chunk is not None:
+            chunk.ensure_obstacles()
+            return chunk.get_tile_at(tile_x, tile_y)
         
         return EndlessTrackConfig.GRASS
     
+    def get_solid_obstacles_near(self, pos, radius):
+        """pos から radius 以内のタイルにある木・岩の中心座標のリスト
+        
+        周囲のタイルだけをチャンクの空間ハッシュで引くので、障害物の数に依らない。
+        """
+        tile_size = EndlessTrackConfig.TILE_SIZE
+        solids = (EndlessTrackConfig.TREE, EndlessTrackConfig.ROCK)
+        first_x = int((pos[0] - radius) // tile_size)
+        last_x = int((pos[0] + radius) // tile_size)
+        result = []
+        for tile_y in range(int((pos[1] - radius) // tile_size), int((pos[1] + radius) // tile_size) + 1):
+            chunk = self.get_chunk_at_tile(tile_y)
+            if chunk is None:
+                continue
+            chunk.ensure_obstacles()
+            if not chunk.obstacles:
+                continue
+            for tile_x in range(first_x, last_x + 1):
+                if chunk.obstacles.get((tile_x, tile_y)) in solids:
+                    result.append(((tile_x + 0.5) * tile_size, (tile_y + 0.5) * tile_size))
+        return result
+    
+    def check_body_collision(self, mask, top_left):
+        """車体マスクを top_left（ワールド座標の左上）に置いたときの当たり判定
+        
+        (トラック外に出ているピクセル数, 木・岩に重なった点のワールド座標またはNone) を返す。
+        車体がかかるチャンク（通常1つ、境目では2つ）ごとに、トラック外のマスクを1回調べる。
+        木・岩はトラック外にしか無いので、木・岩のマスクは車体がトラック外にはみ出したチャンクだけ調べる。
+        """
+        tile_size = EndlessTrackConfig.TILE_SIZE
+        left = math.floor(top_left[0])
+        top = math.floor(top_left[1])
+        off_track = 0
+        hit = None
+        previous = None
+        for tile_y in (top // tile_size, (top + mask.get_size()[1] - 1) // tile_size):
+            chunk = self.get_chunk_at_tile(tile_y)
+            if chunk is None or chunk is previous:
+                continue
+            previous = chunk
+            chunk.ensure_obstacles()
+            if chunk.off_track_mask is None:
+                continue
+            chunk_top = chunk.y_offset * tile_size
+            offset = (left, top - chunk_top)
+            area = chunk.off_track_mask.overlap_area(mask, offset)
+            off_track += area
+            if hit is None and area and chunk.has_solids:
+                point = chunk.solid_mask.overlap(mask, offset)
+                if point is not None:
+                    hit = (point[0], point[1] + chunk_top)
+        return off_track, hit
+    
+    def is_in_water(self, pos):
+        """指定位置が水たまりかチェック"""
+        tile_x = int(pos[0] // EndlessTrackConfig.TILE_SIZE)
+        tile_y = int(pos[1] // EndlessTrackConfig.TILE_SIZE)
+        return self.get_tile_at_world_pos(tile_x, tile_y) == EndlessTrackConfig.WATER
+    
     def get_surface_at_position(self, pos):
         """指定位置での路面タイプを取得"""
         tile_x = int(pos[0] // EndlessTrackConfig.TILE_SIZE)
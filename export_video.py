@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+リプレイの動画書き出し
+記録した走行（--record で保存したリプレイ）をヘッドレスで再現して、フレームを生のRGBまたはPNGに書き出します。
+フレームの範囲を区間に分けてワーカープロセスで並列に描画し、最後に順番どおりにつなぎます。
+
+    python export_video.py replays/run-1a2b3c4d-004200.qrrp -o run.rgb
+    python export_video.py replays/run-1a2b3c4d-004200.qrrp --start 1200 --end 2400 --format png -o frames
+"""
+
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import sys
+import time
+
+from config import GameConfig, ReplayConfig
+from replays import Replay
+
+FORMATS = ("raw", "png")
+# 区間の開始前に描画だけして捨てるフレーム数（HUDのアニメーションなど描画中に変わる状態を揃える）
+WARMUP_FRAMES = 90
+
+
+def split_range(start, end, count):
+    """[start, end) をなるべく同じ長さの count 区間 [(開始, 終了)] に分ける"""
+    count = max(1, min(count, end - start))
+    bounds = [start + (end - start) * index // count for index in range(count + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def get_part_path(output, index):
+    """生のRGBで区間 index を書き出す一時ファイル"""
+    return f"{output}.part{index:03d}"
+
+
+def render_segment(replay_path, index, start, end, output, image_format, scale):
+    """区間 [start, end) を描画して書き出し、(区間, フレーム数, 先送りの秒数, 描画の秒数) を返す
+
+    どのワーカーもスタートから start フレームまでを再現してから描画を始める（最後の
+    WARMUP_FRAMES フレーム以外は描画しない）。
+    """
+    # SDLはpygame初期化時に環境変数を読むので先に設定する
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    import pygame
+    from replays import advance, create_game
+
+    pygame.init()
+    screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+    size = (round(GameConfig.SCREEN_WIDTH * scale), round(GameConfig.SCREEN_HEIGHT * scale))
+
+    replay = Replay.load(replay_path)
+    game = create_game(replay, screen)
+    begin = time.perf_counter()
+    warmup_start = max(0, start - WARMUP_FRAMES)
+    advance(game, warmup_start)
+    for _ in range(warmup_start, start):
+        game.update()
+        game.draw()
+        game.frame_count += 1
+    seek_time = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    written = 0
+    raw_file = open(get_part_path(output, index), "wb") if image_format == "raw" else None
+    try:
+        for frame in range(start, end):
+            # ゲーム中と同じく、更新の後に描画したものがそのフレームの画面
+            game.update()
+            game.draw()
+            game.frame_count += 1
+            image = screen if scale == 1.0 else pygame.transform.smoothscale(screen, size)
+            if raw_file is not None:
+                raw_file.write(pygame.image.tobytes(image, "RGB"))
+            else:
+                pygame.image.save(image, os.path.join(output, f"frame_{frame:06d}.png"))
+            written += 1
+    finally:
+        if raw_file is not None:
+            raw_file.close()
+    pygame.quit()
+    return index, written, seek_time, time.perf_counter() - begin
+
+
+def stitch(output, count):
+    """区間ごとの生のRGBを順番どおりに1つのファイルにつなぐ"""
+    with open(output, "wb") as f:
+        for index in range(count):
+            part = get_part_path(output, index)
+            with open(part, "rb") as part_file:
+                shutil.copyfileobj(part_file, f, 1 << 20)
+            os.remove(part)
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally replay video export")
+    parser.add_argument("replay", help="replay file saved with main.py --record")
+    parser.add_argument("-o", "--output", required=True,
+                        help="raw RGB file (--format raw) or directory for the PNG frames (--format png)")
+    parser.add_argument("--format", choices=FORMATS, default="raw",
+                        help="raw: one file of rgb24 frames; png: frame_NNNNNN.png files (default: raw)")
+    parser.add_argument("--start", type=int, default=0, help="first frame to export (default: 0)")
+    parser.add_argument("--end", type=int, default=None, help="frame after the last one (default: end of the run)")
+    parser.add_argument("--scale", type=float, default=1.0, help="scale the frames, e.g. 0.5 (default: 1.0)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("--segments", type=int, default=None,
+                        help="number of segments the frames are split into (default: one per worker)")
+    args = parser.parse_args(argv)
+
+    try:
+        replay = Replay.load(args.replay)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not load replay {args.replay}: {e}")
+        return 1
+    end = replay.frames if args.end is None else min(args.end, replay.frames)
+    if not 0 <= args.start < end:
+        print(f"Error: empty frame range {args.start}-{end} (the replay has {replay.frames} frames)")
+        return 1
+    if args.format == "png":
+        os.makedirs(args.output, exist_ok=True)
+    else:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    segments = split_range(args.start, end, args.segments or args.jobs)
+    print(f"Exporting frames {args.start}-{end} of {args.replay} ({replay.distance:.0f} m) "
+          f"in {len(segments)} segment(s) on {args.jobs} worker(s)")
+    begin = time.perf_counter()
+    # pygame（SDL）を fork したプロセスで使わないように spawn で起動する
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs,
+                                                mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(render_segment, args.replay, index, start, stop, args.output, args.format, args.scale)
+                   for index, (start, stop) in enumerate(segments)]
+        for future in concurrent.futures.as_completed(futures):
+            index, written, seek_time, render_time = future.result()
+            start, stop = segments[index]
+            print(f"  segment {index}: frames {start}-{stop} (seek {seek_time:.1f} s, "
+                  f"render {render_time:.1f} s, {written / max(render_time, 1e-9):.0f} frames/s)")
+    if args.format == "raw":
+        stitch(args.output, len(segments))
+    elapsed = time.perf_counter() - begin
+
+    frames = end - args.start
+    width = round(GameConfig.SCREEN_WIDTH * args.scale)
+    height = round(GameConfig.SCREEN_HEIGHT * args.scale)
+    print(f"{frames} frames in {elapsed:.1f} s ({frames / elapsed:.0f} frames/s, "
+          f"{frames / ReplayConfig.VIDEO_FPS / elapsed:.1f}x real time)")
+    if args.format == "raw":
+        print(f"Encode with: ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} "
+              f"-r {ReplayConfig.VIDEO_FPS} -i {args.output} run.mp4")
+    else:
+        print(f"Encode with: ffmpeg -framerate {ReplayConfig.VIDEO_FPS} -start_number {args.start} "
+              f"-i {os.path.join(args.output, 'frame_%06d.png')} run.mp4")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
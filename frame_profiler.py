@@ -0,0 +1,92 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+
+
+class FrameProfiler:
+    """指定フレーム数だけゲームループをcProfileで計測するプロファイラ"""
+
+    def __init__(self, frames=300, output_dir="profiles", top_n=40, sort_key="cumulative"):
+        self.frames = frames  # 1回のキャプチャで計測するフレーム数
+        self.output_dir = output_dir
+        self.top_n = top_n
+        self.sort_key = sort_key
+
+        self.profile = None
+        self.frames_remaining = 0
+        self.frames_captured = 0
+        self.last_output = None  # 直近に書き出した .prof ファイルのパス
+
+    def is_active(self):
+        """計測中かどうか"""
+        return self.profile is not None
+
+    def request(self, frames=None):
+        """次のNフレームの計測を予約"""
+        if self.is_active():
+            return False  # 計測中の再要求は無視
+
+        self.frames_remaining = frames if frames is not None else self.frames
+        self.frames_captured = 0
+        self.profile = cProfile.Profile()
+        print(f"Profiler: capturing next {self.frames_remaining} frames")
+        return True
+
+    def begin_frame(self):
+        """フレーム開始（計測中ならプロファイラを有効化）"""
+        if self.profile is not None:
+            self.profile.enable()
+
+    def end_frame(self):
+        """フレーム終了（規定フレーム数に達したら結果を書き出す）"""
+        if self.profile is None:
+            return
+
+        self.profile.disable()
+        self.frames_captured += 1
+        self.frames_remaining -= 1
+        if self.frames_remaining <= 0:
+            self.finish()
+
+    def finish(self):
+        """計測を終了して結果を書き出す（途中終了時も呼ばれる）"""
+        if self.profile is None:
+            return None
+
+        profile = self.profile
+        self.profile = None
+        self.frames_remaining = 0
+        if self.frames_captured == 0:
+            return None
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        base_path = os.path.join(self.output_dir, f"frames_{timestamp}_{self.frames_captured}f")
+
+        # バイナリ形式（snakeviz / pstats で読み込み可能）
+        prof_path = base_path + ".prof"
+        profile.dump_stats(prof_path)
+
+        # テキスト形式の上位N件サマリー
+        summary_path = base_path + ".txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(self._format_summary(profile))
+
+        self.last_output = prof_path
+        print(f"Profiler: wrote {prof_path} and {summary_path}")
+        return prof_path
+
+    def _format_summary(self, profile):
+        """上位N件のテキストサマリーを作成"""
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        total_time = stats.total_tt
+
+        stream.write(f"Frames captured: {self.frames_captured}\n")
+        stream.write(f"Total time: {total_time * 1000:.1f} ms "
+                     f"({total_time * 1000 / self.frames_captured:.2f} ms/frame)\n\n")
+
+        stats.strip_dirs().sort_stats(self.sort_key).print_stats(self.top_n)
+        return stream.getvalue()
@@ -0,0 +1,241 @@
+import math
+import pygame
+from config import CarConfig, AutopilotConfig
+from endless_track_advanced import EndlessTrackConfig
+
+
+class DriverInput:
+    """1フレーム分の運転操作"""
+
+    __slots__ = ("throttle", "brake", "steer_left", "steer_right", "shift_up", "shift_down")
+
+    def __init__(self, throttle=False, brake=False, steer_left=False, steer_right=False,
+                 shift_up=False, shift_down=False):
+        self.throttle = throttle
+        self.brake = brake
+        self.steer_left = steer_left
+        self.steer_right = steer_right
+        self.shift_up = shift_up
+        self.shift_down = shift_down
+
+    def __repr__(self):
+        pressed = [name for name in self.__slots__ if getattr(self, name)]
+        return f"DriverInput({', '.join(pressed)})"
+
+    def to_bits(self):
+        """1バイトのビット列にする（__slots__ の順に下位ビットから、リプレイの記録用）"""
+        bits = 0
+        for index, name in enumerate(self.__slots__):
+            if getattr(self, name):
+                bits |= 1 << index
+        return bits
+
+    @classmethod
+    def from_bits(cls, bits):
+        """to_bits() のビット列から作る"""
+        return cls(*(bool(bits & (1 << index)) for index in range(len(cls.__slots__))))
+
+
+class KeyboardInput:
+    """キーボードからの入力"""
+
+    # 操作ごとのキー割り当て（いずれかが押されていれば有効）
+    DEFAULT_BINDINGS = {
+        "throttle": (pygame.K_UP, pygame.K_w),
+        "brake": (pygame.K_DOWN, pygame.K_s),
+        "steer_left": (pygame.K_LEFT,),
+        "steer_right": (pygame.K_RIGHT,),
+        "shift_up": (pygame.K_q,),
+        "shift_down": (pygame.K_e,),
+    }
+
+    # 分割画面の2人用（キーが重ならないように左右に分ける）
+    PLAYER_BINDINGS = (
+        {
+            "throttle": (pygame.K_w,),
+            "brake": (pygame.K_s,),
+            "steer_left": (pygame.K_a,),
+            "steer_right": (pygame.K_d,),
+            "shift_up": (pygame.K_q,),
+            "shift_down": (pygame.K_e,),
+        },
+        {
+            "throttle": (pygame.K_UP,),
+            "brake": (pygame.K_DOWN,),
+            "steer_left": (pygame.K_LEFT,),
+            "steer_right": (pygame.K_RIGHT,),
+            "shift_up": (pygame.K_RSHIFT, pygame.K_PERIOD),
+            "shift_down": (pygame.K_RCTRL, pygame.K_COMMA),
+        },
+    )
+
+    def __init__(self, bindings=None):
+        self.bindings = bindings if bindings is not None else self.DEFAULT_BINDINGS
+
+    def _pressed(self, keys, action):
+        """指定操作のキーが押されているか"""
+        return any(keys[key] for key in self.bindings[action])
+
+    def read(self):
+        """現在のキー状態から操作を取得"""
+        keys = pygame.key.get_pressed()
+        return DriverInput(
+            throttle=self._pressed(keys, "throttle"),
+            brake=self._pressed(keys, "brake"),
+            steer_left=self._pressed(keys, "steer_left"),
+            steer_right=self._pressed(keys, "steer_right"),
+            shift_up=self._pressed(keys, "shift_up"),
+            shift_down=self._pressed(keys, "shift_down"),
+        )
+
+
+class ScriptedInput:
+    """スクリプト化された入力（ベンチマーク・ヘッドレス実行用）
+
+    steps は (フレーム数, DriverInput) のリストで、順番に再生して最後まで行くと先頭に戻る。
+    """
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.frame = 0
+        self._step_index = 0
+        self._step_frame = 0
+
+    def read(self):
+        """次のフレームの操作を取得"""
+        frames, controls = self.steps[self._step_index]
+        self._step_frame += 1
+        if self._step_frame >= frames:
+            self._step_frame = 0
+            self._step_index = (self._step_index + 1) % len(self.steps)
+        self.frame += 1
+        return controls
+
+    @classmethod
+    def weave(cls):
+        """アクセル全開でシフトアップしながら左右に蛇行する標準シナリオ"""
+        return cls([
+            (30, DriverInput(throttle=True)),
+            (1, DriverInput(throttle=True, shift_up=True)),
+            (20, DriverInput(throttle=True, steer_left=True)),
+            (1, DriverInput(throttle=True, shift_up=True)),
+            (20, DriverInput(throttle=True, steer_right=True)),
+            (40, DriverInput(throttle=True)),
+            (1, DriverInput(throttle=True, shift_down=True)),
+            (20, DriverInput(throttle=True, steer_right=True)),
+            (20, DriverInput(throttle=True, steer_left=True)),
+        ])
+
+
+class RecordingInput:
+    """別の入力ソースの操作をそのまま返しながら、フレームごとのビット列を記録する（リプレイ用）"""
+
+    def __init__(self, source):
+        self.source = source
+        self.inputs = bytearray()
+
+    def read(self):
+        """元の入力ソースの操作を記録して返す"""
+        controls = self.source.read()
+        self.inputs.append(controls.to_bits())
+        return controls
+
+    def truncate(self, frames):
+        """先頭の frames フレーム分だけ残す（リウィンドで戻ったとき）"""
+        del self.inputs[frames:]
+
+
+class ReplayInput:
+    """記録したビット列を順に再生する（最後まで行ったら何も操作しない）"""
+
+    # ビット列ごとの操作（6ビットなので全通りを先に作っておく）
+    _DECODED = [DriverInput.from_bits(bits) for bits in range(1 << len(DriverInput.__slots__))]
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.frame = 0
+
+    def read(self):
+        """次のフレームの操作を取得"""
+        bits = self.inputs[self.frame] if self.frame < len(self.inputs) else 0
+        self.frame += 1
+        return self._DECODED[bits]
+
+
+class AutopilotInput:
+    """トラックの中心線を追う自動運転（ヘッドレスのベンチマーク・ソークテスト・デモ用）
+
+    車の前方のチャンクの track_center_line と track_width を数行だけ読み、速度に応じた
+    先の中心線の点へハンドルを向ける。アクセルはこの先の中心線の曲がり具合とトラック幅から
+    決めた目標速度で踏み、ギアは CarConfig.GEAR_RATIOS の速度帯とトルク効率で選ぶ。
+    NumPyは使わず、1フレームあたり十数回の行の参照で済む。
+    """
+
+    def __init__(self, car):
+        self.car = car
+        self.shift_cooldown = 0
+
+    def _get_row(self, world_y):
+        """ワールドY座標 world_y の行の (中心X, 幅)（チャンクが無ければNone）"""
+        return self.car.track.get_track_row(int(world_y // EndlessTrackConfig.TILE_SIZE))
+
+    def get_target_speed(self):
+        """この先の中心線の曲率（3点の2階差分）とトラック幅から決めた目標速度"""
+        config = AutopilotConfig
+        y = self.car.position.y
+        centers = []
+        narrowest = None
+        for index in range(config.PREVIEW_POINTS):
+            row = self._get_row(y - index * config.PREVIEW_STEP)
+            if row is None:
+                break
+            centers.append(row[0])
+            narrowest = row[1] if narrowest is None else min(narrowest, row[1])
+
+        target = config.MAX_TARGET_SPEED
+        step_squared = config.PREVIEW_STEP * config.PREVIEW_STEP
+        for index in range(1, len(centers) - 1):
+            curvature = abs(centers[index + 1] - 2 * centers[index] + centers[index - 1]) / step_squared
+            if curvature > 0:
+                target = min(target, math.sqrt(config.LATERAL_ACCEL / curvature))
+        if narrowest is not None and narrowest < config.NARROW_WIDTH:
+            target *= narrowest / config.NARROW_WIDTH
+        return max(config.MIN_TARGET_SPEED, target)
+
+    def read(self):
+        """次のフレームの操作を決める"""
+        config = AutopilotConfig
+        car = self.car
+        speed = car.velocity.length()
+
+        # ステアリング: 速度に応じた先の中心線の点への向きの誤差から目標舵角を決める
+        lookahead = config.LOOKAHEAD_BASE + config.LOOKAHEAD_PER_SPEED * speed
+        row = self._get_row(car.position.y - lookahead)
+        if row is None:
+            return DriverInput(throttle=True)
+        desired = math.degrees(math.atan2(lookahead, row[0] - car.position.x))
+        error = (desired - car.direction + 180) % 360 - 180
+        desired_steering = max(-CarConfig.MAX_STEERING_ANGLE, min(CarConfig.MAX_STEERING_ANGLE,
+                                                                 error * config.STEER_GAIN))
+
+        # アクセル: 目標速度を超えていれば離す（ブレーキは後退用なので使わない）
+        throttle = speed < self.get_target_speed()
+
+        # ギア: 今のギアの最高速度に近づいたら上げ、トルク効率が落ちたら下げる
+        shift_up = shift_down = False
+        if self.shift_cooldown > 0:
+            self.shift_cooldown -= 1
+        else:
+            gear = car.current_gear
+            if throttle and gear < car.max_gear and \
+                    speed > CarConfig.GEAR_RATIOS[gear]["max_speed"] * config.SHIFT_UP_RATIO:
+                shift_up = True
+            elif gear > 1 and car.get_torque_efficiency() < config.SHIFT_DOWN_EFFICIENCY:
+                shift_down = True
+            if shift_up or shift_down:
+                self.shift_cooldown = config.SHIFT_INTERVAL
+
+        return DriverInput(throttle=throttle,
+                           steer_left=desired_steering > car.steering_angle + config.STEER_DEADBAND,
+                           steer_right=desired_steering < car.steering_angle - config.STEER_DEADBAND,
+                           shift_up=shift_up, shift_down=shift_down)
@@ -1,28 +1,126 @@
-import pygame
+import argparse
+import os
+import random
 import sys
-from config import GameConfig
-from endless_game import EndlessRallyGame
+from startup_timer import StartupTimer
+
+# 起動時間の計測（--startup-profile で表示）
+startup_timer = StartupTimer()
+
+with startup_timer.phase("import pygame"):
+    import pygame
+
+with startup_timer.phase("import game modules"):
+    from config import GameConfig, ReplayConfig
+    from endless_game import EndlessRallyGame
+    from split_screen_game import SplitScreenRallyGame
+    from frame_profiler import FrameProfiler
+    from net_client import NetworkClient, parse_address
+    from track_pack import TrackPack
+    from input_sources import AutopilotInput
+    from ui import get_font
+    from realistic_car import shutdown_audio
 
 class RallyGameMain:
     """ラリーゲームのメインクラス"""
     
-    def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
-        pygame.display.set_caption("Amazon Q Rally - Endless Mode")
+    def __init__(self, profiler=None, startup_timer=None, fast_start=True):
+        self.startup_timer = startup_timer if startup_timer is not None else StartupTimer()
+        with self.startup_timer.phase("pygame.init"):
+            pygame.init()
+        with self.startup_timer.phase("display"):
+            self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+            pygame.display.set_caption("Amazon Q Rally - Endless Mode")
         self.clock = pygame.time.Clock()
-        self.font_large = pygame.font.Font(None, 72)
-        self.font_medium = pygame.font.Font(None, 48)
-        self.font_small = pygame.font.Font(None, 36)
+        with self.startup_timer.phase("fonts"):
+            self.font_large = get_font(72)
+            self.font_medium = get_font(48)
+            self.font_small = get_font(36)
+        self.profiler = profiler
+        self.profile_start_frame = None  # ゲーム開始後このフレームで自動計測
+        self.startup_report = False  # 最初のゲームフレームの後に起動時間を表示
+        
+        # タイトル画面の間に次のゲームセッションを準備する
+        self.fast_start = fast_start
+        self.session_steps = None
+        self.session = None
+        self.session_players = 1
+        
+        self.players = 1  # 通常の開始キーで始まる人数（タイトル画面の 2 キーで2人プレイ）
+        self.selected_players = 1
+        self.network = None  # ネットワーク対戦の接続（1人用セッションで使う）
+        self.opponents = 0  # CPUの対戦相手の台数（1人用セッションで使う）
+        self.track_pack = None  # 保存済みのステージ（1人用セッションで使う）
+        self.resume_path = None  # 最初の1人用セッションを保存した状態から再開する
+        self.autopilot = False  # 自動運転で走らせる（デモ用、1人用セッションで使う）
+        self.record_dir = None  # 走行のリプレイを保存する先（1人用セッションで使う）
+    
+    def _prepare_session_steps(self, timer, players):
+        """ゲームセッションの準備（タイトル画面の1フレームに1段階ずつ進める）"""
+        self.session_players = players
+        if players == 2:
+            game = yield from SplitScreenRallyGame.create_steps(self.screen, self.profiler, timer)
+        else:
+            game = yield from EndlessRallyGame.create_steps(self.screen, self.profiler, timer, self.network,
+                                                            self.opponents, self.track_pack)
+            if self.resume_path is not None:
+                yield
+                game.load_run(self.resume_path)
+                self.resume_path = None
+            if self.autopilot:
+                game.car.input_source = AutopilotInput(game.car)
+            if self.record_dir is not None:
+                game.start_recording(self.record_dir)
+        yield
+        with timer.phase("chunk surfaces"):
+            game.track.prepare_visible_chunks()
+        self.session = game
+    
+    def _step_session(self):
+        """セッション準備を1段階進める"""
+        if self.session_steps is None:
+            return
+        try:
+            next(self.session_steps)
+        except StopIteration:
+            self.session_steps = None
+    
+    def create_session(self, players=1):
+        """ゲームセッションを取得（準備が終わっていなければ残りをここで行う）"""
+        if self.session_players != players:
+            # 準備済みのセッションと人数が違えば作り直す
+            self.session_steps = None
+            self.session = None
+        if self.session_steps is None and self.session is None:
+            self.session_steps = self._prepare_session_steps(self._session_timer(), players)
+        if self.session_steps is not None:
+            for _ in self.session_steps:
+                pass
+            self.session_steps = None
+        game, self.session = self.session, None
+        game.profile_start_frame = self.profile_start_frame
+        game.startup_report = self.startup_report
+        self.startup_report = False  # 起動時間の表示は最初のセッションだけ
+        return game
+    
+    def _session_timer(self):
+        """最初のセッションは起動時間の計測を引き継ぐ"""
+        return self.startup_timer if self.startup_report else StartupTimer()
         
     def show_title_screen(self):
         """タイトル画面の表示"""
+        if self.fast_start and self.session is None and self.session_steps is None:
+            self.session_steps = self._prepare_session_steps(self._session_timer(), self.players)
+        first_frame = True
+        
         while True:
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
                     return False
                 elif event.type == pygame.KEYDOWN:
-                    # 何かキーが押されたらゲーム開始
+                    # 何かキーが押されたらゲーム開始（2キーは分割画面の2人プレイ）
+                    self.selected_players = 2 if event.key == pygame.K_2 else self.players
+                    self.startup_timer.mark("start key")
                     return True
             
             # 背景
@@ -46,6 +144,7 @@ class RallyGameMain:
                 "←→: Steering",
                 "Q: Shift Up",
                 "E: Shift Down",
+                "2: Two players (P1 WASD+Q/E, P2 arrows+RShift/RCtrl)",
                 "",
                 "Press any key to start!"
             ]
@@ -64,6 +163,12 @@ class RallyGameMain:
                 self.screen.blit(text_surface, text_rect)
             
             pygame.display.flip()
+            if first_frame:
+                first_frame = False
+                self.startup_timer.mark("title screen")
+            else:
+                # 操作説明を読んでいる間にゲームを準備
+                self._step_session()
             self.clock.tick(60)
     
     def run(self):
@@ -74,7 +179,7 @@ class RallyGameMain:
                 break  # ウィンドウを閉じた場合は終了
             
             # ゲーム開始
-            game = EndlessRallyGame()
+            game = self.create_session(self.selected_players)
             continue_to_menu = game.run()
             
             # ゲームの戻り値に応じて処理
@@ -83,12 +188,135 @@ class RallyGameMain:
             
             # continue_to_menu が True の場合は再びタイトル画面に戻る
         
+        close_network(self.network)
+        shutdown_audio()
         pygame.quit()
         sys.exit()
 
-def main():
+def parse_args(argv=None):
+    """コマンドライン引数の解析"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally - Endless Mode")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="random seed for reproducible track generation")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window or audio device (SDL dummy drivers), skipping the title screen")
+    parser.add_argument("--frames", type=int, default=600,
+                        help="number of frames to run in headless mode (default: 600)")
+    parser.add_argument("--profile-frames", type=int, default=300,
+                        help="frames captured per profile (F9 in game or --profile-start; default: 300)")
+    parser.add_argument("--profile-start", type=int, default=None, metavar="FRAME",
+                        help="start profiling automatically at this game frame")
+    parser.add_argument("--profile-dir", default="profiles",
+                        help="directory for .prof files and text summaries (default: profiles)")
+    parser.add_argument("--profile-top", type=int, default=40,
+                        help="number of functions listed in the text summary (default: 40)")
+    parser.add_argument("--players", type=int, choices=(1, 2), default=1,
+                        help="number of players; 2 starts a split-screen game (default: 1)")
+    parser.add_argument("--opponents", type=int, default=0, metavar="N",
+                        help="race against N AI opponents (default: 0)")
+    parser.add_argument("--track-pack", metavar="PATH", default=None,
+                        help="drive a stage saved with track_pack.py instead of generating one")
+    parser.add_argument("--resume", metavar="PATH", default=None,
+                        help="continue a run saved with F5 (use the same --track-pack and --opponents)")
+    parser.add_argument("--autopilot", action="store_true",
+                        help="let the autopilot drive the car (single player), e.g. for demos and headless runs")
+    parser.add_argument("--record", metavar="DIR", nargs="?", const=ReplayConfig.DIRECTORY, default=None,
+                        help=f"save a replay of every run (single player) to DIR (default: {ReplayConfig.DIRECTORY})")
+    parser.add_argument("--connect", metavar="HOST[:PORT]", default=None,
+                        help="join a LAN multiplayer server started with net_server.py")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print wall time per startup phase after the first game frame")
+    parser.add_argument("--no-fast-start", dest="fast_start", action="store_false",
+                        help="build the game session after the title screen instead of behind it")
+    return parser.parse_args(argv)
+
+def connect_to_server(address):
+    """ネットワーク対戦サーバーに参加（失敗したら1人で遊ぶ）"""
+    host, port = parse_address(address)
+    client = NetworkClient(host, port)
+    try:
+        client.connect()
+    except OSError as e:
+        print(f"Warning: Could not join {host}:{port}: {e}")
+        return None
+    print(f"Joined {host}:{port} as P{client.player_id + 1} (stage seed {client.stage_seed})")
+    return client
+
+def open_track_pack(path):
+    """保存済みのステージを開く（失敗したら通常どおりトラックを生成する）"""
+    try:
+        pack = TrackPack(path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not load track pack {path}: {e}")
+        return None
+    print(f"Loaded track pack '{pack.name}' ({pack.get_distance() / 1000:.1f} km)")
+    return pack
+
+def close_network(network):
+    """切断して通信量を表示"""
+    if network is not None:
+        network.close()
+        print(network.report())
+
+def run_headless(args, profiler, network=None, track_pack=None):
+    """ウィンドウなしで指定フレーム数だけゲームを実行"""
+    with startup_timer.phase("pygame.init"):
+        pygame.init()
+    with startup_timer.phase("display"):
+        screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+    
+    if args.players == 2:
+        game = SplitScreenRallyGame(screen, profiler, startup_timer)
+    else:
+        game = EndlessRallyGame(screen, profiler, startup_timer, network, args.opponents, track_pack)
+        if args.resume:
+            game.load_run(args.resume)
+        if args.autopilot:
+            game.car.input_source = AutopilotInput(game.car)
+        if args.record is not None:
+            game.start_recording(args.record)
+    game.profile_start_frame = args.profile_start
+    game.startup_report = args.startup_profile
+    game.fps_limit = 0  # フレームレート制限なし
+    game.run(max_frames=args.frames)
+    
+    close_network(network)
+    shutdown_audio()
+    pygame.quit()
+
+def main(argv=None):
     """Main entry point for the game"""
-    main_game = RallyGameMain()
+    args = parse_args(argv)
+    
+    if args.seed is not None:
+        random.seed(args.seed)
+    
+    profiler = FrameProfiler(frames=args.profile_frames, output_dir=args.profile_dir,
+                             top_n=args.profile_top)
+    
+    # ネットワーク対戦（トラックはサーバーのステージシードで生成する）
+    network = connect_to_server(args.connect) if args.connect else None
+    track_pack = open_track_pack(args.track_pack) if args.track_pack else None
+    if track_pack is not None and network is not None:
+        print("Warning: --track-pack is ignored in network games (the server chooses the stage)")
+    
+    if args.headless:
+        # SDLはpygame初期化時に環境変数を読むので、初期化前に設定する
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+        run_headless(args, profiler, network, track_pack)
+        return
+    
+    main_game = RallyGameMain(profiler, startup_timer, fast_start=args.fast_start)
+    main_game.profile_start_frame = args.profile_start
+    main_game.startup_report = args.startup_profile
+    main_game.players = args.players
+    main_game.network = network
+    main_game.opponents = args.opponents
+    main_game.track_pack = track_pack
+    main_game.resume_path = args.resume
+    main_game.autopilot = args.autopilot
+    main_game.record_dir = args.record
     main_game.run()
 
 if __name__ == "__main__":
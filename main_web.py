@@ -1,45 +1,72 @@
 import asyncio
-import pygame
 import sys
-from endless_game import EndlessRallyGame
-from config import GameConfig
+from startup_timer import StartupTimer
+
+# 起動時間の計測（最初のフレームまでの各フェーズ）
+startup_timer = StartupTimer()
+
+with startup_timer.phase("import pygame"):
+    import pygame
+
+with startup_timer.phase("import game modules"):
+    from config import GameConfig, AudioConfig, ParticleConfig
+    from endless_game import EndlessRallyGame
+    from realistic_car import shutdown_audio
+
+def configure_for_web():
+    """Web版向けの設定（NumPyを待たずに最初のフレームを出す）"""
+    # サウンドは標準ライブラリだけで、ゲームループの合間に少しずつ合成する
+    AudioConfig.SYNTH_BACKEND = "array"
+    AudioConfig.ENGINE_AUDIO_MODE = "nearest"  # 小さいバッファで済む8段階のループ
+    AudioConfig.USE_DISK_CACHE = False
+    # パーティクル用のNumPyは最初のフレームを表示してから読み込む
+    ParticleConfig.LAZY_INIT = True
 
 class WebRallyGameMain:
     def __init__(self):
-        pygame.init()
-        self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
-        pygame.display.set_caption("Amazon Q Rally - Web Edition")
+        with startup_timer.phase("pygame.init"):
+            pygame.init()
+        with startup_timer.phase("display"):
+            self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+            pygame.display.set_caption("Amazon Q Rally - Web Edition")
         self.clock = pygame.time.Clock()
         self.running = True
-        
+
     async def run(self):
         """メインゲームループ（Web版）"""
-        # 直接エンドレスゲームを開始
-        game = EndlessRallyGame(self.screen)
-        
+        # 直接エンドレスゲームを開始（画面はこちらで用意したものを使う）
+        game = EndlessRallyGame(self.screen, startup_timer=startup_timer)
+        first_frame = True
+
         while self.running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_ESCAPE:
-                        self.running = False
-            
-            # ゲームの更新と描画
+            # ゲームの更新と描画（イベント処理も含む）
             if not game.run_frame():
-                # ゲームが終了した場合、リスタート
-                game = EndlessRallyGame(self.screen)
-            
+                if game.quit_to_menu:
+                    # Web版にはメニューが無いので、その場でリスタート
+                    game.restart()
+                else:
+                    self.running = False
+
             pygame.display.flip()
-            self.clock.tick(60)
-            
-            # pygbag用の非同期処理
+
+            if first_frame:
+                first_frame = False
+                startup_timer.mark("first game frame")
+                with startup_timer.phase("numpy (particles)"):
+                    game.particles.prepare()
+                print(startup_timer.report())
+
+            self.clock.tick(GameConfig.FPS)
+
+            # ブラウザに制御を返す（pygbag用）
             await asyncio.sleep(0)
-        
+
+        shutdown_audio()
         pygame.quit()
 
 async def main():
     """Web版メインエントリーポイント"""
+    configure_for_web()
     web_game = WebRallyGameMain()
     await web_game.run()
 
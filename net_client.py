@@ -0,0 +1,257 @@
+import asyncio
+import collections
+import concurrent.futures
+import struct
+import threading
+import time
+import pygame
+from config import GameConfig, NetworkConfig
+from net_protocol import (PROTOCOL_VERSION, MSG_HELLO, MSG_WELCOME, MSG_STATE, MSG_SNAPSHOT, MSG_LEAVE, MSG_FULL,
+                          MESSAGE_OVERHEAD, HELLO, WELCOME, LEAVE, DeltaEncoder, DeltaDecoder, TrafficStats,
+                          quantize_car, dequantize, decode_snapshot, pack_message, read_message)
+from realistic_car import RealisticCarRenderer
+from surface_cache import LRUSurfaceCache
+
+
+def parse_address(address):
+    """"host:port" 形式のアドレスを (host, port) に分解（省略時は既定値）"""
+    host, _, port = address.rpartition(":") if ":" in address else (address, "", "")
+    return host or NetworkConfig.DEFAULT_HOST, int(port) if port else NetworkConfig.DEFAULT_PORT
+
+
+def _lerp_angle(a, b, t):
+    """角度の補間（近い回り方向で）"""
+    return a + ((b - a + 180) % 360 - 180) * t
+
+
+class RemoteCar:
+    """他のプレイヤーの車（受信した状態を補間・外挿して表示位置を求める）"""
+
+    def __init__(self, player_id):
+        self.player_id = player_id
+        self.states = collections.deque(maxlen=32)  # (サーバー時刻, CarState)
+
+    def add_state(self, server_time, state):
+        """受信した状態を追加（古い時刻のものは捨てる）"""
+        if self.states and server_time <= self.states[-1][0]:
+            return
+        self.states.append((server_time, state))
+
+    def get_latest(self):
+        """最後に受信した CarState"""
+        return self.states[-1][1] if self.states else None
+
+    def sample(self, render_time):
+        """サーバー時刻 render_time での (x, y, 向き)
+
+        2つの受信状態の間なら補間し、最後の受信より先なら直前の動きから
+        MAX_EXTRAPOLATION 秒まで外挿する。
+        """
+        states = self.states
+        if not states:
+            return None
+
+        last_time, last = states[-1]
+        if render_time >= last_time:
+            if len(states) < 2:
+                return last.x, last.y, last.heading
+            prev_time, prev = states[-2]
+            ahead = min(render_time - last_time, NetworkConfig.MAX_EXTRAPOLATION) / (last_time - prev_time)
+            return (last.x + (last.x - prev.x) * ahead, last.y + (last.y - prev.y) * ahead,
+                    _lerp_angle(prev.heading, last.heading, 1 + ahead))
+
+        # 新しい方から、render_time を挟む2つの状態を探す
+        for index in range(len(states) - 2, -1, -1):
+            start_time, start = states[index]
+            if start_time <= render_time:
+                end_time, end = states[index + 1]
+                t = (render_time - start_time) / (end_time - start_time)
+                return (start.x + (end.x - start.x) * t, start.y + (end.y - start.y) * t,
+                        _lerp_angle(start.heading, end.heading, t))
+        first = states[0][1]
+        return first.x, first.y, first.heading
+
+
+class NetworkClient:
+    """LAN対戦サーバーへの接続
+
+    通信は別スレッドのイベントループで行い、ゲームループは毎フレーム update() を呼ぶだけ。
+    自車の状態はティック間隔で差分だけを送り、受信したスナップショットは RemoteCar に渡す。
+    """
+
+    def __init__(self, host=NetworkConfig.DEFAULT_HOST, port=NetworkConfig.DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.player_id = None
+        self.stage_seed = None
+        self.tick_rate = NetworkConfig.TICK_RATE
+        self.connected = False
+
+        self.encoder = DeltaEncoder()  # ゲームループ側
+        self.decoder = DeltaDecoder()  # 通信スレッド側
+        self.incoming = collections.deque()  # 通信スレッドからゲームループへの受信メッセージ
+        self.remote_cars = {}
+        self.stats = TrafficStats()
+        self.update_times = collections.deque(maxlen=600)  # update() の処理時間（秒）
+
+        # サーバー時刻とローカル時刻の差（受信遅延が最小のスナップショットに合わせる）
+        self.clock_offset = None
+        self.next_send_time = 0.0
+
+        self.loop = None
+        self.thread = None
+        self.writer = None
+
+    def connect(self, timeout=NetworkConfig.CONNECT_TIMEOUT):
+        """接続して参加応答を待つ（失敗時は OSError）"""
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="NetworkClient", daemon=True)
+        self.thread.start()
+        future = asyncio.run_coroutine_threadsafe(self._connect(), self.loop)
+        try:
+            future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            self.close()
+            raise OSError("timed out waiting for the server")
+        except Exception:
+            self.close()
+            raise
+
+    async def _connect(self):
+        """接続と参加手続き（通信スレッド）"""
+        reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self._write(pack_message(MSG_HELLO, HELLO.pack(PROTOCOL_VERSION)))
+        msg_type, body = await read_message(reader)
+        if msg_type == MSG_FULL:
+            raise ConnectionRefusedError("server is full")
+        if msg_type != MSG_WELCOME:
+            raise ConnectionError("unexpected reply from server")
+        self.player_id, self.stage_seed, self.tick_rate = WELCOME.unpack(body)
+        self.connected = True
+        asyncio.ensure_future(self._read_loop(reader))
+
+    async def _read_loop(self, reader):
+        """受信ループ（通信スレッド）"""
+        try:
+            while True:
+                msg_type, body = await read_message(reader)
+                received_at = time.perf_counter()
+                self.stats.record_received(len(body) + MESSAGE_OVERHEAD)
+                if msg_type == MSG_SNAPSHOT:
+                    tick, _ = decode_snapshot(self.decoder, body)
+                    # 変化しなかった車も含め、このティックの全員の状態を渡す
+                    self.incoming.append((MSG_SNAPSHOT, tick, received_at, dict(self.decoder.states)))
+                elif msg_type == MSG_LEAVE:
+                    player_id = LEAVE.unpack(body)[0]
+                    self.decoder.forget(player_id)
+                    self.incoming.append((MSG_LEAVE, player_id))
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error, IndexError):
+            pass
+        self.connected = False
+
+    def _write(self, data):
+        """送信（通信スレッド）"""
+        if self.writer is not None and not self.writer.is_closing():
+            self.writer.write(data)
+
+    def update(self, car, origin_y=0):
+        """自車の状態の送信（ティック間隔ごと）と受信済み状態の反映（毎フレーム呼ぶ）
+
+        origin_y はトラックの原点の移動量。送受信する位置はスタート地点基準。
+        """
+        start = time.perf_counter()
+        if self.connected and start >= self.next_send_time:
+            self.next_send_time = max(self.next_send_time + 1.0 / self.tick_rate, start)
+            delta = self.encoder.encode(self.player_id, quantize_car(car, origin_y))
+            if delta:
+                message = pack_message(MSG_STATE, delta)
+                self.stats.record_sent(len(message))
+                self.loop.call_soon_threadsafe(self._write, message)
+        self.poll()
+        self.update_times.append(time.perf_counter() - start)
+
+    def poll(self):
+        """受信したスナップショット・退出をリモートの車に反映"""
+        incoming = self.incoming
+        while incoming:
+            message = incoming.popleft()
+            if message[0] == MSG_LEAVE:
+                self.remote_cars.pop(message[1], None)
+                continue
+
+            _, tick, received_at, states = message
+            server_time = tick / self.tick_rate
+            self._update_clock(received_at - server_time)
+            for player_id, quantized in states.items():
+                remote = self.remote_cars.get(player_id)
+                if remote is None:
+                    remote = self.remote_cars[player_id] = RemoteCar(player_id)
+                remote.add_state(server_time, dequantize(quantized))
+
+    def _update_clock(self, offset):
+        """時刻差の推定（遅れて届いたものより早く届いたものを信じ、少しずつ追従する）"""
+        if self.clock_offset is None or offset < self.clock_offset:
+            self.clock_offset = offset
+        else:
+            self.clock_offset += (offset - self.clock_offset) * 0.02
+
+    def get_render_time(self):
+        """リモートの車を表示するサーバー時刻（補間のため少し過去）"""
+        if self.clock_offset is None:
+            return 0.0
+        return time.perf_counter() - self.clock_offset - NetworkConfig.INTERPOLATION_DELAY
+
+    def close(self):
+        """切断して通信スレッドを止める"""
+        self.connected = False
+        if self.loop is None or not self.thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(1.0)
+        except concurrent.futures.TimeoutError:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1.0)
+    
+    async def _shutdown(self):
+        """接続を閉じ、受信ループを止める（通信スレッド）"""
+        if self.writer is not None:
+            self.writer.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+    def report(self):
+        """帯域と処理時間の表示用テキスト"""
+        update_times = list(self.update_times)
+        average = sum(update_times) / len(update_times) * 1000 if update_times else 0.0
+        return (f"Network P{(self.player_id or 0) + 1}: {self.stats.summary()}, "
+                f"update avg {average:.3f} ms")
+
+
+class RemoteCarRenderer:
+    """リモートの車の描画（プレイヤーごとの色の車体を、向きを量子化して回転済みでキャッシュ）"""
+
+    ANGLE_STEP = 3  # 回転済みスプライトの角度の刻み（度）
+
+    def __init__(self):
+        self.bodies = {}
+        self.rotated = LRUSurfaceCache(256)
+
+    def get_image(self, player_id, heading, zoom):
+        """指定した向き・倍率の車の画像"""
+        color_index = player_id % len(GameConfig.CAR_COLORS)
+        angle = round(heading / self.ANGLE_STEP) * self.ANGLE_STEP % 360
+        return self.rotated.get((color_index, angle, zoom), lambda: self._render(color_index, angle, zoom))
+
+    def _render(self, color_index, angle, zoom):
+        body = self.bodies.get(color_index)
+        if body is None:
+            renderer = RealisticCarRenderer()
+            renderer.body_color = GameConfig.CAR_COLORS[color_index]
+            body = self.bodies[color_index] = renderer.create_car_surface()
+        if zoom != 1.0:
+            body = pygame.transform.scale(body, (max(1, round(body.get_width() * zoom)),
+                                                 max(1, round(body.get_height() * zoom))))
+        # 車の描画は上向きなので、物理の角度から90度引く
+        return pygame.transform.rotate(body, angle - 90)
@@ -0,0 +1,219 @@
+import collections
+import struct
+import time
+from config import NetworkConfig
+
+# ネットワーク対戦のメッセージ形式
+#
+# メッセージは [長さ uint16][種別 uint8][本体] のバイナリ。車の状態は量子化した整数で、
+# 前回送った状態から変化したフィールドだけを送る（TCPなので順序と到達は保証される）。
+
+PROTOCOL_VERSION = 1
+
+# メッセージ種別
+MSG_HELLO = 1  # クライアント→サーバー: プロトコルバージョン
+MSG_WELCOME = 2  # サーバー→クライアント: プレイヤー番号・ステージシード・ティックレート
+MSG_STATE = 3  # クライアント→サーバー: 自車の状態の差分
+MSG_SNAPSHOT = 4  # サーバー→クライアント: ティック番号と他の車の状態の差分
+MSG_LEAVE = 5  # サーバー→クライアント: 退出したプレイヤー番号
+MSG_FULL = 6  # サーバー→クライアント: 満員で参加できない
+
+# 差分のフィールドマスク
+FIELD_X = 0x01  # X座標の差分（int16）
+FIELD_Y = 0x02  # Y座標の差分（int16）
+FIELD_HEADING = 0x04  # 向き（uint16）
+FIELD_GEAR = 0x08  # ギア（int8）
+FIELD_SPEED = 0x10  # 速度（uint16）
+FIELD_ABSOLUTE = 0x20  # 座標を絶対値（int32×2）で送る（初回・差分が int16 に収まらないとき）
+
+_LENGTH = struct.Struct("<H")
+_INT16 = struct.Struct("<h")
+_UINT16 = struct.Struct("<H")
+_INT8 = struct.Struct("<b")
+_POSITION = struct.Struct("<ii")
+HELLO = struct.Struct("<B")
+WELCOME = struct.Struct("<BIB")
+SNAPSHOT_HEADER = struct.Struct("<IB")
+LEAVE = struct.Struct("<B")
+
+MESSAGE_OVERHEAD = _LENGTH.size + 1  # 長さと種別のバイト数
+_INT16_MAX = 32767
+
+CarState = collections.namedtuple("CarState", ["x", "y", "heading", "gear", "speed"])
+
+
+def quantize_car(car, origin_y=0):
+    """車の状態を送信用の整数タプル (x, y, heading, gear, speed) に量子化
+
+    Y座標はトラックの原点の移動量 origin_y を戻したスタート地点基準の値で送る
+    （原点を移すタイミングはクライアントごとに違う）。
+    """
+    return (round(car.position.x * NetworkConfig.POSITION_SCALE),
+            round((car.position.y - origin_y) * NetworkConfig.POSITION_SCALE),
+            round(car.direction % 360 * NetworkConfig.HEADING_STEPS / 360) % NetworkConfig.HEADING_STEPS,
+            max(-128, min(127, car.current_gear)),
+            min(65535, round(car.velocity.length() * NetworkConfig.SPEED_SCALE)))
+
+
+def dequantize(quantized):
+    """量子化した状態を CarState（ワールド座標・度）に戻す"""
+    x, y, heading, gear, speed = quantized
+    return CarState(x / NetworkConfig.POSITION_SCALE, y / NetworkConfig.POSITION_SCALE,
+                    heading * 360 / NetworkConfig.HEADING_STEPS, gear, speed / NetworkConfig.SPEED_SCALE)
+
+
+class DeltaEncoder:
+    """送信側: 車ごとに最後に送った状態を覚えておき、変化したフィールドだけを書き出す"""
+
+    def __init__(self):
+        self.baselines = {}
+
+    def encode(self, key, state):
+        """量子化済みの状態の差分（変化が無ければ空のバイト列）"""
+        base = self.baselines.get(key)
+        out = bytearray(1)
+        mask = 0
+
+        if base is None or abs(state[0] - base[0]) > _INT16_MAX or abs(state[1] - base[1]) > _INT16_MAX:
+            mask |= FIELD_ABSOLUTE
+            out += _POSITION.pack(state[0], state[1])
+        else:
+            if state[0] != base[0]:
+                mask |= FIELD_X
+                out += _INT16.pack(state[0] - base[0])
+            if state[1] != base[1]:
+                mask |= FIELD_Y
+                out += _INT16.pack(state[1] - base[1])
+        if base is None or state[2] != base[2]:
+            mask |= FIELD_HEADING
+            out += _UINT16.pack(state[2])
+        if base is None or state[3] != base[3]:
+            mask |= FIELD_GEAR
+            out += _INT8.pack(state[3])
+        if base is None or state[4] != base[4]:
+            mask |= FIELD_SPEED
+            out += _UINT16.pack(state[4])
+
+        if not mask:
+            return b""
+        out[0] = mask
+        self.baselines[key] = state
+        return bytes(out)
+
+    def forget(self, key):
+        """車が退出したら基準の状態を捨てる（再参加時は絶対値から送り直す）"""
+        self.baselines.pop(key, None)
+
+
+class DeltaDecoder:
+    """受信側: 車ごとの現在の状態に差分を適用する"""
+
+    def __init__(self):
+        self.states = {}
+
+    def decode(self, data, offset, key):
+        """data[offset:] の差分を適用し、読み終えた位置を返す"""
+        mask = data[offset]
+        offset += 1
+        x, y, heading, gear, speed = self.states.get(key, (0, 0, 0, 1, 0))
+
+        if mask & FIELD_ABSOLUTE:
+            x, y = _POSITION.unpack_from(data, offset)
+            offset += _POSITION.size
+        else:
+            if mask & FIELD_X:
+                x += _INT16.unpack_from(data, offset)[0]
+                offset += _INT16.size
+            if mask & FIELD_Y:
+                y += _INT16.unpack_from(data, offset)[0]
+                offset += _INT16.size
+        if mask & FIELD_HEADING:
+            heading = _UINT16.unpack_from(data, offset)[0]
+            offset += _UINT16.size
+        if mask & FIELD_GEAR:
+            gear = _INT8.unpack_from(data, offset)[0]
+            offset += _INT8.size
+        if mask & FIELD_SPEED:
+            speed = _UINT16.unpack_from(data, offset)[0]
+            offset += _UINT16.size
+
+        self.states[key] = (x, y, heading, gear, speed)
+        return offset
+
+    def forget(self, key):
+        """退出した車の状態を捨てる"""
+        self.states.pop(key, None)
+
+
+def encode_snapshot(encoder, tick, states, exclude=None):
+    """スナップショット本体（ティック番号と、変化した車ごとの [番号][差分]）"""
+    body = bytearray(SNAPSHOT_HEADER.size)
+    count = 0
+    for player_id, state in states.items():
+        if player_id == exclude:
+            continue
+        delta = encoder.encode(player_id, state)
+        if delta:
+            body.append(player_id)
+            body += delta
+            count += 1
+    SNAPSHOT_HEADER.pack_into(body, 0, tick, count)
+    return bytes(body)
+
+
+def decode_snapshot(decoder, body):
+    """スナップショットを適用し (ティック番号, 変化した車の番号のリスト) を返す"""
+    tick, count = SNAPSHOT_HEADER.unpack_from(body, 0)
+    offset = SNAPSHOT_HEADER.size
+    changed = []
+    for _ in range(count):
+        player_id = body[offset]
+        offset = decoder.decode(body, offset + 1, player_id)
+        changed.append(player_id)
+    return tick, changed
+
+
+def pack_message(msg_type, body=b""):
+    """長さ・種別を付けたメッセージのバイト列"""
+    return _LENGTH.pack(len(body) + 1) + bytes((msg_type,)) + body
+
+
+async def read_message(reader):
+    """メッセージを1つ読み込み (種別, 本体) を返す（切断時は asyncio.IncompleteReadError）"""
+    header = await reader.readexactly(_LENGTH.size)
+    payload = await reader.readexactly(_LENGTH.unpack(header)[0])
+    if not payload:
+        raise struct.error("empty message")
+    return payload[0], payload[1:]
+
+
+class TrafficStats:
+    """送受信したバイト数・メッセージ数（帯域の計測用）"""
+
+    def __init__(self):
+        self.start_time = time.perf_counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.messages_sent = 0
+        self.messages_received = 0
+
+    def record_sent(self, size):
+        """送信したメッセージを記録"""
+        self.bytes_sent += size
+        self.messages_sent += 1
+
+    def record_received(self, size):
+        """受信したメッセージを記録"""
+        self.bytes_received += size
+        self.messages_received += 1
+
+    def get_rates(self):
+        """計測開始からの平均 (送信バイト/秒, 受信バイト/秒)"""
+        elapsed = max(1e-6, time.perf_counter() - self.start_time)
+        return self.bytes_sent / elapsed, self.bytes_received / elapsed
+
+    def summary(self):
+        """1行の要約テキスト"""
+        sent_rate, received_rate = self.get_rates()
+        return (f"sent {self.bytes_sent} B in {self.messages_sent} msgs ({sent_rate:.0f} B/s), "
+                f"received {self.bytes_received} B in {self.messages_received} msgs ({received_rate:.0f} B/s)")
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import collections
+import random
+import struct
+import time
+from config import NetworkConfig
+from net_protocol import (PROTOCOL_VERSION, MSG_HELLO, MSG_WELCOME, MSG_STATE, MSG_SNAPSHOT, MSG_LEAVE, MSG_FULL,
+                          MESSAGE_OVERHEAD, WELCOME, LEAVE, DeltaEncoder, DeltaDecoder, TrafficStats,
+                          encode_snapshot, pack_message, read_message)
+
+
+class ClientConnection:
+    """サーバー側の接続1つ分"""
+
+    def __init__(self, player_id, writer):
+        self.player_id = player_id
+        self.writer = writer
+        self.decoder = DeltaDecoder()  # このクライアントから届く自車の状態
+        self.encoder = DeltaEncoder()  # このクライアントに送った他の車の状態
+        self.stats = TrafficStats()
+        self.dropped = False  # 受信が止まって切断した（以降は送らない）
+
+    @property
+    def state(self):
+        """最新の自車の状態（量子化済み、まだ届いていなければNone）"""
+        return self.decoder.states.get(self.player_id)
+
+    def send(self, data):
+        """メッセージを送信（LAN用なので drain は待たない）
+
+        送信待ちが MAX_WRITE_BUFFER を超えたら、受信が止まったクライアントとみなして切断する。
+        差分は前回送った状態が届いている前提なので、1ティック分だけ送らずに済ませることはしない。
+        """
+        if self.dropped:
+            return
+        if self.writer.transport.get_write_buffer_size() > NetworkConfig.MAX_WRITE_BUFFER:
+            self.dropped = True
+            print(f"P{self.player_id + 1} dropped: not reading "
+                  f"(write buffer over {NetworkConfig.MAX_WRITE_BUFFER} bytes)")
+            # 送信待ちを捨てて閉じる（受信側のループが終わり、退出として処理される）
+            self.writer.transport.abort()
+            return
+        self.writer.write(data)
+        self.stats.record_sent(len(data))
+
+
+class RallyServer:
+    """LAN対戦用の小さな asyncio サーバー
+
+    トラックは各クライアントがステージシードから生成するので、送るのは車の状態だけ。
+    ティックごとに各クライアントへ、他の車の前回送信分からの差分をまとめて送る。
+    """
+
+    def __init__(self, host=NetworkConfig.DEFAULT_HOST, port=NetworkConfig.DEFAULT_PORT, seed=None,
+                 tick_rate=NetworkConfig.TICK_RATE, report_interval=NetworkConfig.STATS_INTERVAL):
+        self.host = host
+        self.port = port
+        self.seed = (seed if seed is not None else random.randrange(1 << 32)) & 0xFFFFFFFF  # uint32 で送る
+        self.tick_rate = tick_rate
+        self.report_interval = report_interval  # 通信量・処理時間を表示する間隔（Noneで表示しない）
+        self.clients = {}
+        self.tick = 0
+        self.tick_times = collections.deque(maxlen=tick_rate * 10)  # 直近のティック処理時間（秒）
+        self.server = None
+        self.tick_task = None
+
+    async def start(self):
+        """待ち受けとティック処理を開始"""
+        self.server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]  # ポート0を指定した場合の実際のポート
+        self.tick_task = asyncio.ensure_future(self._tick_loop())
+
+    async def stop(self):
+        """全接続を閉じて停止"""
+        if self.tick_task is not None:
+            self.tick_task.cancel()
+        for connection in list(self.clients.values()):
+            connection.writer.close()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def serve_forever(self):
+        """停止されるまで動かす"""
+        await self.start()
+        print(f"Rally server listening on {self.host}:{self.port} (stage seed {self.seed}, {self.tick_rate} ticks/s)")
+        try:
+            await self.tick_task
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+
+    def _get_free_player_id(self):
+        """空いているプレイヤー番号（満員ならNone）"""
+        for player_id in range(NetworkConfig.MAX_PLAYERS):
+            if player_id not in self.clients:
+                return player_id
+        return None
+
+    async def _handle_client(self, reader, writer):
+        """1クライアントとの通信（参加・状態の受信・退出）"""
+        connection = None
+        try:
+            msg_type, body = await asyncio.wait_for(read_message(reader), NetworkConfig.CONNECT_TIMEOUT)
+            if msg_type != MSG_HELLO or not body or body[0] != PROTOCOL_VERSION:
+                return
+            player_id = self._get_free_player_id()
+            if player_id is None:
+                writer.write(pack_message(MSG_FULL))
+                return
+
+            connection = ClientConnection(player_id, writer)
+            connection.stats.record_received(len(body) + MESSAGE_OVERHEAD)
+            self.clients[player_id] = connection
+            connection.send(pack_message(MSG_WELCOME, WELCOME.pack(player_id, self.seed, self.tick_rate)))
+            print(f"P{player_id + 1} joined from {writer.get_extra_info('peername')}")
+
+            while True:
+                msg_type, body = await read_message(reader)
+                connection.stats.record_received(len(body) + MESSAGE_OVERHEAD)
+                if msg_type == MSG_STATE:
+                    connection.decoder.decode(body, 0, player_id)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError, struct.error, IndexError):
+            pass
+        finally:
+            if connection is not None:
+                self._remove_client(connection)
+            writer.close()
+
+    def _remove_client(self, connection):
+        """退出したプレイヤーを他のクライアントに知らせる"""
+        player_id = connection.player_id
+        del self.clients[player_id]
+        for other in self.clients.values():
+            other.encoder.forget(player_id)
+            other.send(pack_message(MSG_LEAVE, LEAVE.pack(player_id)))
+        print(f"P{player_id + 1} left: {connection.stats.summary()}")
+
+    async def _tick_loop(self):
+        """一定間隔でスナップショットを配信"""
+        loop = asyncio.get_event_loop()
+        interval = 1.0 / self.tick_rate
+        next_tick = loop.time()
+        last_report = time.perf_counter()
+        while True:
+            start = time.perf_counter()
+            self.broadcast_snapshot()
+            self.tick_times.append(time.perf_counter() - start)
+
+            if self.report_interval is not None and self.clients and start - last_report >= self.report_interval:
+                print(self.report())
+                last_report = start
+
+            next_tick += interval
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    def broadcast_snapshot(self):
+        """各クライアントに他の車の差分を送る（1ティック分の処理）"""
+        states = {player_id: connection.state for player_id, connection in self.clients.items()
+                  if connection.state is not None}
+        for connection in self.clients.values():
+            body = encode_snapshot(connection.encoder, self.tick, states, exclude=connection.player_id)
+            connection.send(pack_message(MSG_SNAPSHOT, body))
+        self.tick += 1
+
+    def get_stats(self):
+        """ティック処理時間とクライアントごとの帯域"""
+        tick_times = list(self.tick_times)
+        clients = {}
+        for player_id, connection in self.clients.items():
+            sent_rate, received_rate = connection.stats.get_rates()
+            clients[player_id] = {"sent_bytes_per_second": sent_rate, "received_bytes_per_second": received_rate,
+                                  "bytes_sent": connection.stats.bytes_sent,
+                                  "bytes_received": connection.stats.bytes_received}
+        return {
+            "tick": self.tick,
+            "tick_avg_ms": sum(tick_times) / len(tick_times) * 1000 if tick_times else 0.0,
+            "tick_max_ms": max(tick_times) * 1000 if tick_times else 0.0,
+            "clients": clients,
+        }
+
+    def report(self):
+        """統計の表示用テキスト"""
+        stats = self.get_stats()
+        lines = [f"Tick {stats['tick']}: {len(stats['clients'])} players, "
+                 f"tick processing avg {stats['tick_avg_ms']:.3f} ms, max {stats['tick_max_ms']:.3f} ms"]
+        for player_id, client in sorted(stats["clients"].items()):
+            lines.append(f"  P{player_id + 1}: down {client['sent_bytes_per_second']:.0f} B/s, "
+                         f"up {client['received_bytes_per_second']:.0f} B/s")
+        return "\n".join(lines)
+
+
+def main(argv=None):
+    """サーバーのエントリーポイント"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally - LAN multiplayer server")
+    parser.add_argument("--host", default=NetworkConfig.DEFAULT_HOST,
+                        help=f"address to listen on (default: {NetworkConfig.DEFAULT_HOST}; 0.0.0.0 for the LAN)")
+    parser.add_argument("--port", type=int, default=NetworkConfig.DEFAULT_PORT,
+                        help=f"port to listen on (default: {NetworkConfig.DEFAULT_PORT})")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="stage seed sent to every player (default: random)")
+    parser.add_argument("--tick-rate", type=int, default=NetworkConfig.TICK_RATE,
+                        help=f"snapshots per second (default: {NetworkConfig.TICK_RATE})")
+    args = parser.parse_args(argv)
+
+    server = RallyServer(args.host, args.port, args.seed, args.tick_rate)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
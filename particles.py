@@ -0,0 +1,187 @@
+import math
+import pygame
+from config import ParticleConfig
+from surface_cache import LRUSurfaceCache
+
+np = None  # NumPyは最初に必要になった時点で読み込む（Web版の起動を速くするため）
+
+
+def _load_numpy():
+    """NumPyを読み込む（使えなければNone）"""
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            return None
+        np = numpy
+    return np
+
+
+class ParticleSystem:
+    """NumPy配列で管理する砂利・土煙パーティクル"""
+
+    def __init__(self, max_particles=ParticleConfig.MAX_PARTICLES, seed=None):
+        self.max_particles = max_particles
+        self.seed = seed
+        self.enabled = True  # NumPyが無ければ False（パーティクルなし）
+        self.position = None  # prepare() まで未確保
+
+        self.sprites, self.sprite_offsets = self._create_sprites()
+        # ズーム倍率ごとに描き直したスプライト（車のスプライトやチャンクサーフェスと同じくLRUで保持）
+        self.scaled_sprites = LRUSurfaceCache(ParticleConfig.SCALED_SPRITE_CACHE_SIZE)
+
+        if not ParticleConfig.LAZY_INIT:
+            self.prepare()
+
+    def prepare(self):
+        """配列を確保（確保済みならTrue、NumPyが無ければFalse）"""
+        if self.position is not None or not self.enabled:
+            return self.enabled
+        if _load_numpy() is None:
+            print("Warning: NumPy is not available, particles are disabled")
+            self.enabled = False
+            return False
+        max_particles = self.max_particles
+
+        # 事前確保した配列（生存判定は life > 0）
+        self.position = np.zeros((max_particles, 2), dtype=np.float32)
+        self.velocity = np.zeros((max_particles, 2), dtype=np.float32)
+        self.life = np.zeros(max_particles, dtype=np.float32)
+        self.max_life = np.ones(max_particles, dtype=np.float32)
+        self.kind = np.zeros(max_particles, dtype=np.int8)
+
+        # 種類ごとの減衰率（インデックス参照で一括適用）
+        self.kind_drag = np.array([ParticleConfig.KINDS[k]["drag"] for k in sorted(ParticleConfig.KINDS)],
+                                  dtype=np.float32)
+
+        # リングバッファの書き込み位置（上限到達時は最も古い粒子を上書き）
+        self.next_index = 0
+        # トラック生成用の乱数を乱さないよう専用の乱数生成器を使う
+        self.rng = np.random.default_rng(self.seed)
+        return True
+
+    def _create_sprites(self, zoom=1.0):
+        """種類×フェード段階ごとのスプライトを事前描画（スプライトと、種類ごとの中心までのずれを返す）"""
+        sprites = {}
+        offsets = {}
+        for kind, params in ParticleConfig.KINDS.items():
+            size = max(1, round(params["size"] * zoom))
+            offsets[kind] = size
+            for level in range(ParticleConfig.FADE_LEVELS):
+                alpha = int(220 * (level + 1) / ParticleConfig.FADE_LEVELS)
+                surface = pygame.Surface((size * 2, size * 2), pygame.SRCALPHA)
+                pygame.draw.circle(surface, (*params["color"], alpha), (size, size), size)
+                sprites[(kind, level)] = surface
+        return sprites, offsets
+
+    def _get_sprites(self, zoom):
+        """倍率 zoom のスプライトとずれ（等倍以外は初回に描いてキャッシュ）"""
+        if zoom == 1.0:
+            return self.sprites, self.sprite_offsets
+        return self.scaled_sprites.get(zoom, lambda: self._create_sprites(zoom))
+
+    def rebase(self, shift_y):
+        """ワールド座標を shift_y だけ下にずらす（トラックの原点の移動に合わせる）"""
+        if self.position is not None:
+            self.position[:, 1] += shift_y
+
+    def reseed(self, seed):
+        """乱数生成器を seed で作り直す（リプレイをどのプロセスで描画しても同じ見た目にする）"""
+        self.seed = seed
+        if self.position is not None:
+            self.rng = np.random.default_rng(seed)
+
+    def clear(self):
+        """全パーティクルを消去"""
+        if self.position is None:
+            return
+        self.life.fill(0)
+        self.next_index = 0
+
+    def get_active_count(self):
+        """生存しているパーティクル数"""
+        if self.position is None:
+            return 0
+        return int(np.count_nonzero(self.life > 0))
+
+    def emit(self, kind, count, origin, base_velocity, spread):
+        """指定位置からパーティクルを放出"""
+        if count <= 0 or not self.prepare():
+            return
+        count = min(count, self.max_particles)
+        params = ParticleConfig.KINDS[kind]
+
+        indices = (self.next_index + np.arange(count)) % self.max_particles
+        self.next_index = int((self.next_index + count) % self.max_particles)
+
+        jitter = self.rng.normal(0.0, spread, size=(count, 2)).astype(np.float32)
+        self.position[indices] = origin
+        self.position[indices] += jitter * 2
+        self.velocity[indices] = base_velocity
+        self.velocity[indices] += jitter
+
+        life_min, life_max = params["life"]
+        life = self.rng.uniform(life_min, life_max, size=count).astype(np.float32)
+        self.life[indices] = life
+        self.max_life[indices] = life
+        self.kind[indices] = kind
+
+    def emit_from_car(self, car, surface_type):
+        """ドリフト強度・路面・速度に応じて後輪から放出"""
+        speed = car.velocity.length()
+        if speed < ParticleConfig.MIN_EMIT_SPEED or car.drift_intensity < 0.3 or not self.prepare():
+            return
+
+        emissions = ParticleConfig.SURFACE_EMISSION.get(surface_type)
+        if not emissions:
+            return
+
+        # 強度はドリフト量と速度の積（0～1）
+        intensity = min(1.0, car.drift_intensity) * min(1.0, speed / 8.0)
+
+        forward = pygame.math.Vector2(1, 0).rotate(-car.direction)
+        lateral = pygame.math.Vector2(0, 1).rotate(-car.direction)
+        rear_axle = car.position - forward * 12
+
+        for kind, max_rate in emissions:
+            count = int(max_rate * intensity + self.rng.random())
+            if count <= 0:
+                continue
+            params = ParticleConfig.KINDS[kind]
+            # 車の進行と逆方向・横方向に巻き上げる
+            base_velocity = -car.velocity * params["speed"]
+            for side in (-1, 1):
+                wheel = rear_axle + lateral * (6 * side)
+                self.emit(kind, math.ceil(count / 2), (wheel.x, wheel.y),
+                          (base_velocity.x, base_velocity.y), 0.4 + intensity * 0.6)
+
+    def update(self):
+        """全パーティクルを一括更新"""
+        if self.position is None:
+            return
+        # 死んだ粒子も含めて配列全体を更新（マスク抽出のコピーを避ける）
+        self.position += self.velocity
+        self.velocity *= self.kind_drag[self.kind][:, None]
+        np.subtract(self.life, 1, out=self.life)
+        np.maximum(self.life, 0, out=self.life)
+
+    def draw(self, screen, camera_y, zoom=1.0, offset_x=0):
+        """事前描画したスプライトをまとめてblit"""
+        if self.position is None:
+            return
+        indices = np.flatnonzero(self.life > 0)
+        if indices.size == 0:
+            return
+
+        levels = (self.life[indices] / self.max_life[indices] * ParticleConfig.FADE_LEVELS).astype(np.int32)
+        levels = np.clip(levels, 0, ParticleConfig.FADE_LEVELS - 1)
+        kinds = self.kind[indices]
+        xs = (self.position[indices, 0] * zoom + offset_x).astype(np.int32)
+        ys = ((self.position[indices, 1] - camera_y) * zoom).astype(np.int32)
+
+        sprites, offsets = self._get_sprites(zoom)
+        screen.blits([
+            (sprites[(kind, level)], (x - offsets[kind], y - offsets[kind]))
+            for kind, level, x, y in zip(kinds.tolist(), levels.tolist(), xs.tolist(), ys.tolist())
+        ], doreturn=False)
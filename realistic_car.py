@@ -1,6 +1,10 @@
 import pygame
 import math
-from config import GameConfig
+import bisect
+from config import GameConfig, AudioConfig
+from audio_queue import stop_audio_worker
+from sound_bank import (ENGINE_RPM_LEVELS, ENGINE_WAVETABLE_RPMS, engine_loop_name, engine_sound_name,
+                        get_sound_bank)
 
 class RealisticCarRenderer:
     """リアルな車の描画"""
@@ -97,163 +101,104 @@ class RealisticCarRenderer:
         
         return surface
 
+def init_audio(players=1):
+    """ミキサーを初期化してサウンドバンクの準備を開始（初期化済みならそのまま、失敗時はFalse）"""
+    try:
+        if not pygame.mixer.get_init():
+            pygame.mixer.init(frequency=AudioConfig.SAMPLE_RATE, size=-16, channels=2,
+                              buffer=AudioConfig.BUFFER_SIZE)
+        # エンジン・スキール用チャンネル（プレイヤーごと）を Sound.play() に使わせない
+        reserved = AudioConfig.RESERVED_CHANNELS * players
+        if pygame.mixer.get_num_channels() < reserved + 2:
+            pygame.mixer.set_num_channels(reserved + 2)
+        pygame.mixer.set_reserved(max(reserved, AudioConfig.RESERVED_CHANNELS))
+        get_sound_bank().start(background=AudioConfig.BACKGROUND_SYNTHESIS)
+    except pygame.error:
+        return False
+    return True
+
+def shutdown_audio():
+    """オーディオスレッドを止める（pygame.quit() の前に呼ぶ）"""
+    stop_audio_worker()
+
 class CarSoundSystem:
     """車のサウンドシステム"""
     
-    def __init__(self):
+    def __init__(self, player_index=0):
         self.sounds_enabled = True
+        # プレイヤーごとに予約チャンネルをずらす（分割画面で2台のエンジン音が取り合わないように）
+        channel_offset = AudioConfig.RESERVED_CHANNELS * player_index
+        self.engine_channel_ids = [channel + channel_offset for channel in AudioConfig.ENGINE_CHANNELS]
+        self.skid_channel_id = AudioConfig.SKID_CHANNEL + channel_offset
         self.engine_sounds = {}  # RPMレベル別のエンジン音
         self.skid_sound = None
         self.gear_sound = None
         self.current_engine_channel = None
+        self.sound_bank = None
+        self.sounds_loaded = False
         
-        # サウンドの初期化を試行
-        try:
-            pygame.mixer.init(frequency=22050, size=-16, channels=2, buffer=512)
+        # クロスフェードモード用（RPM昇順のループと、各チャンネルで再生中のループ番号）
+        self.crossfade_mode = AudioConfig.ENGINE_AUDIO_MODE == "crossfade"
+        self.engine_loop_rpms = list(ENGINE_WAVETABLE_RPMS)
+        self.engine_loops = []
+        self.engine_channels = None
+        self.engine_channel_levels = [None, None]
+        self.engine_state = None  # 直近の (下側ループ番号, クロスフェード段階, 音量段階)
+        
+        # サウンドの初期化を試行（初期化済みのミキサーはそのまま使う）
+        if init_audio(player_index + 1):
             self._create_procedural_sounds()
-        except pygame.error:
+        else:
             print("Warning: Could not initialize sound system")
             self.sounds_enabled = False
     
     def _create_procedural_sounds(self):
-        """プロシージャルサウンドの生成"""
+        """プロシージャルサウンドの準備（プロセス共通のバンクで一度だけ合成）"""
         if not self.sounds_enabled:
             return
         
-        try:
-            # エンジン音の生成（簡易版）
-            self._generate_engine_sound()
-            # スキール音の生成
-            self._generate_skid_sound()
-            # ギア音の生成
-            self._generate_gear_sound()
-        except Exception as e:
-            print(f"Warning: Could not generate sounds: {e}")
-            self.sounds_enabled = False
+        self.sound_bank = get_sound_bank()
+        self._load_sounds()
     
-    def _generate_engine_sound(self):
-        """RPMレベル別のエンジン音を生成"""
-        import numpy as np
+    def _load_sounds(self):
+        """合成が終わっていればバンクからサウンドを取得"""
+        if self.sounds_loaded:
+            return True
+        # スレッドが使えない環境（Web版）ではゲームループの合間に少しずつ合成する
+        if not self.sound_bank.step():
+            return False
+        
+        self.sounds_loaded = True
+        if self.sound_bank.error is not None:
+            self.sounds_enabled = False
+            return False
         
         try:
-            # 複数のRPMレベル用のエンジン音を生成
-            rpm_levels = [1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000]
-            
-            for rpm in rpm_levels:
-                duration = 0.5  # 短めのループ
-                sample_rate = 22050
-                t = np.linspace(0, duration, int(sample_rate * duration))
-                
-                # RPMに応じた基本周波数を計算
-                base_freq = 30 + (rpm / 8000) * 150  # 30Hz～180Hz
-                
-                # 複数の周波数を重ねてエンジン音を作成
-                wave1 = np.sin(2 * np.pi * base_freq * t) * 0.4
-                wave2 = np.sin(2 * np.pi * base_freq * 2 * t) * 0.2  # 2倍音
-                wave3 = np.sin(2 * np.pi * base_freq * 3 * t) * 0.1  # 3倍音
-                
-                # RPMが高いほどノイズを追加（排気音の表現）
-                noise_intensity = 0.05 + (rpm / 8000) * 0.15
-                noise = np.random.normal(0, noise_intensity, len(t))
-                
-                engine_wave = (wave1 + wave2 + wave3 + noise) * 0.3
-                
-                # ステレオ化
-                stereo_wave = np.zeros((len(engine_wave), 2), dtype=np.float32)
-                stereo_wave[:, 0] = engine_wave
-                stereo_wave[:, 1] = engine_wave
-                
-                # pygame用に変換
-                sound_array = (stereo_wave * 32767).astype(np.int16)
-                
-                if not sound_array.flags['C_CONTIGUOUS']:
-                    sound_array = np.ascontiguousarray(sound_array)
-                
-                self.engine_sounds[rpm] = pygame.sndarray.make_sound(sound_array)
-            
-        except Exception as e:
-            print(f"Warning: Could not generate engine sounds: {e}")
-            self.engine_sounds = {}
-    
-    def _generate_skid_sound(self):
-        """スキール音の生成"""
-        try:
-            import numpy as np
-            
-            duration = 0.5
-            sample_rate = 22050
-            t = np.linspace(0, duration, int(sample_rate * duration))
-            
-            # 高周波のノイズでスキール音を作成
-            frequency = 2000
-            wave = np.sin(2 * np.pi * frequency * t) * 0.5
-            noise = np.random.normal(0, 0.3, len(t))
-            
-            skid_wave = (wave + noise) * 0.4
-            
-            # ステレオ化（C-contiguousにする）
-            stereo_wave = np.zeros((len(skid_wave), 2), dtype=np.float32)
-            stereo_wave[:, 0] = skid_wave
-            stereo_wave[:, 1] = skid_wave
-            
-            # pygame用に変換（16bit整数に変換）
-            sound_array = (stereo_wave * 32767).astype(np.int16)
-            
-            # C-contiguousであることを確認
-            if not sound_array.flags['C_CONTIGUOUS']:
-                sound_array = np.ascontiguousarray(sound_array)
-            
-            self.skid_sound = pygame.sndarray.make_sound(sound_array)
-            
-        except Exception as e:
-            print(f"Warning: Could not generate skid sound: {e}")
-            self.skid_sound = None
-    
-    def _generate_gear_sound(self):
-        """ギア音の生成"""
-        try:
-            import numpy as np
-            
-            duration = 0.2
-            sample_rate = 22050
-            t = np.linspace(0, duration, int(sample_rate * duration))
-            
-            # クリック音（短いパルス）
-            frequency = 1000
-            envelope = np.exp(-t * 10)  # 減衰エンベロープ
-            wave = np.sin(2 * np.pi * frequency * t) * envelope * 0.3
-            
-            # ステレオ化（C-contiguousにする）
-            stereo_wave = np.zeros((len(wave), 2), dtype=np.float32)
-            stereo_wave[:, 0] = wave
-            stereo_wave[:, 1] = wave
-            
-            # pygame用に変換（16bit整数に変換）
-            sound_array = (stereo_wave * 32767).astype(np.int16)
-            
-            # C-contiguousであることを確認
-            if not sound_array.flags['C_CONTIGUOUS']:
-                sound_array = np.ascontiguousarray(sound_array)
-            
-            self.gear_sound = pygame.sndarray.make_sound(sound_array)
+            for rpm in ENGINE_RPM_LEVELS:
+                sound = self.sound_bank.get(engine_sound_name(rpm))
+                if sound is not None:
+                    self.engine_sounds[rpm] = sound
+            self.skid_sound = self.sound_bank.get("skid")
+            self.gear_sound = self.sound_bank.get("gear")
             
+            if self.crossfade_mode:
+                self.engine_loops = [self.sound_bank.get(engine_loop_name(rpm)) for rpm in self.engine_loop_rpms]
+                if None in self.engine_loops:
+                    self.crossfade_mode = False  # ウェーブテーブルが無ければ従来方式
+                else:
+                    self.engine_channels = [pygame.mixer.Channel(index) for index in self.engine_channel_ids]
         except Exception as e:
-            print(f"Warning: Could not generate gear sound: {e}")
-            self.gear_sound = None
-            frequency = 1000
-            wave = np.sin(2 * np.pi * frequency * t) * np.exp(-t * 10)
-            
-            stereo_wave = np.array([wave, wave]).T
-            gear_wave_int = (stereo_wave * 32767).astype(np.int16)
-            
-            self.gear_sound = pygame.sndarray.make_sound(gear_wave_int)
-            
-        except Exception as e:
-            print(f"Warning: Could not generate gear sound: {e}")
+            print(f"Warning: Could not load sounds: {e}")
+            self.sounds_enabled = False
+        return self.sounds_loaded
     
     def play_engine_sound(self, rpm, volume=0.5, pitch_factor=1.0):
         """RPMに応じたエンジン音の再生"""
-        if not self.sounds_enabled or not self.engine_sounds:
+        if not self.sounds_enabled or not self._load_sounds() or not self.engine_sounds:
+            return
+        
+        if self.crossfade_mode:
+            self._play_engine_crossfade(rpm, volume)
             return
         
         try:
@@ -267,7 +212,7 @@ class CarSoundSystem:
             
             # 現在のエンジン音チャンネルを管理
             if self.current_engine_channel is None or not self.current_engine_channel.get_busy():
-                self.current_engine_channel = pygame.mixer.Channel(0)
+                self.current_engine_channel = pygame.mixer.Channel(self.engine_channel_ids[0])
                 self.current_engine_channel.play(selected_sound, loops=-1)
             
             # 音量を更新
@@ -276,9 +221,41 @@ class CarSoundSystem:
         except Exception as e:
             print(f"Warning: Could not play engine sound: {e}")
     
+    def _play_engine_crossfade(self, rpm, volume):
+        """隣接する2つのRPMループを2チャンネルでクロスフェード再生"""
+        rpms = self.engine_loop_rpms
+        
+        # 二分探索で挟み込む2つのループを求める
+        lower = bisect.bisect_right(rpms, rpm) - 1
+        lower = max(0, min(lower, len(rpms) - 2))
+        weight = (rpm - rpms[lower]) / (rpms[lower + 1] - rpms[lower])
+        weight = max(0.0, min(1.0, weight))
+        
+        # 量子化した状態が変わったときだけミキサーを操作する
+        fade_step = round(weight * AudioConfig.CROSSFADE_STEPS)
+        volume_step = round(min(0.4, volume) * AudioConfig.VOLUME_STEPS)
+        state = (lower, fade_step, volume_step)
+        if state == self.engine_state:
+            return
+        self.engine_state = state
+        
+        try:
+            fade = fade_step / AudioConfig.CROSSFADE_STEPS
+            level_volume = volume_step / AudioConfig.VOLUME_STEPS
+            for level, level_weight in ((lower, 1.0 - fade), (lower + 1, fade)):
+                # ループ番号の偶奇でチャンネルを固定し、隣の区間へ移っても鳴っている側は途切れさせない
+                slot = level % 2
+                channel = self.engine_channels[slot]
+                if self.engine_channel_levels[slot] != level:
+                    channel.play(self.engine_loops[level], loops=-1)
+                    self.engine_channel_levels[slot] = level
+                channel.set_volume(level_volume * level_weight)
+        except Exception as e:
+            print(f"Warning: Could not play engine sound: {e}")
+    
     def play_skid_sound(self, intensity=1.0):
         """スキール音の再生（音量を下げる）"""
-        if not self.sounds_enabled or not self.skid_sound:
+        if not self.sounds_enabled or not self._load_sounds() or not self.skid_sound:
             return
         
         try:
@@ -287,14 +264,15 @@ class CarSoundSystem:
             self.skid_sound.set_volume(volume)
             
             # 頻繁に再生されないように制限
-            if not pygame.mixer.Channel(1).get_busy():
-                pygame.mixer.Channel(1).play(self.skid_sound)
+            skid_channel = pygame.mixer.Channel(self.skid_channel_id)
+            if not skid_channel.get_busy():
+                skid_channel.play(self.skid_sound)
         except Exception as e:
             print(f"Warning: Could not play skid sound: {e}")
     
     def play_gear_sound(self):
         """ギア音の再生"""
-        if not self.sounds_enabled or not self.gear_sound:
+        if not self.sounds_enabled or not self._load_sounds() or not self.gear_sound:
             return
         
         try:
@@ -308,7 +286,16 @@ class CarSoundSystem:
         if self.sounds_enabled:
             if self.current_engine_channel:
                 self.current_engine_channel.stop()
-            pygame.mixer.stop()
+            # 自分の予約チャンネルだけ止める（もう1台の音は止めない）
+            for index in self.engine_channel_ids + [self.skid_channel_id]:
+                pygame.mixer.Channel(index).stop()
+            self.engine_channel_levels = [None, None]
+            self.engine_state = None
+    
+    def reset(self):
+        """再スタート用に再生状態を初期化（ミキサーと合成済みサウンドはそのまま）"""
+        self.stop_engine_sound()
+        self.current_engine_channel = None
     
     def update_engine_sound(self, rpm, throttle_input, speed=0):
         """エンジン音の更新（RPMに応じた音程変化）"""
@@ -326,3 +313,23 @@ class CarSoundSystem:
         
         # RPMに応じたエンジン音を再生
         self.play_engine_sound(rpm, total_volume)
+
+class SilentSoundSystem:
+    """音を出さないサウンドシステム（CPU対戦相手など、ミキサーチャンネルを使わない車用）"""
+    
+    sounds_enabled = False
+    
+    def update_engine_sound(self, rpm, throttle_input, speed=0):
+        pass
+    
+    def play_skid_sound(self, intensity=1.0):
+        pass
+    
+    def play_gear_sound(self):
+        pass
+    
+    def stop_engine_sound(self):
+        pass
+    
+    def reset(self):
+        pass
@@ -1,12 +1,34 @@
 import pygame
 import math
-from config import GameConfig, CarConfig
-from realistic_car import RealisticCarRenderer, CarSoundSystem
+from config import GameConfig, CarConfig, AudioConfig, ObstacleConfig, CollisionConfig
+from realistic_car import RealisticCarRenderer, CarSoundSystem, SilentSoundSystem
+from input_sources import DriverInput, KeyboardInput
+from surface_cache import LRUSurfaceCache
+from audio_queue import create_queued_sound_system
+
+_body_masks = {}  # 車体の大きさ → 量子化した向きごとの (マスク, ピクセル数)
+
+
+def get_body_masks(body):
+    """車体の当たり判定マスクを量子化した向きごとに作成（同じ大きさの車体で共有）"""
+    masks = _body_masks.get(body.get_size())
+    if masks is None:
+        masks = []
+        for angle in range(0, 360, CollisionConfig.MASK_ANGLE_STEP):
+            # 車の描画は上向きなので、物理の角度から90度引く
+            mask = pygame.mask.from_surface(pygame.transform.rotate(body, angle - 90))
+            masks.append((mask, mask.count()))
+        _body_masks[body.get_size()] = masks
+    return masks
+
 
 class RealisticRallyCar(pygame.sprite.Sprite):
-    def __init__(self, track=None):
+    def __init__(self, track=None, player_index=0, sound=True, body_color=None):
         super().__init__()
         self.track = track
+        self.player_index = player_index  # 分割画面でのプレイヤー番号（サウンドチャンネルの割り当て用）
+        self.sound = sound  # Falseなら音を出さない（CPU対戦相手用）
+        self.body_color = body_color  # 車体色（Noneなら既定の赤）
         self._setup_graphics()
         self._setup_physics()
         self._setup_transmission()
@@ -15,6 +37,8 @@ class RealisticRallyCar(pygame.sprite.Sprite):
     def _setup_graphics(self):
         """グラフィック関連の初期化（リアルな車）"""
         self.car_renderer = RealisticCarRenderer()
+        if self.body_color is not None:
+            self.car_renderer.body_color = self.body_color
         self.original_image = self.car_renderer.create_car_surface()
         self.drift_effect_surface = self.car_renderer.create_drift_effect_surface()
         
@@ -23,10 +47,19 @@ class RealisticRallyCar(pygame.sprite.Sprite):
         # 車を道の上の適切な位置に配置
         self.rect.center = (GameConfig.SCREEN_WIDTH // 2, GameConfig.SCREEN_HEIGHT * 0.8)
         self.original_rect = self.original_image.get_rect()
+        # 当たり判定用の車体マスク（起動時に全ての向きの分を作っておく）
+        self.body_masks = get_body_masks(self.original_image)
+        self.off_track_ratio = 0.0  # 車体のうちトラック外に出ている割合
+        
+        # 表示倍率（カメラのズーム）と倍率ごとの縮小済みスプライト
+        self.render_zoom = 1.0
+        self.scaled_sprites = LRUSurfaceCache(16)
+        self.zoomed_images = {}  # 分割画面で他のカメラの倍率に合わせた今フレームの画像
         
         # ドリフト状態
         self.is_drifting = False
         self.drift_intensity = 0.0
+        self.last_wheel_positions = None  # タイヤ痕用の前フレームの接地点
         
     def _setup_physics(self):
         """物理パラメータの初期化"""
@@ -35,6 +68,10 @@ class RealisticRallyCar(pygame.sprite.Sprite):
         self.velocity = pygame.math.Vector2(0, 0)
         self.steering_angle = 0
         
+        # 入力ソース（キーボード・スクリプト等を差し替え可能）
+        self.input_source = KeyboardInput()
+        self.controls = DriverInput()  # 直近フレームの操作
+        
     def _setup_transmission(self):
         """トランスミッション関連の初期化"""
         self.current_gear = 1
@@ -44,9 +81,38 @@ class RealisticRallyCar(pygame.sprite.Sprite):
         
     def _setup_sound(self):
         """サウンドシステムの初期化"""
-        self.sound_system = CarSoundSystem()
+        if self.sound:
+            self.sound_system = CarSoundSystem(self.player_index)
+            if AudioConfig.USE_AUDIO_THREAD:
+                self.sound_system = create_queued_sound_system(self.sound_system)
+        else:
+            self.sound_system = SilentSoundSystem()
         self.last_gear = self.current_gear
         
+    def reset(self, position=None):
+        """再スタート用に走行状態を初期化（スプライト・サウンドバッファは再利用）"""
+        if position is None:
+            position = (GameConfig.SCREEN_WIDTH // 2, GameConfig.SCREEN_HEIGHT - 100)
+        
+        self.direction = 90  # 上向き
+        self.position = pygame.math.Vector2(position)
+        self.velocity = pygame.math.Vector2(0, 0)
+        self.steering_angle = 0
+        self.controls = DriverInput()
+        
+        self.current_gear = 1
+        self.last_gear = self.current_gear
+        self.shift_up_pressed = False
+        self.shift_down_pressed = False
+        
+        self.is_drifting = False
+        self.drift_intensity = 0.0
+        self.last_wheel_positions = None
+        self.off_track_ratio = 0.0
+        
+        self.sound_system.reset()
+        self._update_graphics()
+        
     def set_track(self, track):
         """トラックを設定"""
         self.track = track
@@ -79,8 +145,7 @@ class RealisticRallyCar(pygame.sprite.Sprite):
         rpm = min_rpm_for_gear + (max_rpm_for_gear - min_rpm_for_gear) * speed_ratio
         
         # アクセル入力による微調整
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
+        if self.controls.throttle:
             rpm += 200  # アクセル時のRPM上昇
         
         return min(8000, rpm)
@@ -113,16 +178,7 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             return 1.0
         
         surface_type = self.track.get_surface_at_position(self.position)
-        
-        # 路面タイプ別のグリップ係数
-        grip_modifiers = {
-            "gravel": 0.8,   # グラベル：少し滑りやすい
-            "dirt": 0.7,     # ダート：滑りやすい
-            "tarmac": 1.2,   # ターマック：グリップ良好
-            "mud": 0.5,      # 泥：非常に滑りやすい
-        }
-        
-        return grip_modifiers.get(surface_type, 1.0)
+        return CarConfig.SURFACE_GRIP.get(surface_type, 1.0)
     
     def _get_surface_friction_modifier(self):
         """現在の路面に応じた摩擦修正値を取得"""
@@ -130,18 +186,9 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             return 1.0
         
         surface_type = self.track.get_surface_at_position(self.position)
-        
-        # 路面タイプ別の摩擦係数
-        friction_modifiers = {
-            "gravel": 0.9,   # グラベル：少し摩擦が少ない
-            "dirt": 0.7,     # ダート：摩擦が少ない（滑りやすい）
-            "tarmac": 1.3,   # ターマック：摩擦が大きい
-            "mud": 0.4,      # 泥：摩擦が非常に少ない
-        }
-        
-        return friction_modifiers.get(surface_type, 1.0)
+        return CarConfig.SURFACE_FRICTION.get(surface_type, 1.0)
     
-    def _calculate_acceleration(self, keys):
+    def _calculate_acceleration(self):
         """加速度の計算（重量感を考慮）"""
         gear_settings = CarConfig.GEAR_RATIOS[self.current_gear]
         base_acceleration = gear_settings["base_acceleration"]
@@ -157,25 +204,25 @@ class RealisticRallyCar(pygame.sprite.Sprite):
         
         return actual_acceleration * torque_slip_factor
     
-    def _handle_input(self, keys):
+    def _handle_input(self, controls):
         """入力処理"""
         # パドルシフト
-        if keys[pygame.K_q] and not self.shift_up_pressed:
+        if controls.shift_up and not self.shift_up_pressed:
             self.shift_up()
             self.shift_up_pressed = True
-        elif not keys[pygame.K_q]:
+        elif not controls.shift_up:
             self.shift_up_pressed = False
             
-        if keys[pygame.K_e] and not self.shift_down_pressed:
+        if controls.shift_down and not self.shift_down_pressed:
             self.shift_down()
             self.shift_down_pressed = True
-        elif not keys[pygame.K_e]:
+        elif not controls.shift_down:
             self.shift_down_pressed = False
         
         # ステアリング
-        if keys[pygame.K_LEFT]:
+        if controls.steer_left:
             self.steering_angle = min(self.steering_angle + 2, CarConfig.MAX_STEERING_ANGLE)
-        elif keys[pygame.K_RIGHT]:
+        elif controls.steer_right:
             self.steering_angle = max(self.steering_angle - 2, -CarConfig.MAX_STEERING_ANGLE)
         else:
             if abs(self.steering_angle) > 1:
@@ -183,26 +230,26 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             else:
                 self.steering_angle = 0
     
-    def _apply_acceleration(self, keys):
+    def _apply_acceleration(self, controls):
         """加速・減速の適用（重量感を考慮）"""
         current_speed = self.velocity.length()
         max_speed = CarConfig.GEAR_RATIOS[self.current_gear]["max_speed"]
         forward_vector = pygame.math.Vector2(1, 0).rotate(-self.direction)
         
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
+        if controls.throttle:
             if current_speed < max_speed:
-                acceleration = self._calculate_acceleration(keys)
+                acceleration = self._calculate_acceleration()
                 # 重量感を考慮した加速度適用
                 acceleration_force = acceleration / CarConfig.VEHICLE_MASS
                 self.velocity += forward_vector * acceleration_force
-        elif keys[pygame.K_DOWN] or keys[pygame.K_s]:
+        elif controls.brake:
             if current_speed < CarConfig.GEAR_RATIOS[1]["max_speed"] * 0.5:
                 brake_force = CarConfig.GEAR_RATIOS[1]["base_acceleration"] * 0.6 / CarConfig.VEHICLE_MASS
                 self.velocity -= forward_vector * brake_force
     
-    def _apply_friction(self, keys):
+    def _apply_friction(self, controls):
         """摩擦の適用（重量感と路面タイプを考慮した段階的減速）"""
-        if not (keys[pygame.K_UP] or keys[pygame.K_w] or keys[pygame.K_DOWN] or keys[pygame.K_s]):
+        if not (controls.throttle or controls.brake):
             if self.velocity.length() > 0:
                 current_speed = self.velocity.length()
                 
@@ -279,29 +326,87 @@ class RealisticRallyCar(pygame.sprite.Sprite):
                     self.direction += math.degrees(angular_velocity)
                     self.direction = self.direction % 360
     
+    def set_render_zoom(self, zoom):
+        """表示倍率を設定（次のグラフィック更新から反映）"""
+        self.render_zoom = zoom
+    
+    def _get_scaled_sprite(self, name, surface, zoom):
+        """指定倍率に縮小したスプライトを取得（倍率ごとにキャッシュ）"""
+        if zoom == 1.0:
+            return surface
+        size = (max(1, round(surface.get_width() * zoom)), max(1, round(surface.get_height() * zoom)))
+        return self.scaled_sprites.get((name, zoom), lambda: pygame.transform.scale(surface, size))
+    
     def _update_graphics(self):
         """グラフィックの更新"""
+        self.image = self._render_image(self.render_zoom)
+        self.zoomed_images = {}
+        self.rect = self.image.get_rect(center=self.position)
+    
+    def get_image(self, zoom):
+        """指定倍率での車の画像（分割画面で他のカメラに映すとき用）"""
+        if zoom == self.render_zoom:
+            return self.image
+        image = self.zoomed_images.get(zoom)
+        if image is None:
+            image = self._render_image(zoom)
+            self.zoomed_images[zoom] = image
+        return image
+    
+    def _render_image(self, zoom):
+        """現在の向き・ドリフト状態で車の画像を描画"""
         # 車の描画は上向きなので、物理の角度から90度引く
         display_angle = self.direction - 90
-        rotated_image = pygame.transform.rotate(self.original_image, display_angle)
+        original_image = self._get_scaled_sprite("car", self.original_image, zoom)
+        rotated_image = pygame.transform.rotate(original_image, display_angle)
         temp_rect = rotated_image.get_rect()
-        max_size = int((self.original_rect.width**2 + self.original_rect.height**2)**0.5) + 2
-        self.image = pygame.Surface((max_size, max_size), pygame.SRCALPHA)
-        self.image.blit(rotated_image, ((max_size - temp_rect.width) // 2, (max_size - temp_rect.height) // 2))
+        original_rect = original_image.get_rect()
+        max_size = int((original_rect.width**2 + original_rect.height**2)**0.5) + 2
+        image = pygame.Surface((max_size, max_size), pygame.SRCALPHA)
+        image.blit(rotated_image, ((max_size - temp_rect.width) // 2, (max_size - temp_rect.height) // 2))
         
         # ドリフトエフェクトの追加
         if self.is_drifting and self.drift_intensity > 0.5:
-            drift_effect = pygame.transform.rotate(self.drift_effect_surface, display_angle)
+            drift_effect = pygame.transform.rotate(self._get_scaled_sprite("drift", self.drift_effect_surface, zoom),
+                                                   display_angle)
             drift_rect = drift_effect.get_rect()
-            self.image.blit(drift_effect, ((max_size - drift_rect.width) // 2, (max_size - drift_rect.height) // 2), 
-                          special_flags=pygame.BLEND_ALPHA_SDL2)
+            image.blit(drift_effect, ((max_size - drift_rect.width) // 2, (max_size - drift_rect.height) // 2), 
+                       special_flags=pygame.BLEND_ALPHA_SDL2)
         
-        self.rect = self.image.get_rect(center=self.position)
+        return image
     
-    def _update_sound(self, keys):
+    def get_wheel_positions(self):
+        """4輪の接地点（ワールド座標）を取得"""
+        forward = pygame.math.Vector2(1, 0).rotate(-self.direction)
+        lateral = pygame.math.Vector2(0, 1).rotate(-self.direction)
+        # 車体サーフェス上のタイヤ位置（中心からの前後・左右オフセット）
+        return [self.position + forward * front + lateral * side
+                for front in (10, -8) for side in (-7, 7)]
+    
+    def rebase(self, shift_y):
+        """ワールド座標を shift_y だけ下にずらす（トラックの原点の移動に合わせる）"""
+        self.position.y += shift_y
+        if self.last_wheel_positions is not None:
+            for wheel in self.last_wheel_positions:
+                wheel.y += shift_y
+    
+    def get_skid_segments(self):
+        """ドリフト中のタイヤ痕の線分（前フレームの接地点→現在の接地点）を取得"""
+        if not self.is_drifting or self.velocity.length() < 1.0:
+            self.last_wheel_positions = None
+            return []
+        
+        wheels = self.get_wheel_positions()
+        previous = self.last_wheel_positions
+        self.last_wheel_positions = wheels
+        if previous is None:
+            return []
+        return [((p.x, p.y), (w.x, w.y)) for p, w in zip(previous, wheels)]
+    
+    def _update_sound(self, controls):
         """サウンドの更新"""
         rpm = self.get_rpm()
-        throttle_input = 1.0 if (keys[pygame.K_UP] or keys[pygame.K_w]) else 0.0
+        throttle_input = 1.0 if controls.throttle else 0.0
         current_speed = self.velocity.length()
         
         # エンジン音の更新（速度を渡す）
@@ -312,15 +417,55 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             self.sound_system.play_gear_sound()
             self.last_gear = self.current_gear
     
+    def is_off_track(self):
+        """車体が OFF_TRACK_RATIO を超えてトラック外にはみ出しているか（最後の当たり判定の結果）"""
+        return self.off_track_ratio > CollisionConfig.OFF_TRACK_RATIO
+    
+    def get_body_mask(self):
+        """現在の向きの車体マスクとピクセル数"""
+        index = round(self.direction / CollisionConfig.MASK_ANGLE_STEP) % len(self.body_masks)
+        return self.body_masks[index]
+    
+    def _handle_track_collisions(self, previous_position):
+        """車体マスクでトラック外・木や岩との当たり判定（中心点だけでなく車体全体で判定）
+        
+        木・岩に重なったら前フレームの位置に戻して跳ね返し、トラック外にはみ出した割合に応じて減速する。
+        """
+        mask, pixel_count = self.get_body_mask()
+        width, height = mask.get_size()
+        off_track, hit = self.track.check_body_collision(mask, (self.position.x - width / 2,
+                                                                self.position.y - height / 2))
+        self.off_track_ratio = off_track / pixel_count if pixel_count else 0.0
+        
+        if hit is not None:
+            # 重なった点に最も近い木・岩の中心から車へ向かう向きに跳ね返す
+            hit = pygame.math.Vector2(hit)
+            centers = self.track.get_solid_obstacles_near(hit, ObstacleConfig.SOLID_RADIUS)
+            center = min((pygame.math.Vector2(c) for c in centers), key=hit.distance_squared_to, default=hit)
+            offset = previous_position - center
+            normal = offset.normalize() if offset.length_squared() > 0 else pygame.math.Vector2(0, 1)
+            self.position.update(previous_position + normal)
+            approach = self.velocity.dot(normal)
+            if approach < 0:
+                self.velocity -= normal * approach * (1 + ObstacleConfig.BOUNCE)
+                self.velocity *= ObstacleConfig.IMPACT_SPEED_LOSS
+        
+        if self.off_track_ratio > 0:
+            self.velocity *= 1 - CollisionConfig.OFF_TRACK_DRAG * self.off_track_ratio
+        
+        if self.track.is_in_water(self.position):
+            self.velocity *= ObstacleConfig.WATER_DRAG
+    
     def update_for_endless_mode(self):
         """エンドレスモード用の更新処理"""
-        keys = pygame.key.get_pressed()
+        controls = self.input_source.read()
+        self.controls = controls
         
-        self._handle_input(keys)
-        self._apply_acceleration(keys)
-        self._apply_friction(keys)
+        self._handle_input(controls)
+        self._apply_acceleration(controls)
+        self._apply_friction(controls)
         self._apply_vehicle_physics()
-        self._update_sound(keys)
+        self._update_sound(controls)
         
         # 最大速度制限
         max_speed = CarConfig.GEAR_RATIOS[self.current_gear]["max_speed"]
@@ -328,33 +473,36 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             self.velocity = self.velocity.normalize() * max_speed
         
         # 位置更新
+        previous_position = pygame.math.Vector2(self.position)
         self.position += self.velocity
         
         # 横方向の境界制限のみ（縦方向は自由）
         self.position.x = max(20, min(self.position.x, GameConfig.SCREEN_WIDTH - 20))
         
         # 車が下に行きすぎないように制限（上方向への移動を促進）
-        if self.position.y > GameConfig.SCREEN_HEIGHT - 50:
-            self.position.y = GameConfig.SCREEN_HEIGHT - 50
+        # スタート地点基準の位置で判定する（原点を移した後のワールド座標は origin_y だけ大きい）
+        bottom_limit = GameConfig.SCREEN_HEIGHT - 50 + (getattr(self.track, "origin_y", 0) if self.track else 0)
+        if self.position.y > bottom_limit:
+            self.position.y = bottom_limit
+        
+        # 車体全体でのトラック外・木や岩・水たまりの判定
+        if self.track:
+            self._handle_track_collisions(previous_position)
         
         self.rect.center = self.position
         
         self._update_graphics()
-        
-        # トラックから外れた場合の処理
-        if self.track and not self.track.is_on_track(self.position):
-            # トラック外では速度を大幅に減少
-            self.velocity *= 0.95
     
     def update(self):
         """通常の更新処理"""
-        keys = pygame.key.get_pressed()
+        controls = self.input_source.read()
+        self.controls = controls
         
-        self._handle_input(keys)
-        self._apply_acceleration(keys)
-        self._apply_friction(keys)
+        self._handle_input(controls)
+        self._apply_acceleration(controls)
+        self._apply_friction(controls)
         self._apply_vehicle_physics()
-        self._update_sound(keys)
+        self._update_sound(controls)
         
         # 最大速度制限
         max_speed = CarConfig.GEAR_RATIOS[self.current_gear]["max_speed"]
@@ -362,16 +510,16 @@ class RealisticRallyCar(pygame.sprite.Sprite):
             self.velocity = self.velocity.normalize() * max_speed
         
         # 位置更新
+        previous_position = pygame.math.Vector2(self.position)
         self.position += self.velocity
         
         # 画面境界制限
         self.position.x = max(20, min(self.position.x, GameConfig.SCREEN_WIDTH - 20))
         self.position.y = max(20, min(self.position.y, GameConfig.SCREEN_HEIGHT - 20))
+        # 車体全体でのトラック外・木や岩・水たまりの判定
+        if self.track:
+            self._handle_track_collisions(previous_position)
+        
         self.rect.center = self.position
         
         self._update_graphics()
-        
-        # トラックから外れた場合の処理
-        if self.track and not self.track.is_on_track(self.position):
-            # トラック外では速度を大幅に減少
-            self.velocity *= 0.95
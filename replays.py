@@ -0,0 +1,111 @@
+import os
+import random
+import struct
+from input_sources import ReplayInput
+
+# 走行のリプレイ（ステージシードとフレームごとの操作）
+#
+# ファイル（リトルエンディアン）:
+#   ヘッダ : マジック・バージョン・ステージシード・対戦相手の台数・フレーム数・記録時の進行距離・
+#            ゲームオーバーの理由の長さ
+#   理由   : UTF-8（走行の途中で終えた記録は空）
+#   操作   : 1フレーム1バイト（DriverInput.to_bits() のビット列）
+# トラック・対戦相手・車の動きはステージシードと操作から決まるので、操作を順に与えて
+# ヘッドレスでゲームを更新すれば同じ走行が再現できる。
+
+MAGIC = b"QRRP"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHIBIdB")
+
+
+class Replay:
+    """1回の走行の記録"""
+
+    def __init__(self, stage_seed, opponents=0, inputs=b"", distance=0.0, game_over_reason=""):
+        self.stage_seed = stage_seed
+        self.opponents = opponents
+        self.inputs = bytes(inputs)
+        self.distance = distance  # 記録時の進行距離（m）
+        self.game_over_reason = game_over_reason
+
+    @property
+    def frames(self):
+        return len(self.inputs)
+
+    def to_bytes(self):
+        """ファイルの中身"""
+        reason = self.game_over_reason.encode("utf-8")[:255]
+        return HEADER.pack(MAGIC, VERSION, self.stage_seed, self.opponents, len(self.inputs),
+                           self.distance, len(reason)) + reason + self.inputs
+
+    @classmethod
+    def from_bytes(cls, data):
+        """to_bytes() の中身から作る（形式が違えば ValueError）"""
+        if len(data) < HEADER.size:
+            raise ValueError("not a replay")
+        magic, version, stage_seed, opponents, frames, distance, reason_size = HEADER.unpack_from(data, 0)
+        if magic != MAGIC:
+            raise ValueError("not a replay")
+        if version != VERSION:
+            raise ValueError(f"unsupported replay version {version}")
+        start = HEADER.size + reason_size
+        if len(data) < start + frames:
+            raise ValueError("truncated replay")
+        reason = bytes(data[HEADER.size:start]).decode("utf-8", errors="replace")
+        return cls(stage_seed, opponents, data[start:start + frames], distance, reason)
+
+    def save(self, path):
+        """ファイルに保存"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        """ファイルから読み込む（形式が違えば ValueError）"""
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def get_file_name(replay):
+    """リプレイの保存ファイル名（ステージシードとフレーム数）"""
+    return f"run-{replay.stage_seed:08x}-{replay.frames:06d}.qrrp"
+
+
+def create_game(replay, screen):
+    """replay を再生するゲーム（EndlessRallyGame、ヘッドレス用にフレームレート制限・リウィンドなし）"""
+    from endless_game import EndlessRallyGame
+
+    # パーティクルなどの見た目も、どのプロセスで再生しても同じになるように
+    random.seed(replay.stage_seed)
+    game = EndlessRallyGame(screen, stage_seed=replay.stage_seed, opponents=replay.opponents)
+    game.particles.reseed(replay.stage_seed)
+    game.fps_limit = 0
+    game.snapshots = None
+    game.ui.show_rewind_help = False
+    game.car.input_source = ReplayInput(replay.inputs)
+    return game
+
+
+def reuse_game(game, replay):
+    """create_game() で作ったゲームを、対戦相手の台数が同じ別のリプレイの再生に使い回す
+
+    トラック・車・対戦相手はステージシードからその場で作り直すので、作り直した状態は
+    create_game() の直後と同じになる（タイルや車のサーフェスは再利用する）。
+    """
+    game.track.stage_seed = replay.stage_seed
+    game.restart()
+    game.car.input_source = ReplayInput(replay.inputs)
+
+
+def advance(game, frames):
+    """描画せずに最大 frames フレーム進める（ゲームオーバーで止まる）、進めたフレーム数を返す"""
+    for frame in range(frames):
+        if game.game_over:
+            return frame
+        game.update()
+        game.frame_count += 1
+    return frames
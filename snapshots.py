@@ -0,0 +1,188 @@
+import os
+import struct
+from config import SnapshotConfig
+
+# 走行状態のスナップショット（リウィンドと途中保存・再開）
+#
+# 1つのスナップショットは固定長のフラットなレコード（リトルエンディアン）:
+#   ゲーム : フレーム番号・ステージシード・原点の移動量・チャンクの範囲（最も下と上のチャンクのタイルY）・
+#            進行距離・難易度・カメラ・デスライン・タイマー・ベスト記録・対戦相手の判断フレーム・車の台数
+#   車     : 自車、続いて対戦相手ごとに位置・速度・向き・舵角・ドリフト量・ギア・フラグ
+# トラックはステージシードとチャンクの範囲だけで作り直せるので、タイルは保存しない。
+# pickle やオブジェクトのコピーは使わず、struct でリングバッファのスロットに直接書き込む。
+
+MAGIC = b"QRSV"
+VERSION = 2
+
+GAME = struct.Struct("<IIqiidddBBdddBHHdIB")
+CAR = struct.Struct("<7dbbB")
+FILE_HEADER = struct.Struct("<4sHH")  # マジック・バージョン・レコード長
+
+# 車のフラグ
+FLAG_SHIFT_UP = 0x01
+FLAG_SHIFT_DOWN = 0x02
+FLAG_DRIFTING = 0x04
+FLAG_ACTIVE = 0x08  # 走行中（リタイアしていない対戦相手）
+
+_FRAME = struct.Struct("<I")
+
+
+def get_record_size(car_count):
+    """車 car_count 台分のスナップショットのバイト数"""
+    return GAME.size + CAR.size * car_count
+
+
+def _get_cars(game):
+    """スナップショットに含める車 [(車, 走行中か)]（自車が先頭）"""
+    cars = [(game.car, True)]
+    if game.opponents is not None:
+        cars.extend(zip(game.opponents.cars, game.opponents.active))
+    return cars
+
+
+def capture_into(buffer, offset, game):
+    """game（EndlessRallyGame）の状態を buffer の offset から書き込む"""
+    track = game.track
+    camera = track.camera
+    death_line = game.death_line
+    cars = _get_cars(game)
+    bottom, top = track.get_window()
+    GAME.pack_into(buffer, offset, game.frame_count, track.stage_seed, track.origin_y, bottom, top,
+                   track.distance_traveled, track.difficulty, camera.camera_y, camera.zoom_level, camera.zoom_cooldown,
+                   death_line.y_position, death_line.current_speed, death_line.pulse_timer, death_line.warning_alpha,
+                   min(65535, getattr(game, "off_track_timer", 0)), min(65535, getattr(game, "stuck_timer", 0)),
+                   game.best_distance, game.opponents.frame if game.opponents is not None else 0, len(cars))
+    offset += GAME.size
+    for car, active in cars:
+        flags = ((FLAG_SHIFT_UP if car.shift_up_pressed else 0) | (FLAG_SHIFT_DOWN if car.shift_down_pressed else 0) |
+                 (FLAG_DRIFTING if car.is_drifting else 0) | (FLAG_ACTIVE if active else 0))
+        CAR.pack_into(buffer, offset, car.position.x, car.position.y, car.velocity.x, car.velocity.y,
+                      car.direction, car.steering_angle, car.drift_intensity, car.current_gear, car.last_gear, flags)
+        offset += CAR.size
+
+
+def restore(game, data):
+    """スナップショット data（bytes・memoryview）を game に適用（車の台数が違えば ValueError）"""
+    if len(data) < GAME.size:
+        raise ValueError("truncated snapshot")
+    (frame, stage_seed, origin_y, bottom, top, distance, difficulty, camera_y, zoom_level, zoom_cooldown,
+     death_y, death_speed, death_pulse, death_alpha, off_track_timer, stuck_timer, best_distance,
+     opponent_frame, car_count) = GAME.unpack_from(data, 0)
+    cars = _get_cars(game)
+    if car_count != len(cars):
+        raise ValueError(f"snapshot has {car_count} cars, this game has {len(cars)}")
+    if len(data) < get_record_size(car_count):
+        raise ValueError("truncated snapshot")
+
+    track = game.track
+    track.restore_window(stage_seed, origin_y, bottom, top)
+    track.distance_traveled = distance
+    track.difficulty = difficulty
+    camera = track.camera
+    camera.set_zoom_level(zoom_level)
+    camera.zoom_cooldown = zoom_cooldown
+    camera.camera_y = camera_y
+
+    death_line = game.death_line
+    death_line.y_position = death_y
+    death_line.current_speed = death_speed
+    death_line.pulse_timer = death_pulse
+    death_line.warning_alpha = death_alpha
+
+    game.frame_count = frame + 1  # スナップショットはそのフレームの更新の後で取っている
+    game.off_track_timer = off_track_timer
+    game.stuck_timer = stuck_timer
+    game.best_distance = max(game.best_distance, best_distance)
+    game.game_over = False
+    game.game_over_reason = ""
+
+    offset = GAME.size
+    for index, (car, _) in enumerate(cars):
+        x, y, vx, vy, direction, steering, drift, gear, last_gear, flags = CAR.unpack_from(data, offset)
+        offset += CAR.size
+        car.position.update(x, y)
+        car.velocity.update(vx, vy)
+        car.direction = direction
+        car.steering_angle = steering
+        car.drift_intensity = drift
+        car.current_gear = gear
+        car.last_gear = last_gear
+        car.shift_up_pressed = bool(flags & FLAG_SHIFT_UP)
+        car.shift_down_pressed = bool(flags & FLAG_SHIFT_DOWN)
+        car.is_drifting = bool(flags & FLAG_DRIFTING)
+        car.last_wheel_positions = None
+        car.set_render_zoom(camera.zoom)
+        if index > 0:
+            game.opponents.active[index - 1] = bool(flags & FLAG_ACTIVE)
+    if game.opponents is not None:
+        game.opponents.resume(opponent_frame)
+
+
+class SnapshotRing:
+    """固定長スナップショットのリングバッファ（スロットを使い回し、取得時にメモリを確保しない）"""
+
+    def __init__(self, record_size, capacity=SnapshotConfig.CAPACITY):
+        self.record_size = record_size
+        self.capacity = capacity
+        self.buffer = bytearray(record_size * capacity)
+        self.newest = -1  # 最も新しいスロット
+        self.count = 0
+
+    def clear(self):
+        """全スナップショットを捨てる"""
+        self.newest = -1
+        self.count = 0
+
+    def capture(self, game):
+        """game の状態を次のスロットに書き込む（満杯なら最も古いものを上書き）"""
+        self.newest = (self.newest + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        capture_into(self.buffer, self.newest * self.record_size, game)
+
+    def _slot(self, age):
+        """age 個前（0が最新）のスナップショットのスロット番号"""
+        return (self.newest - age) % self.capacity
+
+    def _frame(self, slot):
+        return _FRAME.unpack_from(self.buffer, slot * self.record_size)[0]
+
+    def rewind(self, frame):
+        """フレーム番号 frame 以前で最も新しいスナップショット（無ければ最も古いもの）を返す
+
+        それより新しいスナップショットは捨てる。1つも無ければNone。
+        """
+        if not self.count:
+            return None
+        age = 0
+        while age < self.count - 1 and self._frame(self._slot(age)) > frame:
+            age += 1
+        self.newest = self._slot(age)
+        self.count -= age
+        start = self.newest * self.record_size
+        return memoryview(self.buffer)[start:start + self.record_size]
+
+
+def save_run(game, path):
+    """今の状態をファイルに保存"""
+    data = bytearray(get_record_size(len(_get_cars(game))))
+    capture_into(data, 0, game)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(FILE_HEADER.pack(MAGIC, VERSION, len(data)))
+        f.write(data)
+
+
+def load_run(game, path):
+    """保存した状態を読み込んで game に適用（形式が違えば ValueError）"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if len(data) < FILE_HEADER.size:
+        raise ValueError("not a saved run")
+    magic, version, size = FILE_HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a saved run")
+    if version != VERSION:
+        raise ValueError(f"unsupported saved run version {version}")
+    restore(game, memoryview(data)[FILE_HEADER.size:FILE_HEADER.size + size])
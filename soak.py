@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+ソークテスト
+自動運転でエンドレスモードを長距離走らせ、メモリ・オブジェクト数・フレーム時間が
+増え続けないことを確認します
+
+    python soak.py --distance 20 --seed 42
+    python soak.py --distance 200 --opponents 4 -o soak.json
+"""
+
+import os
+
+# SDLはpygame初期化時に環境変数を読むので、pygameより先に設定する
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import gc
+import json
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import pygame
+
+from config import GameConfig
+
+DEFAULT_DISTANCE = 20  # 走らせる距離の既定値（km、ゲームオーバーで再スタートした分も合計）
+DEFAULT_SAMPLE_INTERVAL = 1000  # 計測の間隔（m）
+DEFAULT_TOLERANCE = 0.10  # メモリ・オブジェクト数の増加の許容量（平均に対する割合）
+DEFAULT_TIME_TOLERANCE = 0.25  # フレーム時間の増加の許容量（ばらつきが大きいので広めに）
+WARMUP_SAMPLES = 2  # キャッシュが埋まるまでの最初の計測は傾向の判定に使わない
+
+# 傾向（最小二乗の傾き）で判定する指標
+COUNT_METRICS = ("traced_kb", "gc_objects", "chunks")
+TIME_METRICS = ("frame_p50_ms", "frame_p95_ms", "frame_p99_ms")
+# 上限のあるキャッシュ（上限までは埋まっていくのが正常なので、上限を超えたときだけ失敗にする）
+BOUNDED_METRICS = ("retired_chunks", "tile_surfaces", "scaled_chunk_cache", "free_chunk_surfaces", "car_sprites",
+                   "particle_sprites")
+
+DRIVERS = ("autopilot", "ai")  # autopilot: トラック中心線を追う, ai: 対戦相手のレーシングライン
+
+
+def make_driver(name, car):
+    """自動運転の入力ソース"""
+    if name == "ai":
+        from ai_driver import RacingLineInput
+
+        return RacingLineInput(car)
+    from input_sources import AutopilotInput
+
+    return AutopilotInput(car)
+
+
+def percentile(values, fraction):
+    """values（昇順に並べ替え済み）の fraction 分位点"""
+    index = min(len(values) - 1, int(fraction * len(values)))
+    return values[index]
+
+
+def get_trend(values):
+    """最小二乗の傾きから求めた、全区間での増加量の平均に対する割合"""
+    count = len(values)
+    if count < 2:
+        return 0.0
+    mean_x = (count - 1) / 2
+    mean_y = statistics.mean(values)
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) /
+             sum((x - mean_x) ** 2 for x in range(count)))
+    return slope * (count - 1) / max(abs(mean_y), 1.0)
+
+
+class SoakRun:
+    """ゲームを自動運転で走らせ、一定距離ごとに計測する"""
+
+    def __init__(self, seed, opponents=0, driver=DRIVERS[0], trace=True):
+        from endless_game import EndlessRallyGame
+
+        random.seed(seed)  # ステージシード（再スタート時のものも含む）を再現できるように
+        self.screen = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+        self.game = EndlessRallyGame(self.screen, opponents=opponents)
+        self.game.fps_limit = 0
+        self.game.car.input_source = make_driver(driver, self.game.car)
+        self.limits = self._get_limits()
+        self.trace = trace
+        self.completed_distance = 0.0  # ゲームオーバーまでに走った距離の合計（m）
+        self.restarts = 0
+        self.frame_times = []
+        self.samples = []
+        self.first_snapshot = None
+        self.last_snapshot = None
+
+    def _get_limits(self):
+        """上限のあるキャッシュの上限"""
+        from endless_track_advanced import EndlessTrackConfig
+
+        track = self.game.track
+        return {
+            "retired_chunks": EndlessTrackConfig.RETIRED_CHUNKS,
+            # タイルの種類ごとに8パターン
+            "tile_surfaces": len(EndlessTrackConfig.COLORS) * 8,
+            "scaled_chunk_cache": track.scaled_chunk_cache.capacity,
+            "free_chunk_surfaces": EndlessTrackConfig.FREE_CHUNK_SURFACES,
+            "car_sprites": self.game.car.scaled_sprites.capacity,
+            "particle_sprites": self.game.particles.scaled_sprites.capacity,
+        }
+
+    def get_distance(self):
+        """ここまでに走った距離（m）"""
+        return self.completed_distance + self.game.track.get_distance_traveled()
+
+    def step(self):
+        """1フレーム進める（ゲームオーバーならその場で再スタート）"""
+        game = self.game
+        start = time.perf_counter()
+        game.run_frame()
+        pygame.display.flip()
+        self.frame_times.append(time.perf_counter() - start)
+        if game.game_over:
+            self.completed_distance += game.track.get_distance_traveled()
+            self.restarts += 1
+            game.restart()
+
+    def sample(self):
+        """今の計測値を記録（フレーム時間はこの区間の分）"""
+        game = self.game
+        track = game.track
+        gc.collect()
+        times = sorted(self.frame_times)
+        self.frame_times = []
+        sample = {
+            "distance_km": self.get_distance() / 1000,
+            "frame": game.frame_count,
+            "restarts": self.restarts,
+            "gc_objects": len(gc.get_objects()),
+            "chunks": len(track.chunks),
+            "retired_chunks": len(track.retired_chunks),
+            "tile_surfaces": len(track.tile_surfaces),
+            "scaled_chunk_cache": len(track.scaled_chunk_cache),
+            "free_chunk_surfaces": len(track.free_chunk_surfaces),
+            "car_sprites": len(game.car.scaled_sprites),
+            "particle_sprites": len(game.particles.scaled_sprites),
+            "frame_p50_ms": percentile(times, 0.50) * 1000 if times else 0.0,
+            "frame_p95_ms": percentile(times, 0.95) * 1000 if times else 0.0,
+            "frame_p99_ms": percentile(times, 0.99) * 1000 if times else 0.0,
+        }
+        if self.trace:
+            sample["traced_kb"] = tracemalloc.get_traced_memory()[0] / 1024
+            # 比較用に、判定に使う最初の計測と最新の計測のスナップショットだけを残す
+            self.last_snapshot = tracemalloc.take_snapshot()
+            if len(self.samples) == WARMUP_SAMPLES:
+                self.first_snapshot = self.last_snapshot
+        self.samples.append(sample)
+        return sample
+
+    def run(self, distance, interval, max_frames=None):
+        """distance (m) を走るまで interval (m) ごとに計測"""
+        if self.trace:
+            tracemalloc.start()
+        next_sample = 0.0
+        while self.get_distance() < distance:
+            if max_frames is not None and self.game.frame_count >= max_frames:
+                print(f"Stopped at the frame limit ({max_frames})")
+                break
+            self.step()
+            if self.get_distance() >= next_sample:
+                _print_sample(self.sample())
+                next_sample += interval
+        if self.frame_times:
+            _print_sample(self.sample())
+        if self.trace:
+            tracemalloc.stop()
+
+    def check_trends(self, tolerance, time_tolerance):
+        """ウォームアップ後の計測で増え続けている指標と上限を超えたキャッシュ [(名前, 値)] を返す"""
+        samples = self.samples[WARMUP_SAMPLES:]
+        failures = []
+        print(f"\n{'metric':22s} {'first':>12s} {'last':>12s} {'trend':>9s}")
+        for name in COUNT_METRICS + TIME_METRICS:
+            if not samples or name not in samples[0]:
+                continue
+            values = [sample[name] for sample in samples]
+            trend = get_trend(values)
+            limit = time_tolerance if name in TIME_METRICS else tolerance
+            flag = ""
+            if len(values) >= 3 and trend > limit:
+                flag = "  GROWING"
+                failures.append((name, trend))
+            print(f"{name:22s} {values[0]:12.2f} {values[-1]:12.2f} {trend:+8.1%}{flag}")
+
+        for name in BOUNDED_METRICS:
+            peak = max(sample[name] for sample in self.samples)
+            flag = ""
+            if peak > self.limits[name]:
+                flag = "  OVER LIMIT"
+                failures.append((name, peak))
+            print(f"{name:22s} {'peak':>12s} {peak:12d} {'limit':>5s} {self.limits[name]}{flag}")
+        return failures
+
+    def print_allocation_growth(self, limit=10):
+        """判定区間でメモリの増えたコード行（tracemalloc のスナップショットの比較）"""
+        if self.first_snapshot is None or self.last_snapshot is None:
+            return
+        print(f"\nTop allocation growth since sample {WARMUP_SAMPLES}:")
+        for stat in self.last_snapshot.compare_to(self.first_snapshot, "lineno")[:limit]:
+            print(f"  {stat}")
+
+
+def _print_sample(sample):
+    traced = f"{sample['traced_kb']:10.0f} KB" if "traced_kb" in sample else ""
+    print(f"{sample['distance_km']:8.2f} km  frame {sample['frame']:8d}  restarts {sample['restarts']:4d}  "
+          f"objects {sample['gc_objects']:8d}{traced}  "
+          f"p50 {sample['frame_p50_ms']:6.2f} ms  p95 {sample['frame_p95_ms']:6.2f} ms  "
+          f"p99 {sample['frame_p99_ms']:6.2f} ms")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally soak test")
+    parser.add_argument("--distance", type=float, default=DEFAULT_DISTANCE,
+                        help=f"simulated distance in km, summed over restarts (default: {DEFAULT_DISTANCE})")
+    parser.add_argument("--interval", type=float, default=DEFAULT_SAMPLE_INTERVAL,
+                        help=f"sample every N meters (default: {DEFAULT_SAMPLE_INTERVAL})")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the stages (default: 42)")
+    parser.add_argument("--opponents", type=int, default=0, help="AI opponents on the track (default: 0)")
+    parser.add_argument("--driver", choices=DRIVERS, default=DRIVERS[0], help="driver for the player's car")
+    parser.add_argument("--max-frames", type=int, default=None, help="stop after this many frames")
+    parser.add_argument("-t", "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed growth of memory and object counts (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE,
+                        help=f"allowed growth of frame-time percentiles (default: {DEFAULT_TIME_TOLERANCE})")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="do not trace allocations (faster, frame times closer to a normal run)")
+    parser.add_argument("-o", "--output", help="write the samples to this JSON file")
+    args = parser.parse_args(argv)
+
+    pygame.init()
+    soak = SoakRun(args.seed, args.opponents, args.driver, trace=not args.no_tracemalloc)
+    start = time.perf_counter()
+    soak.run(args.distance * 1000, args.interval, args.max_frames)
+    elapsed = time.perf_counter() - start
+    frames = soak.game.frame_count
+    print(f"\n{soak.get_distance() / 1000:.2f} km in {frames} frames, {soak.restarts} restart(s), "
+          f"{elapsed:.1f} s ({frames / elapsed:.0f} frames/s)")
+
+    failures = soak.check_trends(args.tolerance, args.time_tolerance)
+    soak.print_allocation_growth()
+    if args.output:
+        from benchmark import machine_info
+
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "machine": machine_info(),
+                       "args": vars(args), "samples": soak.samples,
+                       "failures": [name for name, _ in failures]}, f, indent=2)
+        print(f"Results written to {args.output}")
+    pygame.quit()
+
+    if failures:
+        print(f"\n{len(failures)} metric(s) kept growing: {', '.join(name for name, _ in failures)}")
+        return 1
+    print("\nNo growth beyond tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import array
+import hashlib
+import json
+import math
+import os
+import random
+import threading
+import time
+import pygame
+from config import AudioConfig
+
+
+# 合成パラメータ（変更するとディスクキャッシュのキーも変わる）
+SYNTH_VERSION = 1
+ENGINE_RPM_LEVELS = (1000, 2000, 3000, 4000, 5000, 6000, 7000, 8000)
+ENGINE_WAVETABLE_RPMS = tuple(range(AudioConfig.ENGINE_WAVETABLE_MIN_RPM,
+                                    AudioConfig.ENGINE_WAVETABLE_MAX_RPM + 1,
+                                    AudioConfig.ENGINE_WAVETABLE_RPM_STEP))
+
+
+def engine_sound_name(rpm):
+    """エンジン音のバンク内の名前"""
+    return f"engine_{rpm}"
+
+
+def engine_loop_name(rpm):
+    """ウェーブテーブル用エンジンループのバンク内の名前"""
+    return f"engine_loop_{rpm}"
+
+
+def default_sound_specs():
+    """ゲームで使うサウンドの合成パラメータ一覧"""
+    specs = {engine_sound_name(rpm): {"type": "engine", "rpm": rpm, "duration": 0.5}
+             for rpm in ENGINE_RPM_LEVELS}
+    if AudioConfig.ENGINE_AUDIO_MODE == "crossfade":
+        for rpm in ENGINE_WAVETABLE_RPMS:
+            specs[engine_loop_name(rpm)] = {"type": "engine_loop", "rpm": rpm,
+                                            "duration": AudioConfig.ENGINE_LOOP_DURATION}
+    specs["skid"] = {"type": "skid", "frequency": 2000, "duration": 0.5}
+    specs["gear"] = {"type": "gear", "frequency": 1000, "duration": 0.2}
+    return specs
+
+
+def _engine_base_frequency(rpm):
+    """RPMに応じた基本周波数（30Hz～180Hz）"""
+    return 30 + (rpm / 8000) * 150
+
+
+def _synthesize_wave(spec, sample_rate, seed):
+    """1チャンネル分の波形（-1～1）を合成"""
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    duration = spec["duration"]
+    t = np.linspace(0, duration, int(sample_rate * duration))
+
+    if spec["type"] == "engine_loop":
+        # ループの継ぎ目でクリックしないよう、基本波の整数周期ちょうどの長さにする
+        rpm = spec["rpm"]
+        periods = max(1, round(_engine_base_frequency(rpm) * duration))
+        samples = round(periods * sample_rate / _engine_base_frequency(rpm))
+        base_freq = periods * sample_rate / samples
+        t = np.arange(samples) / sample_rate
+
+        wave = (np.sin(2 * np.pi * base_freq * t) * 0.4
+                + np.sin(2 * np.pi * base_freq * 2 * t) * 0.2
+                + np.sin(2 * np.pi * base_freq * 3 * t) * 0.1)
+        noise_intensity = 0.05 + (rpm / 8000) * 0.15
+        return (wave + rng.normal(0, noise_intensity, samples)) * 0.3
+
+    if spec["type"] == "engine":
+        rpm = spec["rpm"]
+        # RPMに応じた基本周波数を計算
+        base_freq = _engine_base_frequency(rpm)
+
+        # 複数の周波数を重ねてエンジン音を作成
+        wave1 = np.sin(2 * np.pi * base_freq * t) * 0.4
+        wave2 = np.sin(2 * np.pi * base_freq * 2 * t) * 0.2  # 2倍音
+        wave3 = np.sin(2 * np.pi * base_freq * 3 * t) * 0.1  # 3倍音
+
+        # RPMが高いほどノイズを追加（排気音の表現）
+        noise_intensity = 0.05 + (rpm / 8000) * 0.15
+        noise = rng.normal(0, noise_intensity, len(t))
+
+        return (wave1 + wave2 + wave3 + noise) * 0.3
+
+    if spec["type"] == "skid":
+        # 高周波のノイズでスキール音を作成
+        wave = np.sin(2 * np.pi * spec["frequency"] * t) * 0.5
+        noise = rng.normal(0, 0.3, len(t))
+        return (wave + noise) * 0.4
+
+    if spec["type"] == "gear":
+        # クリック音（短いパルス）
+        envelope = np.exp(-t * 10)  # 減衰エンベロープ
+        return np.sin(2 * np.pi * spec["frequency"] * t) * envelope * 0.3
+
+    raise ValueError(f"Unknown sound type: {spec['type']}")
+
+
+def resolve_synth_backend(backend):
+    """合成方式を決定（"auto" はNumPyが読み込めれば "numpy"、無ければ "array"）"""
+    if backend != "auto":
+        return backend
+    try:
+        import numpy  # noqa: F401
+        return "numpy"
+    except ImportError:
+        return "array"
+
+
+def _array_wave(spec, sample_rate, rng):
+    """NumPyを使わない波形生成（サンプル数と、番号→波形値 -1～1 の関数）"""
+    two_pi = 2 * math.pi
+    sin = math.sin
+    gauss = rng.gauss
+    duration = spec["duration"]
+
+    if spec["type"] == "engine_loop":
+        # ループの継ぎ目でクリックしないよう、基本波の整数周期ちょうどの長さにする
+        rpm = spec["rpm"]
+        periods = max(1, round(_engine_base_frequency(rpm) * duration))
+        samples = round(periods * sample_rate / _engine_base_frequency(rpm))
+        step = two_pi * (periods * sample_rate / samples) / sample_rate
+        noise_intensity = 0.05 + (rpm / 8000) * 0.15
+        return samples, lambda i: (sin(step * i) * 0.4 + sin(2 * step * i) * 0.2 + sin(3 * step * i) * 0.1
+                                   + gauss(0, noise_intensity)) * 0.3
+
+    samples = int(sample_rate * duration)
+    dt = duration / max(1, samples - 1)  # np.linspace と同じ時刻の刻み
+
+    if spec["type"] == "engine":
+        rpm = spec["rpm"]
+        step = two_pi * _engine_base_frequency(rpm) * dt
+        noise_intensity = 0.05 + (rpm / 8000) * 0.15
+        return samples, lambda i: (sin(step * i) * 0.4 + sin(2 * step * i) * 0.2 + sin(3 * step * i) * 0.1
+                                   + gauss(0, noise_intensity)) * 0.3
+
+    if spec["type"] == "skid":
+        step = two_pi * spec["frequency"] * dt
+        return samples, lambda i: (sin(step * i) * 0.5 + gauss(0, 0.3)) * 0.4
+
+    if spec["type"] == "gear":
+        step = two_pi * spec["frequency"] * dt
+        return samples, lambda i: sin(step * i) * math.exp(-i * dt * 10) * 0.3
+
+    raise ValueError(f"Unknown sound type: {spec['type']}")
+
+
+def synthesize_array_steps(spec, sample_rate, channels, out, seed=0, block_size=2048):
+    """NumPyを使わずにミキサー形式（int16, チャンネル交互）のサンプルを out に追加
+
+    block_size サンプルごとに yield するので、スレッドが使えない環境でも
+    フレームの合間に少しずつ合成できる。
+    """
+    samples, wave = _array_wave(spec, sample_rate, random.Random(seed))
+    for start in range(0, samples, block_size):
+        block = array.array("h")
+        for i in range(start, min(samples, start + block_size)):
+            value = int(max(-1.0, min(1.0, wave(i))) * 32767)
+            block.extend((value,) * channels)
+        out.extend(block)
+        yield
+
+
+def synthesize_array(spec, sample_rate, channels, seed=0):
+    """NumPyを使わずにミキサー形式のサンプル配列（array.array('h')）を作成"""
+    out = array.array("h")
+    for _ in synthesize_array_steps(spec, sample_rate, channels, out, seed):
+        pass
+    return out
+
+
+def synthesize(spec, sample_rate, channels, seed=0):
+    """合成パラメータからミキサー形式（int16, C連続）のサンプル配列を作成"""
+    import numpy as np
+
+    wave = _synthesize_wave(spec, sample_rate, seed)
+    samples = (np.clip(wave, -1.0, 1.0) * 32767).astype(np.int16)
+    if channels > 1:
+        samples = np.repeat(samples[:, None], channels, axis=1)
+    return np.ascontiguousarray(samples)
+
+
+class SoundBank:
+    """合成済みサウンドバッファをプロセス内で共有するバンク
+
+    バッファは一度だけ（バックグラウンドスレッドで）合成し、合成パラメータを
+    キーにしたディスクキャッシュに保存する。合成が終わるまで get() は None を返すので、
+    ゲームループがサウンド合成を待つことはない。スレッドが使えない環境（Web版）では
+    step() を毎フレーム呼ぶと、時間予算の範囲で少しずつ合成する。
+    """
+
+    def __init__(self, specs, sample_rate, channels, cache_dir=None, backend="auto"):
+        self.specs = specs
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.cache_dir = cache_dir
+        self.backend = backend  # "auto" は準備開始時に決定
+
+        self.buffers = {}  # 名前 -> int16サンプル配列
+        self.sounds = {}  # 名前 -> pygame.mixer.Sound（初回取得時に作成）
+        self.ready = threading.Event()
+        self.error = None
+        self._thread = None
+        self._steps = None  # 分割合成の進行状況（ジェネレータ）
+        self._lock = threading.Lock()
+
+    def cache_key(self):
+        """合成パラメータから決まるキャッシュキー"""
+        params = json.dumps({"version": SYNTH_VERSION, "sample_rate": self.sample_rate,
+                             "channels": self.channels, "specs": self.specs}, sort_keys=True)
+        return hashlib.sha1(params.encode("utf-8")).hexdigest()[:16]
+
+    def cache_path(self):
+        """ディスクキャッシュのパス（無効ならNone）"""
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, f"sounds-{self.cache_key()}.npz")
+
+    def start(self, background=True):
+        """バッファの準備を開始（2回目以降の呼び出しは何もしない）"""
+        with self._lock:
+            if self._thread is not None or self._steps is not None or self.ready.is_set():
+                return
+            if background:
+                self._thread = threading.Thread(target=self._prepare, name="SoundBank", daemon=True)
+                try:
+                    self._thread.start()
+                    return
+                except RuntimeError:
+                    # スレッドが使えない環境（Web版など）では step() で少しずつ準備する
+                    self._thread = None
+                    self._steps = self._prepare_steps()
+                    return
+        self._prepare()
+
+    def step(self, budget=AudioConfig.INCREMENTAL_SYNTHESIS_BUDGET):
+        """分割合成を最大 budget 秒だけ進める（準備完了ならTrue）"""
+        if self._steps is None:
+            return self.ready.is_set()
+        deadline = time.perf_counter() + budget
+        for _ in self._steps:
+            if time.perf_counter() >= deadline:
+                return False
+        self._steps = None
+        return True
+
+    def wait(self, timeout=None):
+        """準備完了を待つ"""
+        return self.ready.wait(timeout)
+
+    def _prepare(self):
+        """ディスクキャッシュから読み込むか、全バッファを合成"""
+        for _ in self._prepare_steps():
+            pass
+
+    def _prepare_steps(self):
+        """準備処理本体（合成の区切りごとに yield する）"""
+        try:
+            self.backend = resolve_synth_backend(self.backend)
+            if not self._load_cache():
+                for index, (name, spec) in enumerate(self.specs.items()):
+                    if self.backend == "numpy":
+                        self.buffers[name] = synthesize(spec, self.sample_rate, self.channels, seed=index)
+                        yield
+                    else:
+                        buffer = array.array("h")
+                        yield from synthesize_array_steps(spec, self.sample_rate, self.channels, buffer, seed=index)
+                        self.buffers[name] = buffer
+                self._save_cache()
+        except Exception as e:
+            print(f"Warning: Could not generate sounds: {e}")
+            self.error = e
+        finally:
+            self.ready.set()
+
+    def _load_cache(self):
+        """ディスクキャッシュの読み込み（NumPy形式のみ）"""
+        path = self.cache_path()
+        if path is None or self.backend != "numpy" or not os.path.exists(path):
+            return False
+        try:
+            import numpy as np
+            with np.load(path) as data:
+                if set(data.files) != set(self.specs):
+                    return False
+                for name in data.files:
+                    self.buffers[name] = np.ascontiguousarray(data[name])
+            return True
+        except Exception as e:
+            print(f"Warning: Could not read sound cache {path}: {e}")
+            self.buffers = {}
+            return False
+
+    def _save_cache(self):
+        """ディスクキャッシュへの保存（一時ファイルに書いてから置き換え）"""
+        path = self.cache_path()
+        if path is None or self.backend != "numpy":
+            return
+        try:
+            import numpy as np
+            os.makedirs(self.cache_dir, exist_ok=True)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.savez(f, **self.buffers)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write sound cache {path}: {e}")
+
+    def get(self, name):
+        """サウンドを取得（準備中または合成失敗時はNone）"""
+        sound = self.sounds.get(name)
+        if sound is not None:
+            return sound
+        if not self.ready.is_set():
+            return None
+        buffer = self.buffers.get(name)
+        if buffer is None:
+            return None
+        # NumPy配列・array.array のどちらもバッファプロトコルでそのまま渡せる
+        sound = pygame.mixer.Sound(buffer=buffer)
+        self.sounds[name] = sound
+        return sound
+
+
+_sound_bank = None
+
+
+def get_sound_bank():
+    """プロセス共通のサウンドバンクを取得（ミキサー初期化後に呼ぶ）"""
+    global _sound_bank
+    sample_rate, _, channels = pygame.mixer.get_init()
+    if _sound_bank is None or (_sound_bank.sample_rate, _sound_bank.channels) != (sample_rate, channels):
+        cache_dir = AudioConfig.SOUND_CACHE_DIR if AudioConfig.USE_DISK_CACHE else None
+        _sound_bank = SoundBank(default_sound_specs(), sample_rate, channels, cache_dir,
+                                backend=AudioConfig.SYNTH_BACKEND)
+    return _sound_bank
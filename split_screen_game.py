@@ -0,0 +1,240 @@
+import pygame
+from config import GameConfig
+from endless_game import EndlessRallyGame
+from endless_track_advanced import TrackCamera
+from realistic_rally_car import RealisticRallyCar
+from input_sources import KeyboardInput
+from death_line import DeathLine
+from tachometer import Tachometer
+from ui import get_font
+
+
+class SplitScreenPlayer:
+    """分割画面の1人分（車・カメラ・デスライン・ゲームオーバー判定用タイマー）"""
+
+    # スタート位置の中央からの横ずれ（2台並べてトラック上に置く）
+    START_OFFSETS = (-18, 18)
+
+    def __init__(self, index, track, viewport, car=None):
+        self.index = index
+        self.name = f"P{index + 1}"
+        self.track = track
+        self.camera = TrackCamera(viewport)
+        self.car = car if car is not None else RealisticRallyCar(track, player_index=index)
+        self.car.input_source = KeyboardInput(KeyboardInput.PLAYER_BINDINGS[index])
+        self.death_line = DeathLine()
+        self.tachometer = Tachometer(60, viewport[3] - 60, radius=55)
+        self.reset()
+
+    def get_start_position(self):
+        """スタート位置（ワールド座標、トラックの中心から左右にずらす）"""
+        return self.track.get_start_position(self.START_OFFSETS[self.index])
+
+    def reset(self):
+        """スタート状態に戻す"""
+        self.car.reset(self.get_start_position())
+        self.camera.reset(self.car.position.y)
+        self.death_line.reset(self.car.position)
+        self.game_over = False
+        self.game_over_reason = ""
+        self.off_track_timer = 0
+        self.stuck_timer = 0
+        self.distance = 0
+
+
+class SplitScreenRallyGame(EndlessRallyGame):
+    """左右分割画面の2人プレイ
+
+    2台の車が1つのトラックを走る。トラックのチャンクとチャンクサーフェスは1組だけで、
+    両方のカメラの表示範囲を覆うように生成・削除するので、生成・描画のコストは2倍にならない。
+    脱落したプレイヤーの画面は残っているプレイヤーを映す。
+    """
+
+    PLAYERS = 2
+
+    def __init__(self, screen=None, profiler=None, startup_timer=None):
+        for _ in self._init_steps(screen, profiler, startup_timer):
+            pass
+
+    def _init_steps(self, screen=None, profiler=None, startup_timer=None):
+        """コンストラクタの本体（1人用の段階の後に2人目の車を作る）"""
+        yield from super()._init_steps(screen, profiler, startup_timer)
+        # スナップショットは1人目の車しか持たないので、リウィンド（Backspace）・途中保存（F5）は使わない
+        self.snapshots = None
+        self.ui.show_rewind_help = False
+        yield
+
+        # 画面を左右に分け、1人目は既存の車とデスラインを引き継ぐ
+        width = GameConfig.SCREEN_WIDTH // self.PLAYERS
+        with self.startup_timer.phase("split screen players"):
+            self.players = []
+            for index in range(self.PLAYERS):
+                viewport = (index * width, 0, width, GameConfig.SCREEN_HEIGHT)
+                car = self.car if index == 0 else None
+                player = SplitScreenPlayer(index, self.track, viewport, car)
+                if index == 0:
+                    player.death_line = self.death_line
+                    player.reset()
+                self.players.append(player)
+        self.track.cameras = [player.camera for player in self.players]
+        self.split_ui = SplitScreenUI()
+
+    def update(self):
+        """全プレイヤーの更新（トラックは全カメラ分をまとめて1回更新）"""
+        if not self.game_over:
+            active = [player for player in self.players if not player.game_over]
+            for player in active:
+                player.car.update_for_endless_mode()
+
+            # 脱落したプレイヤーのカメラは先頭の車を追う
+            leader = min(active, key=lambda player: player.car.position.y)
+            for player in self.players:
+                target = player.car if not player.game_over else leader.car
+                player.camera.follow(target.position.y, target.velocity.length())
+                player.car.set_render_zoom(player.camera.zoom)
+
+            self.track.update_progress(leader.car.position.y)
+            self.track.update_chunks()
+            self._rebase_origin(leader.car.position.y)
+
+            for player in active:
+                car = player.car
+                self._emit_particles(car)
+                skid_segments = car.get_skid_segments()
+                if skid_segments:
+                    self.track.stamp_skid_marks(skid_segments, car.drift_intensity)
+
+                player.distance = max(player.distance, self.track.get_distance_at(car.position.y))
+                player.death_line.update(car.position, player.distance)
+
+                reason = self._evaluate_game_over(car, player.death_line, player)
+                if reason:
+                    player.game_over = True
+                    player.game_over_reason = reason
+                    car.sound_system.stop_engine_sound()
+
+            if all(player.game_over for player in self.players):
+                self.game_over_reason = self._get_result_text()
+                self._game_over()
+
+        self.particles.update()
+
+    def draw(self):
+        """プレイヤーごとの表示領域に描画"""
+        self.screen.fill((34, 139, 34))
+
+        for player in self.players:
+            camera = player.camera
+            view = camera.get_view(self.screen)
+            self.track.draw(view, camera)
+            player.death_line.draw(view, camera.camera_y, camera.zoom)
+            self.particles.draw(view, camera.camera_y, camera.zoom, camera.screen_offset_x)
+
+            # 両方の車をこのカメラの倍率で描く
+            for other in self.players:
+                image = other.car.get_image(camera.zoom)
+                view.blit(image, image.get_rect(center=camera.world_to_screen(other.car.position)))
+
+            self.split_ui.draw_player_hud(view, player, self.track)
+            player.tachometer.draw(view, player.car)
+
+        # 画面の仕切り
+        for player in self.players[1:]:
+            x = player.camera.viewport.x
+            pygame.draw.line(self.screen, GameConfig.BLACK, (x, 0), (x, GameConfig.SCREEN_HEIGHT), 3)
+
+        if self.game_over:
+            self.split_ui.draw_result(self.screen, self.game_over_reason, self.best_distance)
+
+    def _get_world_cars(self):
+        """原点の移動で動かす車（脱落したプレイヤーの車も含む）"""
+        return [player.car for player in self.players]
+
+    def _get_death_lines(self):
+        """原点の移動で動かすデスライン"""
+        return [player.death_line for player in self.players]
+
+    def _get_result_text(self):
+        """勝敗の表示文字列"""
+        first, second = sorted(self.players, key=lambda player: player.distance, reverse=True)[:2]
+        if round(first.distance) == round(second.distance):
+            return "Draw!"
+        return f"{first.name} wins!"
+
+    def _game_over(self):
+        """ゲームオーバー処理（ベストは最も遠くまで走ったプレイヤーの距離）"""
+        self.game_over = True
+        distance = max(player.distance for player in self.players)
+        if distance > self.best_distance:
+            self.best_distance = distance
+
+    def _restart_game(self):
+        """ゲーム再開"""
+        self.game_over = False
+        self.game_over_reason = ""
+        self._reset_track()
+        for player in self.players:
+            player.reset()
+        self.particles.clear()
+
+    def save_run(self, path):
+        """分割画面の走行は保存できない"""
+        print("Warning: Saving a run is not supported in split-screen mode")
+
+    def load_run(self, path):
+        """分割画面の走行は保存した状態から再開できない"""
+        print("Warning: Resuming a run is not supported in split-screen mode")
+        return False
+
+    def get_state(self):
+        """現在のゲーム状態（プレイヤーごとの状態を含む）"""
+        state = super().get_state()
+        state["players"] = [{"name": player.name, "distance": player.distance, "game_over": player.game_over,
+                             "game_over_reason": player.game_over_reason} for player in self.players]
+        return state
+
+
+class SplitScreenUI:
+    """分割画面用のプレイヤーごとの簡易HUD"""
+
+    def __init__(self):
+        self.font = get_font(36)
+        self.small_font = get_font(24)
+        self.large_font = get_font(72)
+
+    def draw_player_hud(self, screen, player, track):
+        """表示領域の左上にプレイヤー情報を表示"""
+        car = player.car
+        lines = [
+            (self.font, f"{player.name}  {car.get_speed_kmh():.0f} km/h", GameConfig.WHITE),
+            (self.small_font, f"Gear: {car.current_gear}   Distance: {player.distance:.0f}m", GameConfig.WHITE),
+        ]
+        if player.game_over:
+            lines.append((self.font, "OUT", GameConfig.RED))
+            lines.append((self.small_font, player.game_over_reason, GameConfig.YELLOW))
+        else:
+            warning_level = player.death_line.get_warning_level(car.position)
+            if warning_level != "SAFE":
+                color = (255, 100, 100) if warning_level == "DANGER" else (255, 200, 100)
+                lines.append((self.small_font, f"{warning_level}! Death Line", color))
+
+        y = 10
+        for font, text, color in lines:
+            rendered = font.render(text, True, color)
+            screen.blit(rendered, (10, y))
+            y += rendered.get_height() + 4
+
+    def draw_result(self, screen, result_text, best_distance):
+        """両者脱落後の結果表示"""
+        center_x = GameConfig.SCREEN_WIDTH // 2
+        lines = [
+            (self.large_font, "GAME OVER", GameConfig.RED),
+            (self.font, result_text, GameConfig.YELLOW),
+            (self.small_font, f"Best: {best_distance:.0f}m", GameConfig.WHITE),
+            (self.small_font, "R: Restart   M/ESC: Menu", GameConfig.WHITE),
+        ]
+        y = GameConfig.SCREEN_HEIGHT // 2 - 80
+        for font, text, color in lines:
+            rendered = font.render(text, True, color)
+            screen.blit(rendered, rendered.get_rect(center=(center_x, y)))
+            y += rendered.get_height() + 10
@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    """起動処理のフェーズごとの経過時間を記録（最初のフレームまでの時間の計測用）"""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.phases = []  # (名前, 開始時刻, 所要時間) 時刻は origin からの秒数
+        self.marks = []  # (名前, 時刻)
+
+    def elapsed(self):
+        """計測開始からの経過時間（秒）"""
+        return time.perf_counter() - self.origin
+
+    @contextmanager
+    def phase(self, name):
+        """with ブロックの所要時間をフェーズとして記録"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.phases.append((name, start - self.origin, end - start))
+
+    def mark(self, name):
+        """その時点の経過時間を記録（"first frame" など）"""
+        self.marks.append((name, self.elapsed()))
+
+    def get_phase_time(self, name):
+        """フェーズの所要時間（同名は合計、記録が無ければ0）"""
+        return sum(duration for phase_name, _, duration in self.phases if phase_name == name)
+
+    def report(self, title="Startup timing"):
+        """フェーズ一覧のテキストを作成"""
+        width = max([len(name) for name, _, _ in self.phases] +
+                    [len(name) for name, _ in self.marks] + [5])
+        lines = [f"{title} (ms):"]
+        events = [(start, name, duration) for name, start, duration in self.phases]
+        events += [(at, name, None) for name, at in self.marks]
+        for at, name, duration in sorted(events, key=lambda event: event[0]):
+            if duration is None:
+                lines.append(f"  {name:<{width}}  {'':>8}   at {at * 1000:8.1f}")
+            else:
+                lines.append(f"  {name:<{width}}  {duration * 1000:8.1f}   at {at * 1000:8.1f}")
+        lines.append(f"  {'total':<{width}}  {self.elapsed() * 1000:8.1f}")
+        return "\n".join(lines)
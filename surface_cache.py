@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+
+class LRUSurfaceCache:
+    """件数上限付きのサーフェスキャッシュ（最近使われていないものから破棄）"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build):
+        """キャッシュから取得（無ければ build() で作成して登録）"""
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = build()
+        self.entries[key] = surface
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+        return surface
+
+    def peek(self, key):
+        """使用順を更新せずに取得（無ければNone）"""
+        return self.entries.get(key)
+
+    def discard_where(self, predicate):
+        """条件に合うキーのエントリを削除"""
+        for key in [key for key in self.entries if predicate(key)]:
+            del self.entries[key]
+
+    def clear(self):
+        """全エントリを削除"""
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+CarConfig のパラメータスイープ
+パラメータの組み合わせ（グリッドまたはランダムサーチ）ごとに、固定シードのステージを
+自動運転でヘッドレスに走らせ、走行距離・トラック外の時間・ドリフト時間・最高速度を集計します
+
+    python sweep.py -p LATERAL_GRIP=0.35,0.45,0.55 -p VEHICLE_MASS=1.0:1.6 --seeds 1-4
+    python sweep.py -p SURFACE_GRIP.mud=0.3:0.7 -p GEAR_RATIOS.3.max_speed=6:7 --random 40 -o mud.csv
+
+結果は走行が終わるたびに CSV に追記され、同じコマンドを再実行すると済んだ走行を飛ばして続きから再開します。
+"""
+
+import argparse
+import concurrent.futures
+import copy
+import csv
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import sys
+import time
+
+from config import CarConfig, GameConfig
+
+DEFAULT_FRAMES = 3600  # 1回の走行の最大フレーム数（60 FPS で1分）
+DEFAULT_GRID_STEPS = 3  # グリッドで範囲（LO:HI）を分割する点の数
+DEFAULT_OUTPUT = "sweep.csv"
+
+# CSV の列（パラメータの列の後に並ぶ）
+RESULT_FIELDS = ("seed", "distance_m", "time_s", "off_track_s", "drift_s", "top_speed", "game_over_reason")
+
+
+def parse_seeds(text):
+    """"1,2,5-8" 形式のシードの指定をリストにする"""
+    seeds = []
+    for part in text.split(","):
+        if "-" in part.strip()[1:]:
+            start, end = part.split("-", 1)
+            seeds.extend(range(int(start), int(end) + 1))
+        else:
+            seeds.append(int(part))
+    return seeds
+
+
+def parse_param(text):
+    """"NAME=v1,v2,..."（値のリスト）または "NAME=LO:HI"（範囲）を (名前, 値のリスト, 範囲) にする"""
+    name, sep, values = text.partition("=")
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"expected NAME=v1,v2,... or NAME=LO:HI, got {text!r}")
+    name = name.strip()
+    try:
+        get_default(name)
+        if ":" in values:
+            low, high = (float(value) for value in values.split(":", 1))
+            return name, None, (low, high)
+        return name, [float(value) for value in values.split(",")], None
+    except (KeyError, ValueError) as e:
+        raise argparse.ArgumentTypeError(f"{text!r}: {e}") from None
+
+
+def _resolve(name):
+    """"GEAR_RATIOS.3.max_speed" のような名前を (辞書またはクラス, キー) にする"""
+    parts = name.split(".")
+    if not hasattr(CarConfig, parts[0]):
+        raise KeyError(f"CarConfig has no {parts[0]}")
+    if len(parts) == 1:
+        return CarConfig, parts[0]
+    container = getattr(CarConfig, parts[0])
+    for part in parts[1:-1]:
+        container = container[_dict_key(container, part)]
+    return container, _dict_key(container, parts[-1])
+
+
+def _dict_key(container, part):
+    """辞書のキー（ギア番号のような整数キーにも対応）"""
+    if not isinstance(container, dict):
+        raise KeyError(f"{part} is not inside a table")
+    if part in container:
+        return part
+    if part.isdigit() and int(part) in container:
+        return int(part)
+    raise KeyError(f"no entry {part}")
+
+
+def get_default(name):
+    """パラメータの今の値（数値でなければ KeyError）"""
+    container, key = _resolve(name)
+    value = getattr(container, key) if container is CarConfig else container[key]
+    if isinstance(value, (dict, bool)) or not isinstance(value, (int, float)):
+        raise KeyError(f"{name} is not a number")
+    return value
+
+
+def set_param(name, value):
+    """パラメータを設定（CarConfig は走行中に毎フレーム参照されるので、書き換えればそのまま効く）"""
+    container, key = _resolve(name)
+    if container is CarConfig:
+        setattr(CarConfig, key, value)
+    else:
+        container[key] = value
+
+
+def build_grid(params, steps):
+    """全パラメータの値の組み合わせ（範囲は steps 点に分割）"""
+    axes = []
+    for name, values, value_range in params:
+        if values is None:
+            low, high = value_range
+            values = [low + (high - low) * i / max(steps - 1, 1) for i in range(steps)]
+        axes.append(values)
+    configs = [[]]
+    for values in axes:
+        configs = [config + [value] for config in configs for value in values]
+    return configs
+
+
+def build_random(params, count, search_seed):
+    """ランダムサーチの組み合わせ（search_seed が同じなら同じ順で同じ組み合わせになる）"""
+    rng = random.Random(search_seed)
+    configs = []
+    for _ in range(count):
+        config = []
+        for name, values, value_range in params:
+            config.append(rng.choice(values) if values is not None else rng.uniform(*value_range))
+        configs.append(config)
+    return configs
+
+
+# ワーカープロセスの状態（プロセスごとにゲームを1つ作って使い回す）
+_worker = {}
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（SDLはpygame初期化時に環境変数を読むので先に設定する）"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    # Ctrl+C はメインプロセスだけで受けて止める
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import pygame
+
+    pygame.init()
+    _worker["screen"] = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+    # 走行ごとに既定値に戻してから設定する
+    _worker["defaults"] = {name: copy.deepcopy(getattr(CarConfig, name))
+                           for name in dir(CarConfig) if not name.startswith("_")}
+
+
+def _restore_defaults():
+    for name, value in _worker["defaults"].items():
+        setattr(CarConfig, name, copy.deepcopy(value))
+
+
+def drive(names, values, seed, frames):
+    """パラメータを設定してシード seed のステージを自動運転で走らせ、結果の辞書を返す"""
+    from endless_game import EndlessRallyGame
+    from input_sources import AutopilotInput
+
+    _restore_defaults()
+    for name, value in zip(names, values):
+        set_param(name, value)
+
+    game = _worker.get("game")
+    if game is None:
+        game = _worker["game"] = EndlessRallyGame(_worker["screen"])
+        game.snapshots = None  # リウィンドは使わない
+    # 再スタート時のステージシードは random から引かれるので、どのワーカーでも seed ごとに同じステージになる
+    random.seed(seed)
+    game.restart()
+    car = game.car
+    car.input_source = AutopilotInput(car)
+
+    off_track = drifting = 0
+    top_speed = 0.0
+    frame = 0
+    # 描画は結果に影響しないので、更新だけを回す
+    while frame < frames and not game.game_over:
+        game.update()
+        game.frame_count += 1
+        frame += 1
+        if car.is_off_track():
+            off_track += 1
+        if car.is_drifting:
+            drifting += 1
+        top_speed = max(top_speed, car.velocity.length())
+
+    return {
+        "seed": seed,
+        "distance_m": round(game.track.get_distance_traveled(), 1),
+        "time_s": round(frame / GameConfig.FPS, 2),
+        "off_track_s": round(off_track / GameConfig.FPS, 2),
+        "drift_s": round(drifting / GameConfig.FPS, 2),
+        "top_speed": round(top_speed, 3),
+        "game_over_reason": game.game_over_reason,
+    }
+
+
+def _row_key(values, seed):
+    return tuple(str(value) for value in values), str(seed)
+
+
+def load_finished(path, names):
+    """中断したスイープの CSV から済んだ走行のキーと行を読む（列が違えば ValueError）"""
+    if not os.path.exists(path):
+        return {}
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        expected = list(names) + list(RESULT_FIELDS)
+        if reader.fieldnames is not None and reader.fieldnames != expected:
+            raise ValueError(f"{path} has the columns {reader.fieldnames}, expected {expected}")
+        return {_row_key([row[name] for name in names], row["seed"]): row for row in reader}
+
+
+def summarize(rows, names, top):
+    """パラメータの組み合わせごとにシードの平均を取り、走行距離の長い順に表示"""
+    groups = {}
+    for row in rows:
+        groups.setdefault(tuple(row[name] for name in names), []).append(row)
+    summary = []
+    for values, group in groups.items():
+        def mean(field):
+            return statistics.mean(float(row[field]) for row in group)
+        summary.append((mean("distance_m"), values, mean("off_track_s"), mean("drift_s"),
+                        max(float(row["top_speed"]) for row in group),
+                        sum(1 for row in group if row["game_over_reason"]), len(group)))
+    summary.sort(key=lambda entry: entry[0], reverse=True)
+
+    widths = [max(len(name), 8) for name in names]
+    header = "  ".join(f"{name:>{width}s}" for name, width in zip(names, widths))
+    print(f"\n{header}  {'distance':>9s}  {'off track':>9s}  {'drift':>7s}  {'top spd':>7s}  {'game over':>9s}")
+    for distance, values, off_track, drift, top_speed, game_overs, count in summary[:top]:
+        cells = "  ".join(f"{float(value):>{width}.4g}" for value, width in zip(values, widths))
+        print(f"{cells}  {distance:8.0f}m  {off_track:8.1f}s  {drift:6.1f}s  {top_speed:7.2f}  "
+              f"{game_overs:>5d}/{count}")
+    if len(summary) > top:
+        print(f"... {len(summary) - top} more configuration(s) in the CSV")
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally CarConfig parameter sweep")
+    parser.add_argument("-p", "--param", dest="params", action="append", type=parse_param, required=True,
+                        metavar="NAME=VALUES",
+                        help="CarConfig parameter to sweep, as a list (LATERAL_GRIP=0.4,0.5) or a range "
+                             "(VEHICLE_MASS=1.0:1.6); tables use dots (SURFACE_GRIP.mud, GEAR_RATIOS.3.max_speed)")
+    parser.add_argument("--random", type=int, default=None, metavar="N",
+                        help="random search with N configurations instead of the full grid")
+    parser.add_argument("--search-seed", type=int, default=0,
+                        help="seed for the random search configurations (default: 0)")
+    parser.add_argument("--grid-steps", type=int, default=DEFAULT_GRID_STEPS,
+                        help=f"grid points per range parameter (default: {DEFAULT_GRID_STEPS})")
+    parser.add_argument("--seeds", type=parse_seeds, default=parse_seeds("1-3"),
+                        help="stage seeds driven for every configuration, e.g. 1-4 or 3,7,11 (default: 1-3)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES,
+                        help=f"frame limit per drive (default: {DEFAULT_FRAMES}, one minute at 60 FPS)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: number of CPUs)")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT,
+                        help=f"CSV file the results are appended to; finished drives are skipped (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--top", type=int, default=10, help="configurations shown in the summary (default: 10)")
+    args = parser.parse_args(argv)
+
+    names = [name for name, _, _ in args.params]
+    if len(set(names)) != len(names):
+        parser.error("each parameter can be swept only once")
+    if args.random is not None:
+        configs = build_random(args.params, args.random, args.search_seed)
+    else:
+        configs = build_grid(args.params, args.grid_steps)
+
+    try:
+        finished = load_finished(args.output, names)
+    except ValueError as e:
+        print(f"Error: {e}; use another --output for a different set of parameters")
+        return 1
+    tasks = [(values, seed) for values in configs for seed in args.seeds
+             if _row_key(values, seed) not in finished]
+    total = len(configs) * len(args.seeds)
+    print(f"{len(configs)} configuration(s) x {len(args.seeds)} seed(s): {total - len(tasks)} finished, "
+          f"{len(tasks)} to drive on {args.jobs} worker(s)")
+
+    rows = list(finished.values())
+    start = time.perf_counter()
+    new_file = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+    with open(args.output, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=names + list(RESULT_FIELDS))
+        if new_file:
+            writer.writeheader()
+        # pygame（SDL）を fork したプロセスで使わないように spawn で起動する
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                                    mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = {pool.submit(drive, names, values, seed, args.frames): values for values, seed in tasks}
+            try:
+                for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                    row = dict(zip(names, futures[future]))
+                    row.update(future.result())
+                    writer.writerow(row)
+                    f.flush()  # 中断されても済んだ走行は残す
+                    rows.append({key: str(value) for key, value in row.items()})
+                    print(f"[{done}/{len(tasks)}] " +
+                          " ".join(f"{name}={value:.4g}" for name, value in zip(names, futures[future])) +
+                          f" seed {row['seed']}: {row['distance_m']:.0f} m {row['game_over_reason']}")
+            except KeyboardInterrupt:
+                print("Interrupted; run the same command again to resume")
+                # 始まっていない走行を取り消す（shutdown の cancel_futures は Python 3.9 以降）
+                for future in futures:
+                    future.cancel()
+                pool.shutdown(wait=False)
+                return 1
+
+    elapsed = time.perf_counter() - start
+    if tasks:
+        print(f"{len(tasks)} drive(s) in {elapsed:.1f} s ({len(tasks) / elapsed:.2f} drives/s)")
+    summarize(rows, names, args.top)
+    print(f"Results in {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
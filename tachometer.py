@@ -1,6 +1,7 @@
 import pygame
 import math
 from config import GameConfig, CarConfig
+from ui import get_font
 
 class Tachometer:
     """リアルなタコメーター"""
@@ -21,9 +22,9 @@ class Tachometer:
         self.sweep_angle = 240  # 全体の角度範囲
         
         # フォント
-        self.font_large = pygame.font.Font(None, 36)
-        self.font_medium = pygame.font.Font(None, 24)
-        self.font_small = pygame.font.Font(None, 18)
+        self.font_large = get_font(36)
+        self.font_medium = get_font(24)
+        self.font_small = get_font(18)
         
         # 色定義
         self.needle_color = (255, 255, 255)
@@ -54,8 +55,7 @@ class Tachometer:
         rpm = min_rpm_for_gear + (max_rpm_for_gear - min_rpm_for_gear) * speed_ratio
         
         # アクセル入力による微調整
-        keys = pygame.key.get_pressed()
-        if keys[pygame.K_UP] or keys[pygame.K_w]:
+        if car.controls.throttle:
             rpm += 200  # アクセル時のRPM上昇
         
         return min(self.max_rpm, rpm)
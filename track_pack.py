@@ -0,0 +1,165 @@
+import argparse
+import mmap
+import struct
+from config import GameConfig
+from advanced_track_generator import AdvancedTrackChunk
+from endless_track_advanced import AdvancedEndlessPixelTrack, EndlessTrackConfig
+
+# トラックパック（.qrtp）のファイル形式（リトルエンディアン）
+#
+#   ヘッダー   : マジック・バージョン・1チャンクの行数・チャンク数・先頭チャンクのタイルY・
+#                ステージシード・インデックスの位置・ステージ名
+#   行レコード : 1行ごとに (中心X float32, 幅 float32, 路面タイプ uint8) の固定長
+#                先頭（スタート地点の下）のチャンクから上へ順に並ぶ
+#   インデックス: チャンクごとに (タイルY int32, 先頭行の番号 uint32, 難易度 float32)
+#
+# 固定長なので、インデックスから行レコードの位置を直接計算してシークできる。
+
+MAGIC = b"QRTP"
+VERSION = 1
+NO_SEED = 0xFFFFFFFF  # シード無し（パックの終わりから先は通常の乱数で生成）
+
+HEADER = struct.Struct("<4sHHIiIQ32s")
+ROW = struct.Struct("<ffB")
+INDEX_ENTRY = struct.Struct("<iIf")
+
+DEFAULT_EXPORT_DISTANCE = 10000  # 書き出す距離の既定値（m）
+
+
+def distance_to_chunks(distance):
+    """距離（m、1m = 10ピクセル）を覆うチャンク数"""
+    chunk_pixels = EndlessTrackConfig.CHUNK_HEIGHT * EndlessTrackConfig.TILE_SIZE
+    return max(1, -(-int(distance * 10) // chunk_pixels))
+
+
+def export_track_pack(track, path, distance=DEFAULT_EXPORT_DISTANCE, name=""):
+    """トラックのスタート地点から distance (m) 分のチャンクをトラックパックに書き出す
+
+    スタート地点のチャンクから上へ、足りない分は track を上に延ばしながら1チャンクずつ
+    書き出し、書き終えたチャンクは track から外す（長いステージでもメモリを使わない）。
+    track は書き出しに使い切るので、ゲーム中のものではなく新しく作ったものを渡す。
+    書き出したチャンク数を返す。
+    """
+    chunk_count = distance_to_chunks(distance) + len(track.chunks) // 2  # スタート地点より下の分も含める
+    chunk_pixels = EndlessTrackConfig.CHUNK_HEIGHT * EndlessTrackConfig.TILE_SIZE
+    seed = track.stage_seed & NO_SEED if track.stage_seed is not None else NO_SEED
+    first_y_offset = track.chunks[0].y_offset
+    index = []
+    row_count = 0
+
+    with open(path, "wb") as f:
+        f.write(bytes(HEADER.size))  # 件数が決まってから書き直す
+        while len(index) < chunk_count:
+            if len(track.chunks) < 2:
+                # 次のチャンクの位置の難易度で1つ先まで生成
+                top = track.chunks[-1].y_offset * EndlessTrackConfig.TILE_SIZE
+                track.update_progress(top - chunk_pixels)
+                track.extend_to(top - 1)
+            chunk = track.chunks.pop(0)
+            rows = zip(chunk.track_center_line, chunk.track_width, chunk.surface_types)
+            f.write(b"".join(ROW.pack(center, width, surface) for center, width, surface in rows))
+            index.append((chunk.y_offset, row_count, chunk.difficulty))
+            row_count += len(chunk.track_center_line)
+
+        index_offset = f.tell()
+        f.write(b"".join(INDEX_ENTRY.pack(*entry) for entry in index))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, EndlessTrackConfig.CHUNK_HEIGHT, len(index), first_y_offset, seed,
+                            index_offset, name.encode("utf-8")[:32]))
+    return len(index)
+
+
+class TrackPack:
+    """トラックパックの読み込み（ファイルをメモリマップし、チャンクは必要になった時点で作る）"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path}: not a track pack")
+        (magic, version, self.rows_per_chunk, self.chunk_count, self.first_y_offset, seed,
+         self.index_offset, name) = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a track pack")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported track pack version {version}")
+        if self.index_offset + self.chunk_count * INDEX_ENTRY.size > len(self.data):
+            raise ValueError(f"{path}: truncated track pack")
+        self.stage_seed = seed if seed != NO_SEED else None
+        self.name = name.rstrip(b"\0").decode("utf-8", "replace")
+
+    def close(self):
+        """メモリマップを閉じる"""
+        self.data.close()
+
+    def get_distance(self):
+        """スタート地点から収録範囲の終わり（最も上のチャンクの上端）までの距離（m）"""
+        if not self.chunk_count:
+            return 0.0
+        top = self._get_index_entry(self.chunk_count - 1)[0] * EndlessTrackConfig.TILE_SIZE
+        return max(0.0, (GameConfig.SCREEN_HEIGHT - 100 - top) / 10)
+
+    def _get_index_entry(self, number):
+        return INDEX_ENTRY.unpack_from(self.data, self.index_offset + number * INDEX_ENTRY.size)
+
+    def find_chunk(self, y_offset):
+        """タイルY座標 y_offset から始まるチャンクの番号（無ければNone）
+
+        チャンクは上へ順に並ぶので、インデックスのタイルYは降順。二分探索で探す。
+        """
+        low, high = 0, self.chunk_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._get_index_entry(middle)[0] > y_offset:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.chunk_count and self._get_index_entry(low)[0] == y_offset:
+            return low
+        return None
+
+    def load_chunk(self, number):
+        """番号のチャンクを行レコードから作成"""
+        y_offset, first_row, difficulty = self._get_index_entry(number)
+        end_row = (self._get_index_entry(number + 1)[1] if number + 1 < self.chunk_count
+                   else (self.index_offset - HEADER.size) // ROW.size)
+        start = HEADER.size + first_row * ROW.size
+        rows = list(ROW.iter_unpack(self.data[start:HEADER.size + end_row * ROW.size]))
+        return AdvancedTrackChunk(y_offset, difficulty, rows=zip(*rows))
+
+    def get_chunk_at(self, y_offset):
+        """タイルY座標 y_offset から始まるチャンク（パックの範囲外ならNone）"""
+        number = self.find_chunk(y_offset)
+        return self.load_chunk(number) if number is not None else None
+
+
+def main(argv=None):
+    """トラックパックの書き出し・情報表示"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally - track pack tool")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="generate a stage and write it as a track pack")
+    export_parser.add_argument("output", help="output .qrtp file")
+    export_parser.add_argument("--seed", type=int, required=True, help="stage seed")
+    export_parser.add_argument("--distance", type=float, default=DEFAULT_EXPORT_DISTANCE,
+                               help=f"stage length in meters (default: {DEFAULT_EXPORT_DISTANCE})")
+    export_parser.add_argument("--name", default="", help="stage name stored in the header")
+
+    info_parser = subparsers.add_parser("info", help="show a track pack's header")
+    info_parser.add_argument("pack", help=".qrtp file")
+
+    args = parser.parse_args(argv)
+    if args.command == "export":
+        track = AdvancedEndlessPixelTrack(args.seed)
+        count = export_track_pack(track, args.output, args.distance, args.name)
+        print(f"Wrote {count} chunks to {args.output}")
+    else:
+        pack = TrackPack(args.pack)
+        print(f"{args.pack}: '{pack.name}', {pack.chunk_count} chunks, {pack.get_distance() / 1000:.1f} km, "
+              f"stage seed {pack.stage_seed}")
+        pack.close()
+
+
+if __name__ == "__main__":
+    main()
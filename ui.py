@@ -1,10 +1,20 @@
 import pygame
 from config import GameConfig
 
+_fonts = {}
+
+def get_font(size):
+    """デフォルトフォントを取得（サイズごとに一度だけ読み込んで共有）"""
+    font = _fonts.get(size)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
 class GameUI:
     def __init__(self):
-        self.font = pygame.font.Font(None, 36)
-        self.small_font = pygame.font.Font(None, 24)
+        self.font = get_font(36)
+        self.small_font = get_font(24)
     
     def draw_hud(self, screen, car):
         """HUDの描画"""
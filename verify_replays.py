@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+ランキング投稿のリプレイ検証
+投稿されたリプレイ（ステージシードとフレームごとの操作）をヘッドレスで最高速度で再現し、
+記録されている進行距離とゲームオーバーの理由が正しいかを確かめます。
+ネットワークの代わりにディレクトリをキューとして使い、ワーカープロセスで並列に検証します。
+
+    python verify_replays.py queue --submit replays/*.qrrp   # 投稿をキューに入れる
+    python verify_replays.py queue                          # キューにある投稿を検証
+    python verify_replays.py queue --watch                  # 新しい投稿を待ちながら検証し続ける
+
+キューのディレクトリ:
+    incoming/    投稿（.qrrp、書き込みが終わってから置く）
+    processing/  検証中（検証プロセスごとの processing/<pid>/ に移してから検証するので、同じ投稿を二重に取らない）
+    accepted/    正しかった投稿
+    rejected/    正しくなかった・読めなかった投稿
+    results.jsonl  判定結果（1投稿1行）
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import time
+
+from config import GameConfig, ReplayConfig
+from replays import Replay
+
+DEFAULT_POLL_INTERVAL = 1.0  # --watch で incoming/ を調べる間隔（秒）
+STALE_CLAIM_TIMEOUT = 600  # 生きているか調べられない検証プロセスの processing/<pid>/ をやり直しに戻すまでの時間（秒）
+MAX_FRAMES = GameConfig.FPS * 60 * 60  # これより長いリプレイは検証しない（1時間）
+MAX_OPPONENTS = 16
+
+QUEUE_DIRS = ("incoming", "processing", "accepted", "rejected")
+RESULTS_FILE = "results.jsonl"
+
+
+# ワーカープロセスの状態（対戦相手の台数ごとにゲームを1つ作って使い回す）
+_worker = {}
+
+
+def _init_worker():
+    """ワーカープロセスの初期化（SDLはpygame初期化時に環境変数を読むので先に設定する）"""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    # Ctrl+C はメインプロセスだけで受けて止める
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    import pygame
+
+    pygame.init()
+    _worker["screen"] = pygame.display.set_mode((GameConfig.SCREEN_WIDTH, GameConfig.SCREEN_HEIGHT))
+    _worker["games"] = {}
+
+
+def check_replay(game, replay):
+    """再現したゲームと記録を比べ、(正しいか, 理由) を返す"""
+    frame = game.frame_count
+    if replay.game_over_reason:
+        if not game.game_over:
+            return False, f"no game over after {replay.frames} frames (claimed {replay.game_over_reason!r})"
+        if frame < replay.frames:
+            return False, f"game over at frame {frame}, but the replay has {replay.frames} frames"
+        if game.game_over_reason != replay.game_over_reason:
+            return False, f"game over reason {game.game_over_reason!r}, claimed {replay.game_over_reason!r}"
+    elif game.game_over:
+        return False, f"game over ({game.game_over_reason}) at frame {frame} in an unfinished run"
+    distance = game.track.get_distance_traveled()
+    if abs(distance - replay.distance) > ReplayConfig.DISTANCE_TOLERANCE:
+        return False, f"distance {distance:.1f} m, claimed {replay.distance:.1f} m"
+    return True, "ok"
+
+
+def verify(path):
+    """リプレイのファイルを検証して結果の辞書を返す"""
+    from replays import advance, create_game, reuse_game
+
+    start = time.perf_counter()
+    result = {"file": os.path.basename(path)}
+    try:
+        replay = Replay.load(path)
+    except (OSError, ValueError) as e:
+        result.update(accepted=False, message=f"unreadable replay: {e}", seconds=time.perf_counter() - start)
+        return result
+    result.update(stage_seed=replay.stage_seed, opponents=replay.opponents, frames=replay.frames,
+                  claimed_distance=replay.distance, claimed_reason=replay.game_over_reason)
+    if replay.frames > MAX_FRAMES or replay.opponents > MAX_OPPONENTS:
+        result.update(accepted=False, message=f"over the limits ({MAX_FRAMES} frames, {MAX_OPPONENTS} opponents)",
+                      seconds=time.perf_counter() - start)
+        return result
+
+    games = _worker["games"]
+    game = games.get(replay.opponents)
+    if game is None:
+        game = games[replay.opponents] = create_game(replay, _worker["screen"])
+    else:
+        reuse_game(game, replay)
+    game.frame_count = 0
+    advance(game, replay.frames)
+
+    accepted, message = check_replay(game, replay)
+    result.update(accepted=accepted, message=message, distance=round(game.track.get_distance_traveled(), 3),
+                  reason=game.game_over_reason, seconds=time.perf_counter() - start)
+    return result
+
+
+def make_queue(root):
+    """キューのディレクトリを作る"""
+    for name in QUEUE_DIRS:
+        os.makedirs(os.path.join(root, name), exist_ok=True)
+
+
+def submit(root, paths):
+    """リプレイをキューに入れる（書きかけのファイルを取られないように、コピーしてから名前を変える）"""
+    incoming = os.path.join(root, "incoming")
+    for path in paths:
+        name = f"{time.time_ns()}-{os.path.basename(path)}"
+        temporary = os.path.join(incoming, f".{name}.tmp")
+        shutil.copyfile(path, temporary)
+        os.replace(temporary, os.path.join(incoming, name))
+    print(f"Submitted {len(paths)} replay(s) to {incoming}")
+
+
+def get_claim_dir(root, pid=None):
+    """検証プロセス pid（省略時はこのプロセス）が検証中の投稿を置くディレクトリ"""
+    return os.path.join(root, "processing", str(os.getpid() if pid is None else pid))
+
+
+def _is_running(pid):
+    """プロセス pid が動いているか（調べられない環境ではNone）"""
+    if os.name == "nt":
+        return None  # Windows の os.kill はシグナル0でもプロセスを終了させる
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # 別ユーザーのプロセス
+    return True
+
+
+def recover(root):
+    """止まった検証プロセスが processing/ に残した投稿を incoming/ に戻し、戻した数を返す
+
+    動いている検証プロセスのディレクトリには触らない。生きているか調べられない環境では、
+    STALE_CLAIM_TIMEOUT の間出し入れの無かったディレクトリだけを戻す。
+    """
+    processing = os.path.join(root, "processing")
+    incoming = os.path.join(root, "incoming")
+    recovered = 0
+    for entry in os.listdir(processing):
+        path = os.path.join(processing, entry)
+        if not os.path.isdir(path):
+            # 検証プロセスごとのディレクトリを使う前の形式で残った投稿
+            os.replace(path, os.path.join(incoming, entry))
+            recovered += 1
+            continue
+        if not entry.isdigit():
+            continue
+        pid = int(entry)
+        if pid != os.getpid():
+            running = _is_running(pid)
+            if running is None:
+                running = time.time() - os.path.getmtime(path) < STALE_CLAIM_TIMEOUT
+            if running:
+                continue
+        for name in os.listdir(path):
+            try:
+                os.replace(os.path.join(path, name), os.path.join(incoming, name))
+            except OSError:
+                continue  # 別の検証プロセスが先に戻した
+            recovered += 1
+        try:
+            os.rmdir(path)
+        except OSError:
+            pass
+    return recovered
+
+
+def claim(root):
+    """incoming/ の投稿をこのプロセスの processing/<pid>/ に移して、取れたファイルのパスを返す（古い順）"""
+    incoming = os.path.join(root, "incoming")
+    claim_dir = get_claim_dir(root)
+    claimed = []
+    for name in sorted(os.listdir(incoming)):
+        if name.startswith("."):
+            continue
+        target = os.path.join(claim_dir, name)
+        try:
+            os.rename(os.path.join(incoming, name), target)
+        except OSError:
+            continue  # 別の検証プロセスが先に取った
+        claimed.append(target)
+    return claimed
+
+
+class Stats:
+    """検証の件数と処理速度"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.start = time.perf_counter()
+        self.replays = 0
+        self.accepted = 0
+        self.frames = 0
+        self.busy = 0.0  # ワーカーが検証に使った時間の合計（秒）
+
+    def add(self, result):
+        self.replays += 1
+        self.accepted += bool(result["accepted"])
+        self.frames += result.get("frames", 0)
+        self.busy += result["seconds"]
+
+    def report(self):
+        """処理速度の表示用の文字列"""
+        elapsed = time.perf_counter() - self.start
+        per_core = self.replays / self.busy if self.busy else 0.0
+        return (f"{self.replays} replay(s): {self.accepted} accepted, {self.replays - self.accepted} rejected\n"
+                f"{elapsed:.1f} s on {self.workers} worker(s): {self.replays / elapsed:.2f} replays/s, "
+                f"{per_core:.2f} replays/s per core, "
+                f"{self.frames / max(self.busy, 1e-9):.0f} simulated frames/s per core")
+
+
+def process(root, pool, stats, watch=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """キューの投稿を検証して accepted/ か rejected/ に移す（watch なら止めるまで待ち続ける）"""
+    with open(os.path.join(root, RESULTS_FILE), "a", encoding="utf-8") as results:
+        pending = {}
+        try:
+            while True:
+                for path in claim(root):
+                    pending[pool.submit(verify, path)] = path
+                if not pending:
+                    if not watch:
+                        return
+                    time.sleep(poll_interval)
+                    continue
+                done, _ = concurrent.futures.wait(pending, timeout=poll_interval if watch else None,
+                                                  return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # 投稿は processing/ に残し、次回の起動でやり直す
+                        print(f"Warning: Could not verify {os.path.basename(path)}: {e}")
+                        continue
+                    result["verified_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+                    try:
+                        os.replace(path, os.path.join(root, "accepted" if result["accepted"] else "rejected",
+                                                      os.path.basename(path)))
+                    except OSError as e:
+                        print(f"Warning: Could not move {os.path.basename(path)}: {e}")
+                        continue
+                    results.write(json.dumps(result) + "\n")
+                    results.flush()
+                    stats.add(result)
+                    verdict = "accepted" if result["accepted"] else "REJECTED"
+                    print(f"{verdict:8s} {result['file']}: {result['message']} "
+                          f"({result['seconds'] * 1000:.0f} ms)")
+        except KeyboardInterrupt:
+            # 検証を始めていない投稿を取り消す（shutdown の cancel_futures は Python 3.9 以降）
+            for future in pending:
+                future.cancel()
+            raise
+
+
+def main(argv=None):
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="Amazon Q Rally leaderboard replay verifier")
+    parser.add_argument("queue", help="queue directory (incoming/, processing/, accepted/, rejected/)")
+    parser.add_argument("--submit", nargs="+", metavar="REPLAY", help="copy these replays into the queue and exit")
+    parser.add_argument("--watch", action="store_true", help="keep waiting for new submissions (Ctrl+C to stop)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds between checks of incoming/ with --watch (default: {DEFAULT_POLL_INTERVAL})")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes (default: number of CPUs)")
+    args = parser.parse_args(argv)
+
+    make_queue(args.queue)
+    if args.submit:
+        submit(args.queue, args.submit)
+        return 0
+
+    # 止まった検証プロセスが processing/ に残した投稿は incoming/ に戻してやり直す
+    recovered = recover(args.queue)
+    if recovered:
+        print(f"Requeued {recovered} submission(s) left by stopped verifiers")
+    os.makedirs(get_claim_dir(args.queue), exist_ok=True)
+
+    stats = Stats(args.jobs)
+    # pygame（SDL）を fork したプロセスで使わないように spawn で起動する
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker,
+                                                mp_context=multiprocessing.get_context("spawn")) as pool:
+        try:
+            process(args.queue, pool, stats, args.watch, args.poll)
+        except KeyboardInterrupt:
+            print("Stopped; unfinished submissions are retried on the next run")
+            pool.shutdown(wait=False)
+    # 検証し終えていればこのプロセスのディレクトリは空なので消す（残りは次回 recover() で戻す）
+    try:
+        os.rmdir(get_claim_dir(args.queue))
+    except OSError:
+        pass
+    if stats.replays:
+        print(stats.report())
+    else:
+        print("No submissions in the queue")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())